@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils import timezone
-from .models import User 
+from .models import User, IdempotencyRecord
 from django.utils.translation import gettext_lazy as _ 
 from shared.admin import SoftDeleteAdmin
 
@@ -81,3 +81,10 @@ class UserAdmin(SoftDeleteAdmin):
     def activate_users(self, request, queryset):
         updated = queryset.update(is_active=True)
         self.message_user(request, f'{updated} users were activated.')
+
+
+@admin.register(IdempotencyRecord)
+class IdempotencyRecordAdmin(admin.ModelAdmin):
+    list_display = ('scope', 'key', 'user', 'status_code', 'created_at', 'expires_at')
+    list_filter = ('scope', 'status_code')
+    search_fields = ('key',)
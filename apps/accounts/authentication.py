@@ -0,0 +1,91 @@
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from .models import User
+from .tokens import TenantRefreshToken
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    Request user backed by the access token claims.
+    role, pk, id and the organization are answered from the claims; any other attribute
+    loads the full User row on first access.
+    """
+
+    def __init__(self, token):
+        user_id = token[api_settings.USER_ID_CLAIM]
+        super().__init__(lambda: ClaimsUser._load_user(user_id))
+        self.__dict__["_claims"] = token
+
+    @staticmethod
+    def _load_user(user_id):
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+    def __bool__(self):
+        return True
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    @property
+    def pk(self):
+        return self._claims[TenantRefreshToken.USER_PK_CLAIM]
+
+    @property
+    def id(self):
+        return self._claims[api_settings.USER_ID_CLAIM]
+
+    @property
+    def role(self):
+        return self._claims[TenantRefreshToken.ROLE_CLAIM]
+
+    @property
+    def organization_id(self):
+        return self._claims.get(TenantRefreshToken.ORGANIZATION_ID_CLAIM)
+
+    @property
+    def organization_acronym(self):
+        return self._claims.get(TenantRefreshToken.ORGANIZATION_ACRONYM_CLAIM)
+
+    @property
+    def is_hydrated(self):
+        return self._wrapped is not empty
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the tenant claims of tokens issued by TenantRefreshToken
+    instead of loading the user on every read-only request. Writes load the user up front, so
+    a user deactivated after the token was issued cannot change anything.
+    Tokens issued without those claims fall back to the regular user lookup.
+    """
+
+    def authenticate(self, request):
+        self.read_only = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if TenantRefreshToken.ROLE_CLAIM not in validated_token or TenantRefreshToken.USER_PK_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise AuthenticationFailed("Token contained no recognizable user identification", code="token_not_valid")
+
+        user = ClaimsUser(validated_token)
+        if not getattr(self, "read_only", False):
+            # Raises AuthenticationFailed for a deleted or inactive user
+            user._setup()
+        return user
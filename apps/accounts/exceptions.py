@@ -52,3 +52,21 @@ class InvalidPasswordResetTokenException(CustomValidationError):
     status_code = status.HTTP_401_UNAUTHORIZED  # expired/invalid token → unauthorized
     default_detail = "Invalid or expired password reset token."
     default_code = "invalid_password_reset_token"
+
+
+class InvalidIdempotencyKeyException(CustomValidationError):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = "The Idempotency-Key header must be between 1 and 255 characters."
+    default_code = "invalid_idempotency_key"
+
+
+class IdempotencyKeyReusedException(CustomValidationError):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key was already used for a different request."
+    default_code = "idempotency_key_reused"
+
+
+class IdempotentRequestInProgressException(CustomValidationError):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still being processed. Retry shortly."
+    default_code = "idempotent_request_in_progress"
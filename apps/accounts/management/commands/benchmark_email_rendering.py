@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from faker import Faker
+import time
+from shared.email_rendering import EmailTemplateRenderer
+
+fake = Faker()
+
+
+def patient_welcome_context(organization_name):
+    return {
+        "organization_name": organization_name,
+        "patient_email": fake.email(),
+        "patient_full_name": fake.name(),
+        "login_url": "https://app.medipt.example/auth/login",
+    }
+
+
+def caregiver_invitation_context(organization_name):
+    return {
+        "organization_name": organization_name,
+        "invitation_email": fake.email(),
+        "invitation_role": "Nurse",
+        "accept_link": f"https://app.medipt.example/caregivers/accept-invitation/{fake.uuid4()}",
+        "expiry_days": 7,
+    }
+
+
+def password_reset_context(organization_name):
+    return {
+        "user_name": fake.name(),
+        "reset_link": f"https://app.medipt.example/auth/reset-password/{fake.uuid4()}",
+    }
+
+
+def organization_activation_context(organization_name):
+    return {
+        "organization_name": fake.company(),
+        "activation_link": f"https://app.medipt.example/auth/verify-account/{fake.uuid4()}",
+        "current_site": "app.medipt.example",
+    }
+
+
+TEMPLATES = {
+    "organizations/mails/patient_welcome_mail.html": patient_welcome_context,
+    "invites/emails/caregiver_invitation_email.html": caregiver_invitation_context,
+    "accounts/general/password_reset_email.html": password_reset_context,
+    "accounts/organizations/organization_activation_email.html": organization_activation_context,
+}
+
+
+class Command(BaseCommand):
+    help = "Measure the per-email rendering cost of the email templates"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emails', type=int, default=2000, help='Emails rendered per template and strategy')
+        parser.add_argument('--rounds', type=int, default=3, help='Best of this many rounds is reported')
+
+    def handle(self, *args, **options):
+        count = options['emails']
+        organization_name = fake.company()
+
+        self.stdout.write(f"{'template':<60}{'render_to_string':>18}{'render':>12}{'render_many':>14}  (us/email)")
+        for template, make_context in TEMPLATES.items():
+            contexts = [make_context(organization_name) for _ in range(count)]
+            baseline = self.measure(options['rounds'], count, lambda: [render_to_string(template, context) for context in contexts])
+            single = self.measure(options['rounds'], count, lambda: [EmailTemplateRenderer.render(template, context) for context in contexts])
+            batch = self.measure(options['rounds'], count, lambda: EmailTemplateRenderer.render_many(template, contexts))
+            self.stdout.write(f"{template:<60}{baseline:>18.1f}{single:>12.1f}{batch:>14.1f}")
+
+    @staticmethod
+    def measure(rounds, count, render):
+        best = None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best / count * 1_000_000
@@ -1,27 +1,28 @@
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+from contextlib import contextmanager
+from datetime import timedelta
 from faker import Faker
+import multiprocessing
 import random
+import time
 from apps.accounts.models import User
 from apps.organizations.models import Organization
+from apps.organizations.organization_service import OrganizationSequenceService, OrganizationStatsService
 from apps.caregivers.models import Caregiver, role_abbreviation
 from apps.patients.models import Patient, PatientMedicalRecord, PatientDiagnosisDetails, VitalSign
+from apps.patients.patient_service import PatientDiagnosisSummaryService, VitalSignRollupService
 from shared.text_choices import UserRoles
 from shared.text_choices import Gender, MaritalStatus, BloodGroupChoices, GenotypeChoices
-from datetime import date
 
 fake = Faker()
 
-staff_counters = {}  
+SEED_PASSWORD = "password2000"
+TEXT_POOL_SIZE = 500
 
-def get_next_staff_number(org, caregiver_type):
-    key = (org.id, caregiver_type)
-    last_count = staff_counters.get(key, 0)
-    next_count = last_count + 1
-    staff_counters[key] = next_count
-
-    acronym = org.acronym.upper()
-    role_abbr = role_abbreviation.get(caregiver_type, "UNK")
-    return f"{acronym}_{role_abbr}_{next_count}"
 
 def generate_nigerian_phone_number():
     # Choose whether to use +234 or 0
@@ -32,7 +33,202 @@ def generate_nigerian_phone_number():
     return f"{prefix}{first_digit}{remaining_digits}"
 
 
-from django.db import transaction
+def seed_email(first_name, last_name, index, acronym):
+    return f"{slugify(first_name)}.{slugify(last_name)}.{index}@{acronym.lower()}.example.com"
+
+
+@contextmanager
+def preserve_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values set on the instances (backdated visits)."""
+    fields = [(model._meta.get_field(name), name) for model in models for name in ("created_at", "updated_at")]
+    saved = [(field, field.auto_now, field.auto_now_add) for field, _ in fields]
+    for field, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class TextPool:
+    """Pre-generated faker text, sampled instead of generating text for every row."""
+
+    def __init__(self, size=TEXT_POOL_SIZE):
+        self.sentences = [fake.sentence() for _ in range(size)]
+        self.words = [fake.word() for _ in range(size)]
+        self.companies = [fake.company() for _ in range(size)]
+        self.texts = [fake.text() for _ in range(size)]
+
+
+def vital_sign_series(visits):
+    """
+    Vital signs for consecutive visits of one patient: a per-patient baseline with a slow random
+    walk (weight, blood pressure) and visit-to-visit noise, plus the occasional febrile visit.
+    """
+    weight = random.uniform(45, 110)
+    systolic = random.uniform(105, 145)
+    diastolic = systolic * random.uniform(0.58, 0.68)
+    pulse = random.uniform(60, 90)
+    oxygen = random.uniform(95.5, 99.5)
+
+    for _ in range(visits):
+        weight = min(max(weight + random.gauss(0, 0.8), 30), 180)
+        systolic = min(max(systolic + random.gauss(0, 3), 90), 190)
+        diastolic = min(max(diastolic + random.gauss(0, 2), 55), 120)
+        fever = random.random() < 0.15
+        yield {
+            "body_temperature": round(random.gauss(38.6 if fever else 36.8, 0.3), 1),
+            "pulse_rate": int(random.gauss(pulse + (15 if fever else 0), 5)),
+            "blood_pressure": f"{int(systolic + random.gauss(0, 4))}/{int(diastolic + random.gauss(0, 3))}",
+            "blood_oxygen": round(min(oxygen + random.gauss(0, 0.6) - (2 if fever else 0), 100.0), 1),
+            "respiration_rate": int(random.gauss(20 if fever else 16, 2)),
+            "weight": round(weight, 2),
+        }
+
+
+def visit_times(visits, now, history_days):
+    """Sorted visit timestamps spread over the last `history_days` days."""
+    return sorted(now - timedelta(days=random.uniform(0, history_days)) for _ in range(visits))
+
+
+def seed_organization(organization_pk, options, password_hash, seed=None):
+    """
+    Seed caregivers, patients, medical records, diagnoses and vital signs of one organization
+    with batched bulk_create calls. Runs in the main process or in a worker process.
+    """
+    if seed is not None:
+        random.seed(seed)
+        fake.seed_instance(seed)
+    elif multiprocessing.parent_process() is not None:
+        # Forked workers inherit the parent's random state; diverge
+        random.seed()
+        fake.seed_instance(random.getrandbits(32))
+
+    batch_size = options["batch_size"]
+    diagnoses_per_patient = options["diagnoses"]
+    history_days = options["history_days"]
+    now = timezone.now()
+    texts = TextPool()
+    counts = {"caregivers": 0, "patients": 0, "diagnoses": 0}
+
+    try:
+        with transaction.atomic():
+            organization = Organization.objects.get(pk=organization_pk)
+            acronym = organization.acronym
+
+            # Caregivers: the organization's pool, reused for every diagnosis
+            caregiver_pool = []
+            for start in range(0, options["caregivers"], batch_size):
+                size = min(batch_size, options["caregivers"] - start)
+                names = [(fake.first_name(), fake.last_name()) for _ in range(size)]
+                users = User.objects.bulk_create([
+                    User(email=seed_email(first, last, f"c{start + i}", acronym), password=password_hash,
+                         role=UserRoles.CAREGIVER, is_active=True, is_verified=True)
+                    for i, (first, last) in enumerate(names)
+                ])
+                caregivers = [
+                    Caregiver(
+                        user=user,
+                        organization=organization,
+                        first_name=first,
+                        last_name=last,
+                        caregiver_type=random.choice(list(role_abbreviation.keys())),
+                        gender=random.choice(Gender.values),
+                        date_of_birth=fake.date_of_birth(minimum_age=25, maximum_age=60),
+                        marital_status=random.choice(MaritalStatus.values),
+                        phone_number=generate_nigerian_phone_number(),
+                    )
+                    for user, (first, last) in zip(users, names)
+                ]
+                OrganizationSequenceService.assign_staff_numbers(caregivers)
+                caregiver_pool.extend(Caregiver.objects.bulk_create(caregivers))
+            counts["caregivers"] = len(caregiver_pool)
+
+            # Patients and their records, batch by batch
+            for start in range(0, options["patients"], batch_size):
+                size = min(batch_size, options["patients"] - start)
+                names = [(fake.first_name(), fake.last_name()) for _ in range(size)]
+                users = User.objects.bulk_create([
+                    User(email=seed_email(first, last, f"p{start + i}", acronym), password=password_hash,
+                         role=UserRoles.PATIENT, is_active=True, is_verified=True)
+                    for i, (first, last) in enumerate(names)
+                ])
+                patients = [
+                    Patient(
+                        user=user,
+                        organization=organization,
+                        first_name=first,
+                        last_name=last,
+                        gender=random.choice(Gender.values),
+                        date_of_birth=fake.date_of_birth(minimum_age=0, maximum_age=90),
+                        marital_status=random.choice(MaritalStatus.values),
+                        phone_number=generate_nigerian_phone_number(),
+                        emergency_phone_number=generate_nigerian_phone_number(),
+                    )
+                    for user, (first, last) in zip(users, names)
+                ]
+                OrganizationSequenceService.assign_medical_ids(patients)
+                Patient.objects.bulk_create(patients)
+
+                PatientMedicalRecord.objects.bulk_create([
+                    PatientMedicalRecord(
+                        patient=patient,
+                        blood_group=random.choice(BloodGroupChoices.values),
+                        genotype=random.choice(GenotypeChoices.values),
+                        weight=random.randint(40, 120),
+                        height=random.randint(140, 200),
+                    )
+                    for patient in patients
+                ])
+                counts["patients"] += len(patients)
+
+                if not diagnoses_per_patient or not caregiver_pool:
+                    continue
+
+                diagnoses, vitals = [], []
+                for patient in patients:
+                    series = vital_sign_series(diagnoses_per_patient)
+                    for visited_at, vital_sign in zip(visit_times(diagnoses_per_patient, now, history_days), series):
+                        diagnosis = PatientDiagnosisDetails(
+                            patient=patient,
+                            organization=organization,
+                            caregiver=random.choice(caregiver_pool),
+                            assessment=random.choice(texts.sentences),
+                            diagnoses=random.choice(texts.words),
+                            medication=random.choice(texts.words),
+                            health_care_center=random.choice(texts.companies),
+                            notes=random.choice(texts.texts),
+                            created_at=visited_at,
+                            updated_at=visited_at,
+                        )
+                        diagnoses.append(diagnosis)
+                        systolic, diastolic = VitalSign.split_blood_pressure(vital_sign["blood_pressure"])
+                        vitals.append(VitalSign(
+                            patient_diagnoses_details=diagnosis, patient=patient, recorded_at=visited_at,
+                            systolic=systolic, diastolic=diastolic, created_at=visited_at, updated_at=visited_at, **vital_sign,
+                        ))
+
+                with preserve_timestamps(PatientDiagnosisDetails, VitalSign):
+                    for chunk in range(0, len(diagnoses), batch_size):
+                        PatientDiagnosisDetails.objects.bulk_create(diagnoses[chunk:chunk + batch_size])
+                        VitalSign.objects.bulk_create(vitals[chunk:chunk + batch_size])
+                counts["diagnoses"] += len(diagnoses)
+
+            PatientDiagnosisSummaryService.rebuild(organization=organization, batch_size=batch_size)
+            # Backdated updated_at values sit behind the rollup task's watermark
+            VitalSignRollupService.rebuild(organization=organization, batch_size=batch_size)
+            OrganizationStatsService.reconcile(organization_ids=[organization.pk])
+    finally:
+        if multiprocessing.parent_process() is not None:
+            connections.close_all()
+
+    return counts
+
+
+def _seed_organization_worker(arguments):
+    return seed_organization(*arguments)
+
 
 class Command(BaseCommand):
     help = "Seed the database with test data"
@@ -41,124 +237,74 @@ class Command(BaseCommand):
         parser.add_argument('--orgs', type=int, default=5, help='Number of organizations')
         parser.add_argument('--caregivers', type=int, default=50, help='Number of caregivers per organization')
         parser.add_argument('--patients', type=int, default=200, help='Number of patients per organization')
+        parser.add_argument('--diagnoses', type=int, default=1, help='Number of diagnoses (visits with vital signs) per patient')
+        parser.add_argument('--history-days', type=int, default=730, help='Visits are spread over this many past days')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert')
+        parser.add_argument('--workers', type=int, default=1, help='Seed organizations in parallel across this many processes')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for reproducible data')
 
     def handle(self, *args, **options):
         org_count = options['orgs']
-        caregivers_per_org = options['caregivers']
-        patients_per_org = options['patients']
+        started = time.monotonic()
 
-        try:
-            with transaction.atomic():  # wrap the entire seeding process
-                organizations = []
-                all_caregivers = []
-
-                # Create organizations
-                for _ in range(org_count):
-                    user = User.objects.create_user(
-                        email=fake.unique.email(),
-                        password="password2000",
-                        role=UserRoles.ORGANIZATION,
-                        is_active=True,
-                        is_verified=True
-                    )
-                    org = Organization.objects.create(
-                        user=user,
-                        name=fake.company(),
-                        acronym=fake.unique.lexify(text='???').upper(),
-                        address=fake.address(),
-                        phone_number=generate_nigerian_phone_number(),
-                    )
-                    organizations.append(org)
-
-                # Create caregivers
-                for org in organizations:
-                    org_caregivers = []
-                    for _ in range(caregivers_per_org):
-                        user = User.objects.create_user(
-                            email=fake.unique.email(),
-                            password="password2000",
-                            role=UserRoles.CAREGIVER,
-                            is_active=True,
-                            is_verified=True
-                        )
-                        caregiver_type = random.choice(list(role_abbreviation.keys()))
-                        staff_number = get_next_staff_number(org, caregiver_type)
-                        caregiver = Caregiver.objects.create(
-                            user=user,
-                            organization=org,
-                            first_name=fake.first_name(),
-                            last_name=fake.last_name(),
-                            caregiver_type=caregiver_type,
-                            gender=random.choice([Gender.MALE, Gender.FEMALE]),
-                            date_of_birth=fake.date_of_birth(minimum_age=25, maximum_age=60),
-                            marital_status=random.choice(list(MaritalStatus.choices)),
-                            phone_number=generate_nigerian_phone_number(),
-                            staff_number=staff_number
-                        )
-                        org_caregivers.append(caregiver)
-                        all_caregivers.append(caregiver)
-
-                    org.caregivers = org_caregivers
-
-                # Create patients and related records
-                for org in organizations:
-                    for _ in range(patients_per_org):
-                        user = User.objects.create_user(
-                            email=fake.unique.email(),
-                            password="password2000",
-                            role=UserRoles.PATIENT,
-                            is_active=True,
-                            is_verified=True
-                        )
-                        patient = Patient.objects.create(
-                            user=user,
-                            organization=org,
-                            first_name=fake.first_name(),
-                            last_name=fake.last_name(),
-                            gender=random.choice([Gender.MALE, Gender.FEMALE]),
-                            date_of_birth=fake.date_of_birth(minimum_age=0, maximum_age=90),
-                            marital_status=random.choice(list(MaritalStatus.choices)),
-                            phone_number=generate_nigerian_phone_number(),
-                            emergency_phone_number=generate_nigerian_phone_number(),
-                        )
+        if options['seed'] is not None:
+            random.seed(options['seed'])
+            fake.seed_instance(options['seed'])
 
-                        # Medical record
-                        PatientMedicalRecord.objects.create(
-                            patient=patient,
-                            blood_group=random.choice(list(BloodGroupChoices)).value,
-                            genotype=random.choice(list(GenotypeChoices)).value,
-                            weight=random.randint(40, 120),
-                            height=random.randint(140, 200),
-                        )
+        # One PBKDF2 hash for every seeded account instead of one per user
+        password_hash = make_password(SEED_PASSWORD)
 
-                        # Diagnosis
-                        diag = PatientDiagnosisDetails.objects.create(
-                            patient=patient,
-                            organization=org,
-                            caregiver=random.choice([c for c in all_caregivers if c.organization == org]),
-                            assessment=fake.sentence(),
-                            diagnoses=fake.word(),
-                            medication=fake.word(),
-                            health_care_center=fake.company(),
-                            notes=fake.text(),
-                        )
-
-                        # Vital signs
-                        VitalSign.objects.create(
-                            patient_diagnoses_details=diag,
-                            body_temperature=round(random.uniform(36.0, 39.0), 1),
-                            pulse_rate=random.randint(60, 120),
-                            blood_pressure=f"{random.randint(100, 140)}/{random.randint(60, 90)}",
-                            blood_oxygen=round(random.uniform(90.0, 100.0), 1),
-                            respiration_rate=random.randint(12, 24),
-                            weight=random.randint(40, 120),
-                        )
+        try:
+            organization_pks = self.create_organizations(org_count, password_hash)
+            jobs = [
+                (pk, options, password_hash, None if options['seed'] is None else options['seed'] + index)
+                for index, pk in enumerate(organization_pks)
+            ]
 
-            self.stdout.write(self.style.SUCCESS(
-                f'Successfully seeded {org_count} organizations, '
-                f'{len(all_caregivers)} caregivers, and '
-                f'{patients_per_org * org_count} patients.'
-            ))
+            if options['workers'] > 1 and len(jobs) > 1:
+                # Forked workers must not share the parent's database connection
+                connections.close_all()
+                with multiprocessing.get_context("fork").Pool(processes=options['workers']) as pool:
+                    results = pool.map(_seed_organization_worker, jobs, chunksize=1)
+            else:
+                results = [seed_organization(*job) for job in jobs]
 
         except Exception as e:
             self.stderr.write(self.style.ERROR(f"Seeding failed: {e}"))
+            return
+
+        totals = {key: sum(result[key] for result in results) for key in ("caregivers", "patients", "diagnoses")}
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully seeded {org_count} organizations, '
+            f'{totals["caregivers"]} caregivers, '
+            f'{totals["patients"]} patients and '
+            f'{totals["diagnoses"]} diagnoses in {time.monotonic() - started:.1f}s.'
+        ))
+
+    def create_organizations(self, count, password_hash):
+        # Soft-deleted organizations keep their acronym, compared regardless of case
+        existing = {acronym.upper() for acronym in Organization.objects.all_with_deleted().values_list('acronym', flat=True)}
+        acronyms = []
+        while len(acronyms) < count:
+            acronym = fake.lexify(text='????' if count + len(existing) > 10000 else '???').upper()
+            if acronym not in existing:
+                existing.add(acronym)
+                acronyms.append(acronym)
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(email=f"admin@{acronym.lower()}.example.com", password=password_hash,
+                     role=UserRoles.ORGANIZATION, is_active=True, is_verified=True)
+                for acronym in acronyms
+            ])
+            organizations = Organization.objects.bulk_create([
+                Organization(
+                    user=user,
+                    name=fake.company(),
+                    acronym=acronym,
+                    address=fake.address(),
+                    phone_number=generate_nigerian_phone_number(),
+                )
+                for user, acronym in zip(users, acronyms)
+            ])
+        return [organization.pk for organization in organizations]
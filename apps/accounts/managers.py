@@ -4,6 +4,9 @@ from django.core.validators import validate_email
 from django.utils.translation import gettext_lazy as _
 from shared.managers import SoftDeleteManager
 class CustomUserManager(SoftDeleteManager,BaseUserManager):
+    # Deleted accounts keep their email reserved: authentication and uniqueness checks
+    # must see every user
+    alive_only = False
 
     def email_validator(self, email):
         try:
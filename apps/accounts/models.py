@@ -1,5 +1,6 @@
 import uuid
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.shortcuts import render
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin,Group, Permission
 from django.utils.translation import gettext_lazy as _ 
@@ -52,5 +53,28 @@ class User(AbstractBaseUser,PermissionsMixin,SoftDeleteModel):
 
         return self.email
 
-        
-   
\ No newline at end of file
+
+class IdempotencyRecord(models.Model):
+    """
+    Durable copy of the response to a write sent with an `Idempotency-Key` header, so a retry
+    is replayed even once the cached copy is gone. Keys are scoped to the user and the view;
+    expired rows are purged by `purge_idempotency_records`.
+    """
+    user = models.ForeignKey(User,on_delete=models.CASCADE,related_name="idempotency_records")
+    scope = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=32)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField(encoder=DjangoJSONEncoder,null=True,blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = _("Idempotency Record")
+        verbose_name_plural = _("Idempotency Records")
+        constraints = [
+            models.UniqueConstraint(fields=["user", "scope", "key"], name="unique_idempotency_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} ({self.status_code})"
@@ -7,7 +7,7 @@ from shared.text_choices import UserRoles
 from apps.organizations.models import Organization, User  
 import logging
 from django.contrib.auth import authenticate
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import TenantRefreshToken
 from rest_framework.exceptions import AuthenticationFailed
 
 
@@ -38,7 +38,7 @@ class OrganizationSignupSerializer(serializers.ModelSerializer):
         return value
        
     def validate_acronym(self, value):
-        if Organization.objects.filter(acronym=value).exists():
+        if Organization.objects.all_with_deleted().filter(acronym__iexact=value).exists():
             raise serializers.ValidationError("An organization with this acronym already exists.")
         return value
        
@@ -80,8 +80,8 @@ class LoginSerializer(serializers.Serializer):
         if not user.is_verified:
             raise AuthenticationFailed("Your account is not verified. Please check your email.")
 
-        # Generate JWT tokens using SimpleJWT
-        refresh = RefreshToken.for_user(user)
+        # Generate JWT tokens carrying the role and organization claims
+        refresh = TenantRefreshToken.for_user(user)
         access = refresh.access_token
 
         return {
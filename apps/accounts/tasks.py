@@ -1,6 +1,8 @@
 # tasks.py
 from celery import shared_task
+from celery.exceptions import MaxRetriesExceededError
 from apps.accounts.models import User
+from shared.base_email_service import BaseEmailService
 from .email_service import AccountEmailService
 import logging
 from celery import shared_task
@@ -15,3 +17,35 @@ def send_password_reset_email(user_email: str):
         AccountEmailService.send_password_reset_email(user)
     except User.DoesNotExist:
         logger.warning(f"Password reset requested for non-existent email: {user_email}")
+
+
+@shared_task(bind=True, max_retries=5)
+def send_email_batch(self, messages):
+    """
+    Sends a batch of serialized emails over one pooled SMTP connection. Only the messages that
+    failed transiently are retried, with an exponential backoff; the rest of the batch is never resent.
+    """
+    failures = BaseEmailService.deliver([BaseEmailService.deserialize_message(message) for message in messages])
+    retryable = []
+    for message, error in failures:
+        if BaseEmailService.is_permanent_failure(error):
+            logger.error(f"Email to {', '.join(message.to)} rejected permanently: {error}")
+        else:
+            retryable.append(BaseEmailService.serialize_message(message))
+
+    logger.info(f"Sent {len(messages) - len(failures)} of {len(messages)} emails")
+    if retryable:
+        try:
+            raise self.retry(args=[retryable], countdown=60 * 2 ** self.request.retries)
+        except MaxRetriesExceededError:
+            logger.error(f"Giving up on {len(retryable)} emails after {self.max_retries} retries")
+
+
+@shared_task
+def purge_idempotency_records():
+    """
+    Periodically delete the stored responses of idempotent requests whose key has expired.
+    """
+    from shared.idempotency import IdempotencyStore
+    deleted = IdempotencyStore.purge_expired()
+    logger.info(f"Purged {deleted} expired idempotency records")
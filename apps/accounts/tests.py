@@ -1,3 +1,153 @@
-from django.test import TestCase
+import smtplib
+from unittest import mock
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from apps.organizations.models import Organization
+from shared.testing import create_caregiver, create_organization, create_user
+from shared.text_choices import UserRoles
+from .authentication import ClaimsUser
+from .models import User
+from .tokens import TenantRefreshToken
+from .tasks import send_email_batch
+from shared.base_email_service import BaseEmailService
+from shared.email_backends import InMemoryEmailBackend
+from shared.email_rendering import EmailTemplateRenderer
 
 # Create your tests here.
+
+class ClaimsJWTAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@claims.test", "Claims Hospital", "CLH")
+        cls.user = cls.organization.user
+
+    def test_login_token_carries_tenant_claims(self):
+        response = APIClient().post("/api/v1/auth/accounts/login/", {"email": "org@claims.test", "password": "pass"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        access = TenantRefreshToken(response.json()["data"]["refresh"]).access_token
+        self.assertEqual(access["role"], UserRoles.ORGANIZATION)
+        self.assertEqual(access["organization_id"], self.organization.pk)
+        self.assertEqual(access["organization_acronym"], "CLH")
+
+    def test_read_endpoint_does_not_load_the_user(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {TenantRefreshToken.for_user(self.user).access_token}")
+        # Only the (empty) page count: no user, organization or permission lookups
+        with self.assertNumQueries(1):
+            response = client.get("/api/v1/organizations/all-patients/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.wsgi_request.user.is_hydrated)
+
+    def get_with_token(self, user, url):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {TenantRefreshToken.for_user(user).access_token}")
+        return client.get(url)
+
+    def test_writes_reject_a_user_deactivated_after_the_token_was_issued(self):
+        caregiver = create_caregiver(self.organization, "deactivated@claims.test")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {TenantRefreshToken.for_user(caregiver.user).access_token}")
+        url = "/api/v1/patients/patient-diagnoses-with-vital-sign/"
+        # Still active: past authentication, rejected by the serializer
+        self.assertEqual(client.post(url, {}, format="json").status_code, 400)
+
+        User.objects.filter(pk=caregiver.user_id).update(is_active=False)
+        self.assertEqual(client.post(url, {}, format="json").status_code, 401)
+        # A read touching the full user is refused too
+        with self.assertRaises(AuthenticationFailed):
+            ClaimsUser(TenantRefreshToken.for_user(caregiver.user).access_token).email
+
+    def test_token_without_organization_claim_resolves_the_organization(self):
+        # Issued before the organization profile existed: the claim is null
+        user = create_user("late-org@claims.test", UserRoles.ORGANIZATION)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {TenantRefreshToken.for_user(user).access_token}")
+        Organization.objects.create(user=user, name="Late Hospital", acronym="LTH")
+
+        response = client.get("/api/v1/organizations/all-patients/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_without_organization_is_not_found(self):
+        for role in (UserRoles.ORGANIZATION, UserRoles.CAREGIVER):
+            with self.subTest(role=role):
+                user = create_user(f"{role.lower()}-no-org@claims.test", role)
+                response = self.get_with_token(user, "/api/v1/organizations/all-patients/")
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(EMAIL_BACKEND="shared.email_backends.InMemoryEmailBackend")
+class EmailBatchTests(SimpleTestCase):
+
+    def setUp(self):
+        InMemoryEmailBackend.reset()
+        self.addCleanup(InMemoryEmailBackend.reset)
+        mail.outbox = []
+
+    def messages(self, *recipients):
+        return [EmailMessage("Hello", "<p>Hi</p>", "noreply@medipt.test", [recipient]) for recipient in recipients]
+
+    def test_deliver_uses_one_connection_and_reports_failures(self):
+        InMemoryEmailBackend.failing_recipients = {"busy@medipt.test": 450}
+        failures = BaseEmailService.deliver(self.messages("a@medipt.test", "busy@medipt.test", "b@medipt.test"))
+        self.assertEqual(InMemoryEmailBackend.connections_opened, 1)
+        self.assertEqual([message.to for message, _ in failures], [["busy@medipt.test"]])
+        self.assertEqual([message.to for message in mail.outbox], [["a@medipt.test"], ["b@medipt.test"]])
+
+    def test_batch_retries_only_transient_failures(self):
+        InMemoryEmailBackend.failing_recipients = {"busy@medipt.test": 450, "unknown@medipt.test": 550}
+        payload = [BaseEmailService.serialize_message(message) for message in self.messages("a@medipt.test", "busy@medipt.test", "unknown@medipt.test")]
+        send_email_batch.apply(args=[payload])
+        # One connection for the batch and one per retry of the transient failure only
+        self.assertEqual(InMemoryEmailBackend.connections_opened, 1 + send_email_batch.max_retries)
+        self.assertEqual([message.to for message in mail.outbox], [["a@medipt.test"]])
+
+    def test_failed_connection_fails_every_message_transiently(self):
+        with mock.patch.object(InMemoryEmailBackend, "open", side_effect=smtplib.SMTPAuthenticationError(535, b"Bad credentials")):
+            failures = BaseEmailService.deliver(self.messages("a@medipt.test", "b@medipt.test"))
+        self.assertEqual([message.to for message, _ in failures], [["a@medipt.test"], ["b@medipt.test"]])
+        self.assertFalse(any(BaseEmailService.is_permanent_failure(error) for _, error in failures))
+        self.assertEqual(mail.outbox, [])
+
+    def test_batch_retries_every_message_after_a_failed_connection(self):
+        payload = [BaseEmailService.serialize_message(message) for message in self.messages("a@medipt.test", "b@medipt.test")]
+        with mock.patch.object(InMemoryEmailBackend, "open", side_effect=[ConnectionRefusedError("Connection refused"), True]):
+            send_email_batch.apply(args=[payload])
+        self.assertEqual([message.to for message in mail.outbox], [["a@medipt.test"], ["b@medipt.test"]])
+
+    def test_serialization_round_trip(self):
+        message = self.messages("a@medipt.test")[0]
+        message.content_subtype = "html"
+        restored = BaseEmailService.deserialize_message(BaseEmailService.serialize_message(message))
+        self.assertEqual((restored.subject, restored.body, restored.to, restored.content_subtype), ("Hello", "<p>Hi</p>", ["a@medipt.test"], "html"))
+
+
+class EmailTemplateRendererTests(SimpleTestCase):
+    template = "organizations/mails/patient_welcome_mail.html"
+
+    def contexts(self):
+        return [
+            {"organization_name": "Render Hospital", "patient_email": f"patient{i}@medipt.test", "patient_full_name": name, "login_url": "https://medipt.test/login"}
+            for i, name in enumerate(["Ada Obi", "<b>Tom & Jerry</b>", "Zainab O'Neil"])
+        ]
+
+    def test_render_matches_the_project_engine(self):
+        for context in self.contexts():
+            self.assertEqual(EmailTemplateRenderer.render(self.template, context), render_to_string(self.template, context))
+        self.assertIn("&lt;b&gt;Tom &amp; Jerry&lt;/b&gt;", EmailTemplateRenderer.render(self.template, self.contexts()[1]))
+
+    def test_render_many_renders_every_context_in_order(self):
+        contexts = self.contexts()
+        self.assertEqual(EmailTemplateRenderer.render_many(self.template, contexts), [render_to_string(self.template, context) for context in contexts])
+        self.assertEqual(EmailTemplateRenderer.render_many(self.template, []), [])
+
+    def test_build_emails_renders_each_recipient(self):
+        items = [("Welcome", context, [context["patient_email"]]) for context in self.contexts()]
+        messages = BaseEmailService.build_emails(self.template, items)
+        self.assertEqual([message.to for message in messages], [[f"patient{i}@medipt.test"] for i in range(3)])
+        self.assertEqual([message.body for message in messages], [EmailTemplateRenderer.render(self.template, context) for _, context, _ in items])
+        self.assertEqual({message.content_subtype for message in messages}, {"html"})
@@ -0,0 +1,25 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+from shared.mixins import resolve_user_organization
+
+
+class TenantRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's role and organization as claims.
+    The claims are copied into every access token minted from it, which lets
+    ClaimsJWTAuthentication authorize and scope requests without loading the user.
+    """
+    ROLE_CLAIM = "role"
+    USER_PK_CLAIM = "user_pk"
+    ORGANIZATION_ID_CLAIM = "organization_id"
+    ORGANIZATION_ACRONYM_CLAIM = "organization_acronym"
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        organization = resolve_user_organization(user)
+
+        token[cls.ROLE_CLAIM] = user.role
+        token[cls.USER_PK_CLAIM] = user.pk
+        token[cls.ORGANIZATION_ID_CLAIM] = organization.pk if organization else None
+        token[cls.ORGANIZATION_ACRONYM_CLAIM] = organization.acronym if organization else None
+        return token
@@ -1,7 +1,5 @@
-from django.db import transaction
 from .models import Caregiver
 from .utils import role_abbreviation
-import uuid
 
 class CaregiverService:
 
@@ -16,22 +14,8 @@ class CaregiverService:
 
     @staticmethod
     def generate_unique_staff_number(organization, caregiver_type):
-        acronym = organization.acronym.upper()
-        role_abbr = role_abbreviation.get(caregiver_type, "UNK")
-
-        # with transaction.atomic():
-        #     last_number = Caregiver.objects.filter(
-        #         organization=organization,
-        #         caregiver_type=caregiver_type
-        #     ).order_by('-id').first()
-        #     if last_number and last_number.staff_number:
-        #         last_count = int(last_number.staff_number.split("_")[-1])
-        #     else:
-        #         last_count = 0
-
-            # next_count = last_count + 1
-        unique_id = uuid.uuid4().hex[:8].upper()
-        return f"{acronym}_{role_abbr}_{unique_id}"
+        from apps.organizations.organization_service import OrganizationSequenceService
+        return OrganizationSequenceService.next_staff_numbers(organization, caregiver_type)[0]
         
     @staticmethod
     def get_profile_picture_url(caregiver):
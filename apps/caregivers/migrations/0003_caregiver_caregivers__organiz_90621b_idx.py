@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caregivers', '0002_caregiver_deleted_at_caregiver_is_deleted'),
+        ('organizations', '0002_organization_deleted_at_organization_is_deleted'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='caregiver',
+            index=models.Index(fields=['organization', 'created_at', 'pkid'], name='caregivers__organiz_90621b_idx'),
+        ),
+    ]
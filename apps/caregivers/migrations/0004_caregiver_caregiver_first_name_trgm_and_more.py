@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:58
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caregivers', '0003_caregiver_caregivers__organiz_90621b_idx'),
+        ('organizations', '0002_organization_deleted_at_organization_is_deleted'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='caregiver',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='gin_trgm_ops'), name='caregiver_first_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='caregiver',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='gin_trgm_ops'), name='caregiver_last_name_trgm'),
+        ),
+    ]
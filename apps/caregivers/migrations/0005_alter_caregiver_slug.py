@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+import shared.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caregivers', '0004_caregiver_caregiver_first_name_trgm_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='caregiver',
+            name='slug',
+            field=shared.fields.UUIDSlugField(blank=True, editable=False, populate_from=('first_name', 'last_name'), unique=True),
+        ),
+    ]
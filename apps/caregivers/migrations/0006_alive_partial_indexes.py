@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caregivers', '0005_alter_caregiver_slug'),
+        ('organizations', '0005_organization_export_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='caregiver',
+            name='caregivers__organiz_90621b_idx',
+        ),
+        migrations.AlterField(
+            model_name='caregiver',
+            name='organization',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='organizations.organization', verbose_name='Organization'),
+        ),
+        migrations.AddIndex(
+            model_name='caregiver',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['organization', 'created_at', 'pkid'], name='caregiver_org_alive_idx'),
+        ),
+    ]
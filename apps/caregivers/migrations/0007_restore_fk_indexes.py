@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caregivers', '0006_alive_partial_indexes'),
+        ('organizations', '0006_organization_acronym_upper_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='caregiver',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='organizations.organization', verbose_name='Organization'),
+        ),
+    ]
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db.models.functions import Upper
 from django.forms import ValidationError
 from shared.models import TimeStampedUUID,SoftDeleteModel
-from autoslug import AutoSlugField
+from shared.fields import UUIDSlugField
 from django.utils.translation import gettext_lazy as _ 
 from shared.validators import validate_phone_number
 from shared.text_choices import Gender,MaritalStatus,CaregiverTypes
@@ -15,7 +17,8 @@ from cloudinary.models import CloudinaryField
 class Caregiver(TimeStampedUUID,SoftDeleteModel):
 
     user = models.OneToOneField(User,on_delete=models.CASCADE)
-    organization = models.ForeignKey(Organization,on_delete=models.PROTECT,verbose_name=_("Organization"))
+    # Also indexed for the PROTECT check and soft-deleted rows, which the partial index of Meta.indexes skips
+    organization = models.ForeignKey(Organization,on_delete=models.PROTECT,verbose_name=_("Organization"),db_index=True)
     first_name = models.CharField(max_length=255,verbose_name=_("Caregiver First Name"),db_index=True)
     last_name = models.CharField(max_length=255,verbose_name=_("Caregiver Last Name"),db_index=True)
     caregiver_type = models.CharField(max_length=30,choices=CaregiverTypes.choices,db_index=True)
@@ -31,13 +34,18 @@ class Caregiver(TimeStampedUUID,SoftDeleteModel):
     gender = models.CharField(max_length=20,choices=Gender.choices,blank=True,null=True)
     phone_number=models.CharField(max_length=15,validators=[validate_phone_number],blank=True,null=True,db_index=True)
     address = models.TextField(verbose_name=_("Caregiver's Address"),blank=True,null=True)
-    slug = AutoSlugField(populate_from='user', unique=True)
+    slug = UUIDSlugField(populate_from=('first_name', 'last_name'))
     staff_number = models.CharField(max_length=30, unique=True,blank=True,null=True)
     
     class Meta:
         verbose_name = _("Caregiver")
         verbose_name_plural = _("Caregivers")
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=['organization', 'created_at', 'pkid'], condition=models.Q(deleted_at__isnull=True), name='caregiver_org_alive_idx'),
+            GinIndex(OpClass(Upper('first_name'), name='gin_trgm_ops'), name='caregiver_first_name_trgm'),
+            GinIndex(OpClass(Upper('last_name'), name='gin_trgm_ops'), name='caregiver_last_name_trgm'),
+        ]
 
     def __str__(self):
         return f"Caregiver account for {self.first_name.title()} {self.last_name.title()} for {self.organization.name.title()} Organization"
@@ -50,6 +58,30 @@ class Caregiver(TimeStampedUUID,SoftDeleteModel):
             )
         super(Caregiver, self).save(*args, **kwargs)
 
+    def delete(self, using=None, keep_parents=False):
+        """Soft delete and remove the caregiver from the organization's dashboard counters"""
+        was_alive = self.deleted_at is None
+        with transaction.atomic():
+            super().delete(using=using, keep_parents=keep_parents)
+            if was_alive:
+                self._record_stats_change(removed=True)
+
+    def restore(self, using=None, keep_parents=False):
+        """Restore and add the caregiver back to the organization's dashboard counters"""
+        was_deleted = self.deleted_at is not None
+        with transaction.atomic():
+            super().restore(using=using, keep_parents=keep_parents)
+            if was_deleted:
+                self._record_stats_change(removed=False)
+
+    def _record_stats_change(self, removed):
+        from apps.organizations.organization_service import OrganizationStatsService
+        counters = OrganizationStatsService.caregiver_counters(self)
+        if removed:
+            OrganizationStatsService.record_change(self.organization_id, before=counters)
+        else:
+            OrganizationStatsService.record_change(self.organization_id, after=counters)
+
     def clean(self):
         if self.date_of_birth and self.date_of_birth > date.today():
             raise ValidationError(_("Date of birth cannot be in the future."))
@@ -4,16 +4,16 @@ from rest_framework.exceptions import PermissionDenied
 from shared.text_choices import UserRoles
 
 class IsCaregiver(BasePermission):
-    """Allows access only to patients for their own records."""
+    """Allows access only to users with the caregiver role."""
 
     message = "You do not have permission to access this data."
 
     def has_permission(self, request, view):
         user = request.user
-        return bool(user and user.role == UserRoles.PATIENT)
+        return bool(user and user.role == UserRoles.CAREGIVER)
 
     def has_object_permission(self, request, view, obj):
-        return request.user and request.user.role == UserRoles.PATIENT
+        return request.user and request.user.role == UserRoles.CAREGIVER
     
 
 class IsCaregiverSelf(BasePermission):
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from shared.cache import CacheNamespaces, TenantCache
+from .models import Caregiver
+
+
+@receiver([post_save, post_delete], sender=Caregiver)
+def invalidate_caregiver_cache(sender, instance, **kwargs):
+    TenantCache.invalidate(instance.organization_id, CacheNamespaces.CAREGIVERS)
@@ -1,3 +1,30 @@
 from django.test import TestCase
+from apps.accounts.models import User
+from shared.mixins import resolve_user_organization
+from shared.testing import client_for, create_caregiver, create_organization
 
 # Create your tests here.
+
+class OrganizationContextQueryCountTests(TestCase):
+    """
+    Query-count regression tests for the caregiver views using OrganizationContextMixin.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@qcount-caregivers.test", "Query Count Centre", "QCX")
+        cls.caregiver = create_caregiver(cls.organization, "caregiver@qcount-caregivers.test", caregiver_type="Nurse")
+
+    def test_caregiver_profile(self):
+        client = client_for(self.organization.user_id)
+        with self.assertNumQueries(2):
+            response = client.get(f"/api/v1/caregiver/caregiver-profile-view/{self.caregiver.id}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_caregiver_organization_is_resolved_with_one_query(self):
+        user = User.objects.get(pk=self.caregiver.user_id)
+        with self.assertNumQueries(1):
+            organization = resolve_user_organization(user)
+            caregiver = user.caregiver
+        self.assertEqual(organization, self.organization)
+        self.assertEqual(caregiver, self.caregiver)
@@ -24,8 +24,8 @@ class CaregiverProfileView(OrganizationContextMixin, generics.RetrieveUpdateAPIV
     lookup_field = 'id'
 
     def get_queryset(self):
-        organization = self.get_organization()
-        return Caregiver.objects.filter(organization=organization)
+        organization_id = self.get_organization_id()
+        return Caregiver.objects.filter(organization_id=organization_id)
 
     def get_object(self):
         try:
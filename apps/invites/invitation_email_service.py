@@ -20,24 +20,47 @@ class InvitationEmailService(BaseEmailService):
     Extends BaseEmailService for consistency across all email flows.
     """
 
+    INVITATION_TEMPLATE = "invites/emails/caregiver_invitation_email.html"
+
     @staticmethod
     def send_caregiver_invitation_email(invitation, frontend_url=None):
-        accept_link = f"{frontend_url or settings.REACT_FRONTEND_URL}/caregivers/accept-invitation/{invitation.token}"
-        context = {
+        try:
+            InvitationEmailService.build_caregiver_invitation_email(invitation, frontend_url).send(fail_silently=False)
+            logger.info(f"Sent caregiver invitation to {invitation.email}")
+        except Exception as e:
+            logger.error(f"Failed to send caregiver invitation to {invitation.email}: {e}")
+
+    @staticmethod
+    def build_caregiver_invitation_email(invitation, frontend_url=None):
+        return InvitationEmailService.build_email(
+            subject=InvitationEmailService.caregiver_invitation_subject(invitation),
+            template=InvitationEmailService.INVITATION_TEMPLATE,
+            context=InvitationEmailService.caregiver_invitation_context(invitation, frontend_url),
+            recipient_list=[invitation.email],
+        )
+
+    @staticmethod
+    def build_caregiver_invitation_emails(invitations, frontend_url=None):
+        """Build the invitation emails of many invitations, rendering the template once per batch."""
+        return InvitationEmailService.build_emails(InvitationEmailService.INVITATION_TEMPLATE, [
+            (
+                InvitationEmailService.caregiver_invitation_subject(invitation),
+                InvitationEmailService.caregiver_invitation_context(invitation, frontend_url),
+                [invitation.email],
+            )
+            for invitation in invitations
+        ])
+
+    @staticmethod
+    def caregiver_invitation_subject(invitation):
+        return f"Invitation to join {invitation.organization.name} as a {invitation.role}"
+
+    @staticmethod
+    def caregiver_invitation_context(invitation, frontend_url=None):
+        return {
             "organization_name": invitation.organization.name,
             "invitation_email": invitation.email,
             "invitation_role": invitation.role,
-            "accept_link": accept_link,
+            "accept_link": f"{frontend_url or settings.REACT_FRONTEND_URL}/caregivers/accept-invitation/{invitation.token}",
             "expiry_days": getattr(settings, "INVITATION_EXPIRY_DAYS", 7),
         }
-
-        try:
-            InvitationEmailService.send_email(
-                subject=f"Invitation to join {invitation.organization.name} as a {invitation.role}",
-                template="invites/emails/caregiver_invitation_email.html",
-                context=context,
-                recipient_list=[invitation.email],
-            )
-            logger.info(f"Sent caregiver invitation to {invitation.email}")
-        except Exception as e:
-            logger.error(f"Failed to send caregiver invitation to {invitation.email}: {e}")
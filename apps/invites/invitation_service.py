@@ -0,0 +1,111 @@
+import uuid
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from apps.accounts.models import User
+from .models import CaregiverInvite, InvitationStatus, default_expires_at
+from .tasks import send_caregiver_invitations
+
+
+class CaregiverBulkInvitationService:
+    """
+    Invites many caregivers of an organization at once: one query for the emails that already
+    have an account, one for the organization's existing invitations, a single upsert on the
+    `unique_invite_per_org` constraint and one fan-out task for the emails.
+    """
+    UPDATED_FIELDS = ["role", "token", "expires_at", "status", "invited_by", "resend_count", "updated_at"]
+
+    @staticmethod
+    def max_rows():
+        return getattr(settings, "BULK_CAREGIVER_INVITATION_MAX_ROWS", 500)
+
+    @staticmethod
+    def existing_user_emails(emails):
+        """The given (lowercased) emails that already belong to an account, in one query."""
+        if not emails:
+            return set()
+        return set(
+            User.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=emails)
+            .order_by()
+            .values_list("email_lower", flat=True)
+        )
+
+    @staticmethod
+    def existing_invitations(organization, emails, lock=False):
+        """The organization's invitations for the given (lowercased) emails, keyed by email."""
+        if not emails:
+            return {}
+        queryset = CaregiverInvite.objects.filter(organization=organization, email__in=emails).order_by()
+        if lock:
+            queryset = queryset.select_for_update()
+        return {
+            email: (status, expires_at, resend_count)
+            for email, status, expires_at, resend_count in queryset.values_list("email", "status", "expires_at", "resend_count")
+        }
+
+    @staticmethod
+    def rejection(invitation, now=None):
+        """
+        Why an existing invitation, given as (status, expires_at, resend_count), cannot be sent
+        again: a (code, message) pair, or None when it can be renewed.
+        """
+        status, expires_at, resend_count = invitation
+        if status == InvitationStatus.ACCEPTED:
+            return "invitation_already_accepted", "Invitation has already been accepted."
+        if status == InvitationStatus.PENDING and expires_at >= (now or timezone.now()):
+            return "active_invitation_exists", "An active invitation already exists for this email."
+        if resend_count >= getattr(settings, "MAX_INVITATION_RESENDS", 3):
+            return "max_resends_exceeded", "Maximum resend limit reached for this invitation."
+        return None
+
+    @staticmethod
+    def invite_caregivers(rows, organization, invited_by):
+        """
+        Create or renew, in one upsert, the invitations of already validated rows: `email`
+        (lowercased), `role` and `resend_count` (None for a first invitation). The emails are
+        sent by one fan-out task once the transaction commits. Returns the invitations.
+        """
+        if not rows:
+            return []
+
+        invitations = [
+            CaregiverInvite(
+                email=row["email"],
+                organization=organization,
+                role=row["role"],
+                token=uuid.uuid4(),
+                expires_at=default_expires_at(),
+                status=InvitationStatus.PENDING,
+                invited_by=invited_by,
+                resend_count=0 if row.get("resend_count") is None else row["resend_count"] + 1,
+            )
+            for row in rows
+        ]
+        with transaction.atomic():
+            CaregiverInvite.objects.bulk_create(
+                invitations,
+                update_conflicts=True,
+                unique_fields=["email", "organization"],
+                update_fields=CaregiverBulkInvitationService.UPDATED_FIELDS,
+            )
+            tokens = [str(invitation.token) for invitation in invitations]
+            transaction.on_commit(lambda: send_caregiver_invitations.delay(tokens))
+
+        return invitations
+
+
+class CaregiverInvitationExpiryService:
+    """
+    Marks pending invitations past their expiry date as EXPIRED, in one UPDATE served by the
+    partial (status, expires_at) index. Run periodically by `expire_caregiver_invitations`;
+    readers never write, they compare `expires_at` themselves (`CaregiverInvite.is_expired`).
+    """
+
+    @staticmethod
+    def expire_stale_invitations(now=None):
+        now = now or timezone.now()
+        return CaregiverInvite.objects.filter(status=InvitationStatus.PENDING, expires_at__lt=now).update(
+            status=InvitationStatus.EXPIRED, updated_at=now
+        )
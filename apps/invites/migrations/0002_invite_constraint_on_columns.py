@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invites', '0001_initial'),
+    ]
+
+    operations = [
+        # The previous constraint on Lower("email") guarantees this creates no duplicates
+        migrations.RunSQL(
+            sql="UPDATE invites_caregiverinvite SET email = LOWER(email) WHERE email <> LOWER(email)",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RemoveConstraint(
+            model_name='caregiverinvite',
+            name='unique_invite_per_org',
+        ),
+        migrations.AddConstraint(
+            model_name='caregiverinvite',
+            constraint=models.UniqueConstraint(fields=('email', 'organization'), name='unique_invite_per_org'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invites', '0002_invite_constraint_on_columns'),
+        ('organizations', '0005_organization_export_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='caregiverinvite',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['status', 'expires_at'], name='invite_pending_expiry_idx'),
+        ),
+    ]
@@ -1,7 +1,6 @@
 from django.db import models
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from django.db.models.functions import Lower
 from apps.organizations.models import Organization
 from shared.models import TimeStampedUUID
 from shared.text_choices import CaregiverTypes
@@ -38,10 +37,14 @@ class CaregiverInvite(TimeStampedUUID):
         verbose_name_plural = _("Caregiver Invitations")
         ordering = ["-created_at"]
         constraints = [
-            models.UniqueConstraint(Lower("email"),"organization",name="unique_invite_per_org")
+            # Emails are stored lowercased (see clean()), so plain columns suffice and the
+            # constraint can serve as the ON CONFLICT target of bulk invitations
+            models.UniqueConstraint(fields=["email","organization"],name="unique_invite_per_org")
         ]
         indexes = [
             models.Index(fields=["token"]),  # Optimize token lookups
+            # Only pending invitations can expire: keeps the expiry sweep an index range scan
+            models.Index(fields=["status","expires_at"],condition=models.Q(status="PENDING"),name="invite_pending_expiry_idx"),
         ]
 
     def __str__(self):
@@ -57,9 +60,12 @@ class CaregiverInvite(TimeStampedUUID):
             raise ValidationError(f"role: Invalid role: {self.role}")
         self.email = self.email.lower()
 
-    def save(self, *args, **kwargs):
-        """Ensure email is lowercase and validate before saving."""
-        self.full_clean()  # Run clean() before saving
-        if self.status != InvitationStatus.EXPIRED and self.is_expired():
-            self.status = InvitationStatus.EXPIRED
+    def save(self, *args, skip_full_clean=False, **kwargs):
+        """
+        Ensure email is lowercase and validate before saving. Internal updates of already
+        validated invitations (status changes, renewals) can pass `skip_full_clean=True` to
+        save without the validation queries.
+        """
+        if not skip_full_clean:
+            self.full_clean()  # Run clean() before saving
         super().save(*args, **kwargs)
@@ -3,8 +3,10 @@ from django.utils import timezone
 from django.db import transaction
 from apps.accounts.models import User
 from apps.caregivers.models import Caregiver
-from shared.text_choices import UserRoles
+from apps.organizations.organization_service import OrganizationStatsService
+from shared.text_choices import UserRoles, CaregiverTypes
 from .models import CaregiverInvite, InvitationStatus
+from .invitation_service import CaregiverBulkInvitationService
 from .exceptions import (
     CaregiverInvitationException,
     ActiveInvitationExistsException,
@@ -69,23 +71,22 @@ class CaregiverAcceptInvitationSerializer(serializers.Serializer):
         if data["password"] != data["password_confirmation"]:
             raise CaregiverInvitationException(detail={"password_confirmation": "Passwords do not match."},code="password_mismatch")
 
-        token = self.context.get("token")
-        if not token:
-            raise InvalidInvitationTokenException()
-
-        invitation = CaregiverInvite.objects.filter(
-            token=token
-        ).first()  # Removed deleted_at__isnull=True
+        # The view passes the invitation it already loaded (and locked)
+        invitation = self.context.get("invitation")
+        if invitation is None:
+            token = self.context.get("token")
+            if not token:
+                raise InvalidInvitationTokenException()
+            invitation = CaregiverInvite.objects.select_related("organization").filter(token=token).first()
 
         if not invitation:
             raise InvitationNotFoundException()
 
-        if invitation.status != InvitationStatus.PENDING:
-            raise InvitationAlreadyAcceptedException()
+        # Expiry is read from expires_at; the status is flagged by the periodic sweep
         if invitation.is_expired():
-            invitation.status = InvitationStatus.EXPIRED
-            invitation.save()
             raise InvitationExpiredException()
+        if invitation.status != InvitationStatus.PENDING:
+            raise InvitationAlreadyAcceptedException()
 
         if Caregiver.objects.filter(user__email__iexact=invitation.email).exists():
             raise CaregiverInvitationException(
@@ -119,6 +120,98 @@ class CaregiverAcceptInvitationSerializer(serializers.Serializer):
             )
 
             invitation.status = InvitationStatus.ACCEPTED
-            invitation.save()
+            invitation.save(skip_full_clean=True, update_fields=["status", "updated_at"])
 
-        return caregiver
\ No newline at end of file
+            OrganizationStatsService.record_change(
+                caregiver.organization_id, after=OrganizationStatsService.caregiver_counters(caregiver)
+            )
+
+        return caregiver
+
+
+class CaregiverBulkInvitationRowSerializer(serializers.Serializer):
+    """One row of a bulk caregiver invitation."""
+    email = serializers.EmailField()
+    role = serializers.ChoiceField(choices=CaregiverTypes.choices)
+
+    def validate_email(self, value):
+        return value.lower()
+
+
+class CaregiverBulkInvitationSerializer(serializers.Serializer):
+    """
+    Validates every row up front against existing accounts and the organization's invitations,
+    in one query each. By default a single invalid row rejects the whole batch; with
+    `partial_success` the valid rows are invited and the invalid ones reported.
+    Must run inside a transaction: existing invitations stay locked until they are renewed.
+    """
+    invitations = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    partial_success = serializers.BooleanField(default=False)
+
+    def validate_invitations(self, rows):
+        max_rows = CaregiverBulkInvitationService.max_rows()
+        if len(rows) > max_rows:
+            raise serializers.ValidationError(f"At most {max_rows} caregivers can be invited per request.")
+        return rows
+
+    def validate(self, attrs):
+        errors, valid = {}, []
+        for number, row in enumerate(attrs['invitations'], start=1):
+            row_serializer = CaregiverBulkInvitationRowSerializer(data=row)
+            if row_serializer.is_valid():
+                valid.append((number, dict(row_serializer.validated_data)))
+            else:
+                errors[number] = row_serializer.errors
+
+        emails = {data['email'] for _, data in valid}
+        taken = CaregiverBulkInvitationService.existing_user_emails(emails)
+        existing = CaregiverBulkInvitationService.existing_invitations(self.context['organization'], emails, lock=True)
+        seen = set()
+        for number, data in valid:
+            email = data['email']
+            rejection = CaregiverBulkInvitationService.rejection(existing[email]) if email in existing else None
+            if email in seen:
+                errors[number] = {'email': ["This email appears more than once in the request."]}
+            elif email in taken:
+                errors[number] = {'email': ["A user with this email already exists."]}
+            elif rejection:
+                errors[number] = {'email': [rejection[1]]}
+            elif email in existing:
+                data['resend_count'] = existing[email][2]
+            seen.add(email)
+
+        if errors and not attrs['partial_success']:
+            raise serializers.ValidationError({'invitations': errors})
+
+        attrs['valid_rows'] = [(number, data) for number, data in valid if number not in errors]
+        attrs['row_errors'] = errors
+        return attrs
+
+    def create(self, validated_data):
+        valid_rows = validated_data['valid_rows']
+        invitations = CaregiverBulkInvitationService.invite_caregivers(
+            [data for _, data in valid_rows], self.context['organization'], self.context['request'].user
+        )
+
+        results = {
+            number: {
+                'row': number,
+                'status': 'reinvited' if data.get('resend_count') is not None else 'invited',
+                'email': invitation.email,
+                'role': invitation.role,
+                'expires_at': invitation.expires_at,
+            }
+            for (number, data), invitation in zip(valid_rows, invitations)
+        }
+        results.update({
+            number: {'row': number, 'status': 'failed', 'errors': row_errors}
+            for number, row_errors in validated_data['row_errors'].items()
+        })
+        return {
+            'invited': len(invitations),
+            'failed': len(validated_data['row_errors']),
+            'results': [results[number] for number in sorted(results)],
+        }
+
+    def to_representation(self, instance):
+        return instance
@@ -3,7 +3,7 @@ from celery import shared_task
 from celery.exceptions import MaxRetriesExceededError
 from apps.invites.exceptions import EmailSendingFailedException
 from .invitation_email_service import InvitationEmailService
-from .models import CaregiverInvite
+from .models import CaregiverInvite, InvitationStatus
 
 logger = logging.getLogger(__name__)
 
@@ -34,3 +34,25 @@ def send_invitation_to_caregiver(self, invitation_id, frontend_url=None):
             raise EmailSendingFailedException(
                 f"Failed to send invitation email after {self.max_retries} attempts."
             )
+
+
+@shared_task
+def send_caregiver_invitations(tokens, frontend_url=None):
+    """
+    Fan-out for bulk invitations: renders the emails of the still pending invitations in one
+    pass and hands them to `send_email_batch` tasks, which send the batches in parallel.
+    """
+    invitations = list(
+        CaregiverInvite.objects.filter(token__in=tokens, status=InvitationStatus.PENDING).select_related("organization")
+    )
+    messages = InvitationEmailService.build_caregiver_invitation_emails(invitations, frontend_url)
+    InvitationEmailService.queue_messages(messages)
+    logger.info(f"Queued {len(messages)} caregiver invitation emails")
+
+
+@shared_task
+def expire_caregiver_invitations():
+    """Periodically flag the pending invitations past their expiry date as EXPIRED."""
+    from .invitation_service import CaregiverInvitationExpiryService
+    count = CaregiverInvitationExpiryService.expire_stale_invitations()
+    logger.info(f"Expired {count} caregiver invitations")
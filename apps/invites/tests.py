@@ -1,3 +1,174 @@
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.accounts.models import IdempotencyRecord
+from shared.idempotency import IdempotencyStore
+from shared.testing import client_for, create_organization, create_user
+from shared.text_choices import UserRoles
+from .models import CaregiverInvite, InvitationStatus
+from .invitation_service import CaregiverInvitationExpiryService
+from .tasks import send_caregiver_invitations
 
 # Create your tests here.
+
+class BulkInviteCaregiversTests(TestCase):
+    url = "/api/v1/invites/bulk-invite-caregivers/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@invite.test", "Invite Hospital", "INV")
+        create_user("taken@invite.test", UserRoles.CAREGIVER)
+        CaregiverInvite.objects.create(email="expired@invite.test", organization=cls.organization, role="Nurse", resend_count=1)
+        CaregiverInvite.objects.filter(email="expired@invite.test").update(expires_at=timezone.now() - timedelta(days=1))
+        CaregiverInvite.objects.create(email="pending@invite.test", organization=cls.organization, role="Nurse")
+
+    def setUp(self):
+        self.client = client_for(self.organization.user_id)
+
+    def test_invites_and_renews_in_one_upsert(self):
+        rows = [{"email": f"New{i}@Invite.test", "role": "Doctor"} for i in range(3)] + [{"email": "expired@invite.test", "role": "Surgeon"}]
+        expired = CaregiverInvite.objects.get(email="expired@invite.test")
+        with mock.patch("apps.invites.invitation_service.send_caregiver_invitations") as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                # organization, user lookup, invitation lookup and upsert, plus savepoints
+                with self.assertNumQueries(8):
+                    response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["invited"], 4)
+        self.assertEqual([result["status"] for result in response.data["results"]], ["invited"] * 3 + ["reinvited"])
+        send.delay.assert_called_once()
+        self.assertEqual(len(send.delay.call_args.args[0]), 4)
+
+        renewed = CaregiverInvite.objects.get(email="expired@invite.test")
+        self.assertEqual((renewed.id, renewed.role, renewed.status, renewed.resend_count), (expired.id, "Surgeon", InvitationStatus.PENDING, 2))
+        self.assertNotEqual(renewed.token, expired.token)
+        self.assertGreater(renewed.expires_at, timezone.now())
+        self.assertTrue(CaregiverInvite.objects.filter(email="new0@invite.test", organization=self.organization).exists())
+
+    def test_invalid_row_rejects_the_batch(self):
+        rows = [{"email": "new@invite.test", "role": "Doctor"}, {"email": "pending@invite.test", "role": "Doctor"}]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CaregiverInvite.objects.filter(email="new@invite.test").exists())
+
+    def test_partial_success_reports_failed_rows(self):
+        rows = [
+            {"email": "new@invite.test", "role": "Doctor"},
+            {"email": "TAKEN@invite.test", "role": "Doctor"},
+            {"email": "pending@invite.test", "role": "Doctor"},
+            {"email": "new@invite.test", "role": "Nurse"},
+            {"email": "other@invite.test", "role": "Janitor"},
+        ]
+        with self.captureOnCommitCallbacks(execute=False):
+            response = self.client.post(f"{self.url}?partial_success=true", rows, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result["status"] for result in response.data["results"]], ["invited", "failed", "failed", "failed", "failed"])
+
+    def test_fan_out_queues_the_pending_invitations(self):
+        CaregiverInvite.objects.create(email="accepted@invite.test", organization=self.organization, role="Nurse", status=InvitationStatus.ACCEPTED)
+        tokens = [str(token) for token in CaregiverInvite.objects.values_list("token", flat=True)]
+        with mock.patch("apps.invites.tasks.InvitationEmailService.queue_messages") as queue:
+            send_caregiver_invitations(tokens)
+        messages = queue.call_args.args[0]
+        self.assertEqual(sorted(message.to[0] for message in messages), ["expired@invite.test", "pending@invite.test"])
+        self.assertIn("Invite Hospital", messages[0].subject)
+        self.assertIn(str(CaregiverInvite.objects.get(email=messages[0].to[0]).token), messages[0].body)
+
+
+class InvitationExpiryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@expiry.test", "Expiry Hospital", "EXP")
+        past = timezone.now() - timedelta(hours=1)
+        for email, status in [("stale@expiry.test", InvitationStatus.PENDING), ("accepted@expiry.test", InvitationStatus.ACCEPTED), ("fresh@expiry.test", InvitationStatus.PENDING)]:
+            CaregiverInvite.objects.create(email=email, organization=cls.organization, role="Nurse", status=status)
+        CaregiverInvite.objects.exclude(email="fresh@expiry.test").update(expires_at=past)
+
+    def test_sweep_expires_stale_pending_invitations_in_one_update(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(CaregiverInvitationExpiryService.expire_stale_invitations(), 1)
+        self.assertEqual(
+            dict(CaregiverInvite.objects.values_list("email", "status")),
+            {"stale@expiry.test": InvitationStatus.EXPIRED, "accepted@expiry.test": InvitationStatus.ACCEPTED, "fresh@expiry.test": InvitationStatus.PENDING},
+        )
+
+    def test_accepting_an_expired_invitation_does_not_write(self):
+        invitation = CaregiverInvite.objects.get(email="stale@expiry.test")
+        data = {"first_name": "Late", "last_name": "Nurse", "password": "Str0ng!Passw0rd", "password_confirmation": "Str0ng!Passw0rd"}
+        # Savepoint, the locked lookup, rollback and release: no UPDATE
+        with self.assertNumQueries(4):
+            response = APIClient().post(f"/api/v1/invites/caregivers/invite/accept/{invitation.token}/", data, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["code"], "invitation_expired")
+        self.assertEqual(CaregiverInvite.objects.get(pk=invitation.pk).status, InvitationStatus.PENDING)
+
+    def test_accepting_a_pending_invitation(self):
+        invitation = CaregiverInvite.objects.get(email="fresh@expiry.test")
+        data = {"first_name": "New", "last_name": "Nurse", "password": "Str0ng!Passw0rd", "password_confirmation": "Str0ng!Passw0rd"}
+        response = APIClient().post(f"/api/v1/invites/caregivers/invite/accept/{invitation.token}/", data, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(CaregiverInvite.objects.get(pk=invitation.pk).status, InvitationStatus.ACCEPTED)
+
+
+class IdempotentInviteCaregiverTests(TestCase):
+    url = "/api/v1/invites/invite-caregiver/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@idempotent.test", "Idempotent Hospital", "IDM")
+
+    def setUp(self):
+        cache.clear()
+        self.client = client_for(self.organization.user_id)
+
+    def invite(self, data, key="retry-1"):
+        with mock.patch("apps.invites.views.send_invitation_to_caregiver") as send:
+            response = self.client.post(self.url, data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+        return response, send
+
+    def test_retry_replays_the_response_without_writing(self):
+        data = {"email": "nurse@idempotent.test", "role": "Nurse"}
+        first, send = self.invite(data)
+        self.assertEqual(first.status_code, 201)
+        send.delay.assert_called_once()
+
+        # Served from the cache: no query at all
+        with self.assertNumQueries(0):
+            retry, send = self.invite(data)
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        send.delay.assert_not_called()
+        self.assertEqual(CaregiverInvite.objects.filter(email="nurse@idempotent.test").count(), 1)
+
+    def test_replays_from_the_database_when_the_cache_lost_the_key(self):
+        data = {"email": "doctor@idempotent.test", "role": "Doctor"}
+        first, _ = self.invite(data)
+        cache.clear()
+        with self.assertNumQueries(1):
+            retry, send = self.invite(data)
+        self.assertEqual((retry.status_code, retry.data), (201, first.data))
+        send.delay.assert_not_called()
+
+    def test_key_reused_for_another_payload_is_rejected(self):
+        self.invite({"email": "first@idempotent.test", "role": "Nurse"})
+        response, send = self.invite({"email": "second@idempotent.test", "role": "Nurse"})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.data["code"], "idempotency_key_reused")
+        self.assertFalse(CaregiverInvite.objects.filter(email="second@idempotent.test").exists())
+
+    def test_failed_request_is_not_stored(self):
+        create_user("taken@idempotent.test", UserRoles.CAREGIVER)
+        response, _ = self.invite({"email": "taken@idempotent.test", "role": "Nurse"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyRecord.objects.exists())
+
+    def test_expired_records_are_purged(self):
+        self.invite({"email": "old@idempotent.test", "role": "Nurse"}, key="old")
+        self.invite({"email": "new@idempotent.test", "role": "Nurse"}, key="new")
+        IdempotencyRecord.objects.filter(key="old").update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(IdempotencyStore.purge_expired(), 1)
+        self.assertEqual(list(IdempotencyRecord.objects.values_list("key", flat=True)), ["new"])
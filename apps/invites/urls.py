@@ -1,7 +1,8 @@
 from django.urls import path,include
-from .views import InviteCaregiverView,CaregiverAcceptInvitationView
+from .views import InviteCaregiverView,CaregiverAcceptInvitationView,BulkInviteCaregiversView
 
 urlpatterns = [
     path('invite-caregiver/', InviteCaregiverView.as_view(), name='invite-caregiver'),
+    path('bulk-invite-caregivers/', BulkInviteCaregiversView.as_view(), name='bulk-invite-caregivers'),
     path('caregivers/invite/accept/<uuid:token>/',CaregiverAcceptInvitationView.as_view(),name="caregiver_accept_invitation",),   
 ]
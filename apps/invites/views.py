@@ -4,14 +4,17 @@ from django.utils import timezone
 from django.db import transaction
 from django.conf import settings
 from rest_framework import status
+from rest_framework.exceptions import APIException
 from rest_framework.generics import CreateAPIView
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.throttling import UserRateThrottle
 from rest_framework.response import Response
 from drf_yasg.utils import swagger_auto_schema
+from shared.idempotency import IdempotentCreateMixin
 from apps.organizations.permissions import IsOrganization
 from apps.invites.models import CaregiverInvite, InvitationStatus
-from apps.invites.serializers import CaregiverInvitationSerializer, CaregiverAcceptInvitationSerializer
+from apps.invites.serializers import CaregiverInvitationSerializer, CaregiverAcceptInvitationSerializer, CaregiverBulkInvitationSerializer
 from apps.invites.tasks import send_invitation_to_caregiver
 from apps.invites.exceptions import (
     CaregiverInvitationException,
@@ -34,10 +37,11 @@ def default_expires_at():
     return timezone.now() + timezone.timedelta(days=settings.INVITATION_EXPIRY_DAYS)
 
 
-class InviteCaregiverView(CreateAPIView):
+class InviteCaregiverView(IdempotentCreateMixin, CreateAPIView):
     """
     Allows an organization to invite a caregiver via email.
-    Uses Celery for async email sending and handles re-invites safely.
+    Uses Celery for async email sending and handles re-invites safely. Honors the
+    `Idempotency-Key` header, so a retried request sends the invitation once.
     """
     serializer_class = CaregiverInvitationSerializer
     permission_classes = [IsAuthenticated, IsOrganization]
@@ -70,7 +74,7 @@ class InviteCaregiverView(CreateAPIView):
                 existing_invite.resend_count += 1
                 existing_invite.status = InvitationStatus.PENDING
                 existing_invite.invited_by = request.user
-                existing_invite.save()
+                existing_invite.save(skip_full_clean=True)
                 invitation = existing_invite
             else:
                 invitation = serializer.save(invited_by=request.user)
@@ -89,9 +93,13 @@ class InviteCaregiverView(CreateAPIView):
 
     def create(self, request, *args, **kwargs):
         """Overrides default create() to provide a custom success response."""
+        return self.idempotent(request, self.invite, *args, **kwargs)
+
+    def invite(self, request, *args, **kwargs):
         try:
-            response = super().create(request, *args, **kwargs)
-            invitation = self.get_queryset().filter(email=request.data["email"]).last()
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            invitation = self.perform_create(serializer)
             return Response(
                 {
                     "message": "Invitation created successfully. Email is being sent.", 
@@ -104,7 +112,7 @@ class InviteCaregiverView(CreateAPIView):
                 },
                 status=status.HTTP_201_CREATED,
             )
-        except CaregiverInvitationException as e:
+        except APIException as e:
             raise e
         except Exception as e:
             logger.exception("Error while creating caregiver invitation.")
@@ -113,6 +121,31 @@ class InviteCaregiverView(CreateAPIView):
 
 
 
+class BulkInviteCaregiversView(APIView):
+    """
+    Invites many caregivers in one request, from a JSON array of {"email", "role"} objects or
+    {"invitations": [...], "partial_success": true}. Returns a result per row; the emails are
+    sent in the background.
+    """
+    permission_classes = [IsAuthenticated, IsOrganization]
+    throttle_classes = [UserRateThrottle]
+
+    def post(self, request, *args, **kwargs):
+        payload = {'invitations': request.data} if isinstance(request.data, list) else request.data
+        if isinstance(request.data, list) and 'partial_success' in request.query_params:
+            payload['partial_success'] = request.query_params['partial_success']
+
+        with transaction.atomic():
+            serializer = CaregiverBulkInvitationSerializer(
+                data=payload,
+                context={'request': request, 'organization': request.user.organization},
+            )
+            serializer.is_valid(raise_exception=True)
+            result = serializer.save()
+        return Response(result, status=status.HTTP_201_CREATED if result['invited'] else status.HTTP_200_OK)
+
+
+
 
 class CaregiverAcceptInvitationView(CreateAPIView):
     """
@@ -129,19 +162,18 @@ class CaregiverAcceptInvitationView(CreateAPIView):
 
         try:
             with transaction.atomic():
-                invitation = CaregiverInvite.objects.filter(token=token).first()
+                # Locked so that concurrent submissions cannot both accept it
+                invitation = CaregiverInvite.objects.select_for_update(of=("self",)).select_related("organization").filter(token=token).first()
                 if not invitation:
                     raise InvitationNotFoundException()
                 if invitation.is_expired():
-                    invitation.status = InvitationStatus.EXPIRED
-                    invitation.save()
                     raise InvitationExpiredException()
                 if invitation.status != InvitationStatus.PENDING:
                     raise InvitationAlreadyAcceptedException()
 
                 serializer = self.get_serializer(
                     data=request.data,
-                    context={"token": token}
+                    context={"token": token, "invitation": invitation}
                 )
                 serializer.is_valid(raise_exception=True)
                 caregiver = serializer.save()
@@ -158,8 +190,8 @@ class CaregiverAcceptInvitationView(CreateAPIView):
                     status=status.HTTP_201_CREATED,
                 )
 
-        except CaregiverInvitationException as e:
-            raise e  # Custom handled
+        except APIException as e:
+            raise e  # Custom handled, validation errors included
         except Exception as e:
             raise CaregiverInvitationException(
                 detail=str(e),
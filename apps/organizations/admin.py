@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Organization
+from .models import Organization, OrganizationStats, OrganizationExportJob
 
 @admin.register(Organization)
 class OrganizationAdmin(admin.ModelAdmin):
@@ -9,3 +9,18 @@ class OrganizationAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
 
 
+@admin.register(OrganizationStats)
+class OrganizationStatsAdmin(admin.ModelAdmin):
+    list_display = ('organization', 'caregivers_total', 'patients_total', 'updated_at')
+    search_fields = ('organization__name', 'organization__acronym')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(OrganizationExportJob)
+class OrganizationExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'organization', 'dataset', 'file_format', 'status', 'rows_written', 'total_rows', 'created_at', 'completed_at')
+    search_fields = ('organization__name', 'organization__acronym')
+    list_filter = ('status', 'dataset', 'file_format')
+    readonly_fields = ('fingerprint', 'task_id', 'bytes_written', 'last_created_at', 'last_pkid', 'file_name')
+    ordering = ('-created_at',)
+
@@ -11,3 +11,23 @@ class OrganizationNotFoundException(CustomValidationError):
     status_code = status.HTTP_404_NOT_FOUND
     default_detail = "Organization not Found"
     default_code = "organization_not_found"
+
+class InvalidExportRequestException(CustomValidationError):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = "Invalid export request"
+    default_code = "organization_invalid_export_request"
+
+class ExportJobNotFoundException(CustomValidationError):
+    status_code = status.HTTP_404_NOT_FOUND
+    default_detail = "Export job not Found"
+    default_code = "organization_export_job_not_found"
+
+class ExportJobNotReadyException(CustomValidationError):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Export job is not completed yet"
+    default_code = "organization_export_job_not_ready"
+
+class InvalidPatientFileException(CustomValidationError):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = "The file must be a UTF-8 encoded CSV file with a header line"
+    default_code = "organization_invalid_patient_file"
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0003_organizationstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50)),
+                ('last_value', models.BigIntegerField(default=0)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sequences', to='organizations.organization')),
+            ],
+            options={
+                'verbose_name': 'Organization Sequence',
+                'verbose_name_plural': 'Organization Sequences',
+                'constraints': [models.UniqueConstraint(fields=('organization', 'scope'), name='unique_organization_sequence_scope')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:23
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Upper
+
+
+def check_acronyms(apps, schema_editor):
+    """
+    Acronyms differing only by case would share their medical ids and staff numbers. They cannot
+    be renamed automatically (ids already issued embed them), so the migration stops and lists them.
+    """
+    Organization = apps.get_model('organizations', 'Organization')
+    clashes = list(
+        Organization.objects.values(upper_acronym=Upper('acronym'))
+        .annotate(count=Count('pkid')).filter(count__gt=1)
+        .values_list('upper_acronym', flat=True)
+    )
+    if clashes:
+        raise RuntimeError(
+            "Organization acronyms differing only by case must be renamed before migrating: "
+            + ", ".join(sorted(clashes))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0005_organization_export_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(check_acronyms, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='organization',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Upper('acronym'), name='unique_organization_acronym_upper', violation_error_message='An organization with this acronym already exists.'),
+        ),
+    ]
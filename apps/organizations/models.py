@@ -2,6 +2,7 @@ from django.db import models
 
 # Create your models here.
 from django.db import models
+from django.db.models.functions import Upper
 from shared.models import SoftDeleteModel, TimeStampedUUID
 from autoslug import AutoSlugField
 from django.utils.translation import gettext_lazy as _ 
@@ -32,6 +33,14 @@ class Organization(TimeStampedUUID,SoftDeleteModel):
         verbose_name = _("Organization")
         verbose_name_plural = _("Organizations")
         ordering = ["-created_at"]
+        constraints = [
+            # Medical ids and staff numbers are built from the upper-cased acronym
+            models.UniqueConstraint(
+                Upper('acronym'),
+                name='unique_organization_acronym_upper',
+                violation_error_message=_("An organization with this acronym already exists."),
+            ),
+        ]
         
     def __str__(self):
         return f"Organization account for {self.name}"
@@ -39,4 +48,124 @@ class Organization(TimeStampedUUID,SoftDeleteModel):
     @property
     def full_name(self):
         return self.name
-    
\ No newline at end of file
+
+
+class OrganizationStats(models.Model):
+    """
+    Pre-aggregated dashboard counters of an organization (soft-deleted rows excluded).
+    Kept current incrementally by OrganizationStatsService and reconciled periodically.
+    """
+    organization = models.OneToOneField(Organization,on_delete=models.CASCADE,primary_key=True,related_name="stats")
+    caregivers_total = models.IntegerField(default=0)
+    caregivers_active = models.IntegerField(default=0)
+    caregivers_verified = models.IntegerField(default=0)
+    patients_total = models.IntegerField(default=0)
+    patients_active = models.IntegerField(default=0)
+    patients_verified = models.IntegerField(default=0)
+    patients_active_male = models.IntegerField(default=0)
+    patients_active_female = models.IntegerField(default=0)
+    patients_verified_male = models.IntegerField(default=0)
+    patients_verified_female = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Organization Statistics")
+        verbose_name_plural = _("Organization Statistics")
+
+    def __str__(self):
+        return f"Statistics for organization {self.organization_id}"
+
+
+class OrganizationSequence(models.Model):
+    """
+    Per-organization counters backing human readable identifiers (medical ids, staff numbers).
+    Allocated through OrganizationSequenceService, which hands out contiguous blocks.
+    """
+    organization = models.ForeignKey(Organization,on_delete=models.CASCADE,related_name="sequences")
+    scope = models.CharField(max_length=50)
+    last_value = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Organization Sequence")
+        verbose_name_plural = _("Organization Sequences")
+        constraints = [
+            models.UniqueConstraint(fields=["organization", "scope"], name="unique_organization_sequence_scope"),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} sequence for organization {self.organization_id}"
+
+
+class ExportDatasets(models.TextChoices):
+    PATIENTS = "patients", _("Patients")
+    MEDICAL_RECORDS = "medical-records", _("Medical Records")
+    DIAGNOSES = "diagnoses", _("Diagnoses")
+    VITAL_SIGNS = "vital-signs", _("Vital Signs")
+
+
+class ExportFormats(models.TextChoices):
+    CSV = "csv", _("CSV")
+    NDJSON = "ndjson", _("NDJSON")
+
+
+class ExportJobStatus(models.TextChoices):
+    PENDING = "PENDING", _("Pending")
+    RUNNING = "RUNNING", _("Running")
+    COMPLETED = "COMPLETED", _("Completed")
+    FAILED = "FAILED", _("Failed")
+    EXPIRED = "EXPIRED", _("Expired")
+
+
+class OrganizationExportJob(TimeStampedUUID):
+    """
+    A background export of one organization dataset to a gzip-compressed file.
+    The position of the last row written is checkpointed with the file size after every chunk,
+    so an interrupted job resumes where it stopped instead of starting over.
+    """
+    organization = models.ForeignKey(Organization,on_delete=models.CASCADE,related_name="export_jobs")
+    requested_by = models.ForeignKey(User,on_delete=models.SET_NULL,null=True,blank=True,related_name="+")
+    dataset = models.CharField(max_length=30,choices=ExportDatasets.choices)
+    file_format = models.CharField(max_length=10,choices=ExportFormats.choices,default=ExportFormats.CSV)
+    created_after = models.DateTimeField(blank=True,null=True)
+    created_before = models.DateTimeField(blank=True,null=True)
+    fingerprint = models.CharField(max_length=64,db_index=True,help_text=_("Hash of the organization, dataset, format and range; identical requests share a job."))
+    status = models.CharField(max_length=20,choices=ExportJobStatus.choices,default=ExportJobStatus.PENDING,db_index=True)
+    task_id = models.CharField(max_length=255,blank=True,null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    total_rows = models.BigIntegerField(blank=True,null=True)
+    rows_written = models.BigIntegerField(default=0)
+    bytes_written = models.BigIntegerField(default=0)
+    last_created_at = models.DateTimeField(blank=True,null=True)
+    last_pkid = models.BigIntegerField(blank=True,null=True)
+    file_name = models.CharField(max_length=255,blank=True,null=True)
+    error = models.TextField(blank=True,null=True)
+    started_at = models.DateTimeField(blank=True,null=True)
+    completed_at = models.DateTimeField(blank=True,null=True)
+    expires_at = models.DateTimeField(blank=True,null=True,db_index=True)
+
+    class Meta:
+        verbose_name = _("Organization Export Job")
+        verbose_name_plural = _("Organization Export Jobs")
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["organization", "created_at"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["fingerprint"],
+                condition=models.Q(status__in=["PENDING", "RUNNING"]),
+                name="unique_active_export_job",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset} export ({self.status}) for organization {self.organization_id}"
+
+    @property
+    def progress(self):
+        if self.status == ExportJobStatus.COMPLETED:
+            return 100.0
+        if not self.total_rows:
+            return 0.0
+        return round(min(self.rows_written / self.total_rows, 1) * 100, 1)
+
@@ -1,6 +1,4 @@
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.core.mail import EmailMessage
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
@@ -14,6 +12,7 @@ class OrganizationEmailService(BaseEmailService):
     """
     Handles organization-related emails (activation, invites, etc.).
     """
+    PATIENT_WELCOME_TEMPLATE = 'organizations/mails/patient_welcome_mail.html'
 
     @staticmethod
     def send_organization_activation_email(organization: Organization, current_site: str):
@@ -39,23 +38,37 @@ class OrganizationEmailService(BaseEmailService):
 
     @staticmethod
     def send_patient_account_creation_notification_email(patient_email, patient_full_name, organization_name):
-        login_url = f"{settings.REACT_FRONTEND_URL}/auth/login"
+        OrganizationEmailService.send_email(
+            subject=f"Welcome to {organization_name}, {patient_full_name}!",
+            template=OrganizationEmailService.PATIENT_WELCOME_TEMPLATE,
+            context=OrganizationEmailService.patient_welcome_context(patient_email, patient_full_name, organization_name),
+            recipient_list=[patient_email],
+        )
 
-        context = {
+    @staticmethod
+    def send_patient_account_creation_notification_emails(recipients, organization_name):
+        """
+        Send the welcome email to many patients of one organization over a single SMTP connection.
+        `recipients` is a list of (email, full name) pairs. Emails that fail transiently are queued
+        again on their own. Returns the number of emails sent.
+        """
+        messages = OrganizationEmailService.build_emails(OrganizationEmailService.PATIENT_WELCOME_TEMPLATE, [
+            (
+                f"Welcome to {organization_name}, {patient_full_name}!",
+                OrganizationEmailService.patient_welcome_context(patient_email, patient_full_name, organization_name),
+                [patient_email],
+            )
+            for patient_email, patient_full_name in recipients
+        ])
+        failures = OrganizationEmailService.deliver(messages)
+        OrganizationEmailService.requeue_failures(failures)
+        return len(messages) - len(failures)
+
+    @staticmethod
+    def patient_welcome_context(patient_email, patient_full_name, organization_name):
+        return {
             'organization_name': organization_name,
             'patient_email': patient_email,
             'patient_full_name': patient_full_name,
-            'login_url': login_url,
+            'login_url': f"{settings.REACT_FRONTEND_URL}/auth/login",
         }
-
-        subject = f"Welcome to {organization_name}, {patient_full_name}!"
-        html_message = render_to_string('organizations/mails/patient_welcome_mail.html', context)
-
-        email = EmailMessage(
-            subject=subject,
-            body=html_message,
-            from_email=settings.EMAIL_HOST_USER,
-            to=[patient_email],
-        )
-        email.content_subtype = "html"
-        email.send(fail_silently=False)
\ No newline at end of file
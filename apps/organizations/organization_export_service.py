@@ -0,0 +1,421 @@
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import uuid
+from itertools import islice
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from apps.patients.models import Patient, PatientMedicalRecord, PatientDiagnosisDetails, VitalSign
+from .models import OrganizationExportJob, ExportJobStatus
+from .exceptions import InvalidExportRequestException
+
+logger = logging.getLogger(__name__)
+
+
+class _EchoBuffer:
+    """File-like object whose write() hands the formatted line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+class OrganizationExportService:
+    """
+    Streams an organization's rows as CSV or NDJSON.
+
+    Rows come straight from `values_list()` tuples read through a server-side cursor
+    (`.iterator(chunk_size=...)`) in (created_at, pkid) order, so memory stays constant
+    whatever the size of the organization. The `id` column of the last row received is a
+    resume cursor: passing it back as `after` continues the export right after that row.
+    """
+    CHUNK_SIZE = 2000
+    ROWS_PER_WRITE = 500
+    FORMATS = {
+        "csv": "text/csv",
+        "ndjson": "application/x-ndjson",
+    }
+
+    # dataset -> (model, organization lookup, [(column, values_list lookup)])
+    DATASETS = {
+        "patients": (Patient, "organization_id", [
+            ("id", "id"),
+            ("medical_id", "medical_id"),
+            ("first_name", "first_name"),
+            ("last_name", "last_name"),
+            ("email", "user__email"),
+            ("gender", "gender"),
+            ("date_of_birth", "date_of_birth"),
+            ("marital_status", "marital_status"),
+            ("phone_number", "phone_number"),
+            ("emergency_phone_number", "emergency_phone_number"),
+            ("address", "address"),
+            ("is_active", "user__is_active"),
+            ("is_verified", "user__is_verified"),
+            ("created_at", "created_at"),
+        ]),
+        "medical-records": (PatientMedicalRecord, "patient__organization_id", [
+            ("id", "id"),
+            ("patient_id", "patient__id"),
+            ("medical_id", "patient__medical_id"),
+            ("blood_group", "blood_group"),
+            ("genotype", "genotype"),
+            ("weight", "weight"),
+            ("height", "height"),
+            ("allergies", "allergies"),
+            ("created_at", "created_at"),
+            ("updated_at", "updated_at"),
+        ]),
+        "diagnoses": (PatientDiagnosisDetails, "organization_id", [
+            ("id", "id"),
+            ("patient_id", "patient__id"),
+            ("medical_id", "patient__medical_id"),
+            ("caregiver_id", "caregiver__id"),
+            ("staff_number", "caregiver__staff_number"),
+            ("assessment", "assessment"),
+            ("diagnoses", "diagnoses"),
+            ("medication", "medication"),
+            ("health_allergies", "health_allergies"),
+            ("health_care_center", "health_care_center"),
+            ("notes", "notes"),
+            ("created_at", "created_at"),
+        ]),
+        "vital-signs": (VitalSign, "patient_diagnoses_details__organization_id", [
+            ("id", "id"),
+            ("diagnosis_id", "patient_diagnoses_details__id"),
+            ("patient_id", "patient_diagnoses_details__patient__id"),
+            ("medical_id", "patient_diagnoses_details__patient__medical_id"),
+            ("body_temperature", "body_temperature"),
+            ("pulse_rate", "pulse_rate"),
+            ("blood_pressure", "blood_pressure"),
+            ("blood_oxygen", "blood_oxygen"),
+            ("respiration_rate", "respiration_rate"),
+            ("weight", "weight"),
+            ("created_at", "created_at"),
+        ]),
+    }
+
+    @staticmethod
+    def get_queryset(dataset, organization_id, created_after=None, created_before=None, after=None):
+        """
+        Alive rows of the dataset for the organization, ordered for keyset resumption and
+        narrowed to the `created_at` range and to the rows following the `after` cursor.
+        """
+        if dataset not in OrganizationExportService.DATASETS:
+            raise InvalidExportRequestException(f"Unknown export '{dataset}'. Choose one of: {', '.join(OrganizationExportService.DATASETS)}.")
+        model, organization_lookup, _ = OrganizationExportService.DATASETS[dataset]
+
+        queryset = model.objects.filter(**{organization_lookup: organization_id})
+        if created_after is not None:
+            queryset = queryset.filter(created_at__gte=created_after)
+        if created_before is not None:
+            queryset = queryset.filter(created_at__lt=created_before)
+
+        if after is not None:
+            try:
+                after = uuid.UUID(str(after))
+            except ValueError:
+                raise InvalidExportRequestException("Invalid export cursor.")
+            position = queryset.filter(id=after).values_list("created_at", "pkid").first()
+            if position is None:
+                raise InvalidExportRequestException("Invalid export cursor.")
+            queryset = OrganizationExportService.after_position(queryset, *position)
+
+        return queryset.order_by("created_at", "pkid")
+
+    @staticmethod
+    def after_position(queryset, created_at, pkid):
+        """Rows strictly after (created_at, pkid) in export order."""
+        return queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pkid__gt=pkid))
+
+    @staticmethod
+    def get_columns(dataset):
+        return [column for column, _ in OrganizationExportService.DATASETS[dataset][2]]
+
+    @staticmethod
+    def iter_rows(queryset, dataset, chunk_size=None):
+        lookups = [lookup for _, lookup in OrganizationExportService.DATASETS[dataset][2]]
+        return queryset.values_list(*lookups).iterator(chunk_size=chunk_size or OrganizationExportService.CHUNK_SIZE)
+
+    @staticmethod
+    def fetch_batch(queryset, dataset, position=None, batch_size=None):
+        """
+        Next batch of rows after `position` with a keyset seek, for jobs that checkpoint between
+        batches. Returns (rows, position of the last row); the position is None once exhausted.
+        """
+        lookups = [lookup for _, lookup in OrganizationExportService.DATASETS[dataset][2]]
+        if position is not None:
+            queryset = OrganizationExportService.after_position(queryset, *position)
+        batch = list(queryset.values_list(*lookups, "pkid")[:batch_size or OrganizationExportService.CHUNK_SIZE])
+        if not batch:
+            return [], None
+        created_at_index = lookups.index("created_at")
+        return [row[:-1] for row in batch], (batch[-1][created_at_index], batch[-1][-1])
+
+    @staticmethod
+    def encode_header(columns, file_format):
+        if file_format == "csv":
+            return csv.writer(_EchoBuffer()).writerow(columns)
+        return ""
+
+    @staticmethod
+    def encode_rows(columns, rows, file_format):
+        if file_format == "csv":
+            writer = csv.writer(_EchoBuffer())
+            return "".join(writer.writerow(row) for row in rows)
+        encoder = json.JSONEncoder(default=OrganizationExportService._json_default, ensure_ascii=False)
+        return "".join(f"{encoder.encode(dict(zip(columns, row)))}\n" for row in rows)
+
+    @staticmethod
+    def stream(queryset, dataset, file_format, chunk_size=None):
+        """Generator of encoded text blocks, a few hundred rows each."""
+        columns = OrganizationExportService.get_columns(dataset)
+        rows = OrganizationExportService.iter_rows(queryset, dataset, chunk_size)
+        header = OrganizationExportService.encode_header(columns, file_format)
+        if header:
+            yield header
+        while True:
+            block = list(islice(rows, OrganizationExportService.ROWS_PER_WRITE))
+            if not block:
+                return
+            yield OrganizationExportService.encode_rows(columns, block, file_format)
+
+    @staticmethod
+    def _json_default(value):
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+
+    @staticmethod
+    def parse_created_bound(value, name, end_of_day=False):
+        """
+        Parse a `created_at` bound given as an ISO datetime or date. A date used as the upper
+        bound includes that whole day.
+        """
+        if not value:
+            return None
+        try:
+            parsed = parse_datetime(value)
+            day = parse_date(value) if parsed is None else None
+        except ValueError:
+            parsed = day = None
+        if parsed is None:
+            if day is None:
+                raise InvalidExportRequestException(f"'{name}' must be an ISO 8601 date or datetime.")
+            parsed = datetime.combine(day, time.min)
+            if end_of_day:
+                parsed += timedelta(days=1)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+
+class OrganizationExportJobService:
+    """
+    Background exports written by the `run_organization_export_job` task to gzip files in a
+    private FileSystemStorage (EXPORT_FILES_ROOT, never under the public MEDIA_ROOT).
+
+    Each batch of rows is appended as its own gzip member, flushed, and checkpointed on the job
+    together with the file size and the keyset position of its last row. A retried or restarted
+    job truncates the file back to the last checkpoint and continues from there; the members
+    concatenate into a single valid gzip stream.
+    """
+    BATCH_SIZE = 5000
+
+    @staticmethod
+    def get_storage():
+        return FileSystemStorage(location=getattr(settings, "EXPORT_FILES_ROOT", settings.BASE_DIR / "exports"))
+
+    @staticmethod
+    def fingerprint(organization_id, dataset, file_format, created_after=None, created_before=None):
+        parts = [organization_id, dataset, file_format, created_after and created_after.isoformat(), created_before and created_before.isoformat()]
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    @staticmethod
+    def request_export(organization_id, dataset, file_format, created_after=None, created_before=None, requested_by_id=None):
+        """
+        Return the job serving this export, creating and queueing one only when needed.
+        A pending or running job for the same export is shared, a recently completed one is
+        reused while its file is kept, and a failed one is resumed. Returns (job, created).
+        """
+        fingerprint = OrganizationExportJobService.fingerprint(organization_id, dataset, file_format, created_after, created_before)
+        reuse_since = timezone.now() - timedelta(minutes=getattr(settings, "EXPORT_JOB_REUSE_MINUTES", 15))
+
+        existing = (
+            OrganizationExportJob.objects
+            .filter(fingerprint=fingerprint)
+            .filter(
+                Q(status__in=[ExportJobStatus.PENDING, ExportJobStatus.RUNNING, ExportJobStatus.FAILED])
+                | Q(status=ExportJobStatus.COMPLETED, completed_at__gte=reuse_since)
+            )
+            .order_by("-created_at")
+            .first()
+        )
+        if existing is not None:
+            if existing.status == ExportJobStatus.FAILED:
+                OrganizationExportJobService.resume(existing)
+            return existing, False
+
+        try:
+            with transaction.atomic():
+                job = OrganizationExportJob.objects.create(
+                    organization_id=organization_id,
+                    requested_by_id=requested_by_id,
+                    dataset=dataset,
+                    file_format=file_format,
+                    created_after=created_after,
+                    created_before=created_before,
+                    fingerprint=fingerprint,
+                )
+        except IntegrityError:
+            # The same export was requested concurrently; share the winner's job
+            job = OrganizationExportJob.objects.filter(
+                fingerprint=fingerprint, status__in=[ExportJobStatus.PENDING, ExportJobStatus.RUNNING]
+            ).first()
+            if job is not None:
+                return job, False
+            # It finished (or failed) in the meantime: start over, reusing or resuming it
+            return OrganizationExportJobService.request_export(
+                organization_id, dataset, file_format, created_after, created_before, requested_by_id
+            )
+
+        OrganizationExportJobService.enqueue(job)
+        return job, True
+
+    @staticmethod
+    def resume(job):
+        """Queue a failed job again; it continues from its last checkpoint."""
+        updated = OrganizationExportJob.objects.filter(pk=job.pk, status=ExportJobStatus.FAILED).update(status=ExportJobStatus.PENDING, error=None, updated_at=timezone.now())
+        if updated:
+            job.status, job.error = ExportJobStatus.PENDING, None
+            OrganizationExportJobService.enqueue(job)
+
+    @staticmethod
+    def enqueue(job):
+        from .tasks import run_organization_export_job
+
+        def send():
+            result = run_organization_export_job.delay(job.pk)
+            OrganizationExportJob.objects.filter(pk=job.pk).update(task_id=result.id)
+
+        transaction.on_commit(send)
+
+    @staticmethod
+    def claim(job_id):
+        """
+        Atomically mark the job as running. A job left RUNNING by a worker that died is claimed
+        again once its last checkpoint is older than EXPORT_JOB_STALE_MINUTES.
+        """
+        now = timezone.now()
+        stale_before = now - timedelta(minutes=getattr(settings, "EXPORT_JOB_STALE_MINUTES", 10))
+        claimed = (
+            OrganizationExportJob.objects
+            .filter(pk=job_id)
+            .filter(Q(status__in=[ExportJobStatus.PENDING, ExportJobStatus.FAILED]) | Q(status=ExportJobStatus.RUNNING, updated_at__lt=stale_before))
+            .update(status=ExportJobStatus.RUNNING, started_at=now, updated_at=now, error=None)
+        )
+        return OrganizationExportJob.objects.get(pk=job_id) if claimed else None
+
+    @staticmethod
+    def run(job_id, batch_size=None):
+        """Write (or continue writing) the job's file. Returns the job, or None if another worker owns it."""
+        job = OrganizationExportJobService.claim(job_id)
+        if job is None:
+            return None
+        OrganizationExportJob.objects.filter(pk=job.pk).update(attempts=job.attempts + 1)
+
+        storage = OrganizationExportJobService.get_storage()
+        columns = OrganizationExportService.get_columns(job.dataset)
+        queryset = OrganizationExportService.get_queryset(job.dataset, job.organization_id, job.created_after, job.created_before)
+
+        job.file_name = job.file_name or f"{job.organization_id}/{job.id}.{job.file_format}.gz"
+        path = storage.path(job.file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not os.path.exists(path) or os.path.getsize(path) < job.bytes_written:
+            # Nothing (intact) to resume from: start the file over
+            job.bytes_written = job.rows_written = 0
+            job.last_created_at = job.last_pkid = None
+        if job.total_rows is None:
+            job.total_rows = queryset.count()
+        OrganizationExportJob.objects.filter(pk=job.pk).update(
+            file_name=job.file_name,
+            total_rows=job.total_rows,
+            rows_written=job.rows_written,
+            bytes_written=job.bytes_written,
+            last_created_at=job.last_created_at,
+            last_pkid=job.last_pkid,
+        )
+
+        position = (job.last_created_at, job.last_pkid) if job.last_pkid is not None else None
+
+        with open(path, "ab") as output:
+            # Drop whatever was written after the last checkpoint by an interrupted attempt
+            output.truncate(job.bytes_written)
+            output.seek(job.bytes_written)
+            if job.bytes_written == 0:
+                OrganizationExportJobService._write_member(output, OrganizationExportService.encode_header(columns, job.file_format))
+                OrganizationExportJobService._checkpoint(job, output, 0, None)
+
+            while True:
+                rows, last_position = OrganizationExportService.fetch_batch(queryset, job.dataset, position, batch_size or OrganizationExportJobService.BATCH_SIZE)
+                if not rows:
+                    break
+                OrganizationExportJobService._write_member(output, OrganizationExportService.encode_rows(columns, rows, job.file_format))
+                OrganizationExportJobService._checkpoint(job, output, len(rows), last_position)
+                position = last_position
+
+        now = timezone.now()
+        job.status, job.completed_at = ExportJobStatus.COMPLETED, now
+        job.expires_at = now + timedelta(hours=getattr(settings, "EXPORT_FILE_RETENTION_HOURS", 24))
+        OrganizationExportJob.objects.filter(pk=job.pk).update(status=job.status, completed_at=now, expires_at=job.expires_at, updated_at=now)
+        return job
+
+    @staticmethod
+    def _write_member(output, text):
+        if not text:
+            return
+        output.write(gzip.compress(text.encode("utf-8"), compresslevel=6))
+        output.flush()
+        os.fsync(output.fileno())
+
+    @staticmethod
+    def _checkpoint(job, output, rows, position):
+        job.rows_written += rows
+        job.bytes_written = output.tell()
+        if position is not None:
+            job.last_created_at, job.last_pkid = position
+        OrganizationExportJob.objects.filter(pk=job.pk).update(
+            rows_written=job.rows_written,
+            bytes_written=job.bytes_written,
+            last_created_at=job.last_created_at,
+            last_pkid=job.last_pkid,
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def mark_failed(job_id, error):
+        OrganizationExportJob.objects.filter(pk=job_id, status=ExportJobStatus.RUNNING).update(status=ExportJobStatus.FAILED, error=str(error)[:2000], updated_at=timezone.now())
+
+    @staticmethod
+    def purge_expired():
+        """Delete the files of expired exports. Returns the number of jobs expired."""
+        storage = OrganizationExportJobService.get_storage()
+        expired = OrganizationExportJob.objects.filter(status=ExportJobStatus.COMPLETED, expires_at__lte=timezone.now())
+        count = 0
+        for pk, file_name in expired.values_list("pk", "file_name").iterator():
+            try:
+                if file_name and storage.exists(file_name):
+                    storage.delete(file_name)
+            except OSError as e:
+                logger.error(f"Failed to delete export file {file_name}: {str(e)}")
+                continue
+            count += OrganizationExportJob.objects.filter(pk=pk).update(status=ExportJobStatus.EXPIRED, updated_at=timezone.now())
+        return count
+
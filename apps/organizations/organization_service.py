@@ -1,10 +1,21 @@
-from django.db import transaction, IntegrityError
+import csv
+import io
+from collections import defaultdict
+from django.db import connection, transaction, IntegrityError
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.db.models.functions import Lower
 from django.core.exceptions import ValidationError
-from apps.organizations.models import Organization, User
+from django.utils import timezone
+from apps.organizations.models import Organization, OrganizationSequence, OrganizationStats, User
+from apps.caregivers.models import Caregiver
 from shared.text_choices import UserRoles
 import logging
 from apps.patients.models import Patient,PatientMedicalRecord
-from .tasks import send_patient_welcome_email
+from shared.cache import CacheNamespaces, TenantCache
+from shared.utils import hash_passwords
+from .exceptions import InvalidPatientFileException
+from .tasks import send_patient_welcome_email, send_patient_welcome_emails
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +81,8 @@ class OrganizationService:
         # Create medical record
         PatientMedicalRecord.objects.create(patient=patient, **medical_record_data)
 
+        OrganizationStatsService.record_change(organization.pk, after=OrganizationStatsService.patient_counters(patient))
+
         # Send notification email asynchronously
         send_patient_welcome_email.delay(
             patient_email=user.email,
@@ -78,3 +91,309 @@ class OrganizationService:
         )
 
         return patient
+
+
+
+class PatientBulkRegistrationService:
+    """
+    Registers many patients of an organization at once: one query to find taken emails,
+    passwords hashed on a small thread pool, users, patients and medical records inserted with
+    bulk_create in a single transaction, and one grouped welcome email job. Hashing dominates
+    the request time, so the batch is capped at BULK_PATIENT_REGISTRATION_MAX_ROWS rows.
+    """
+    MEDICAL_RECORD_FIELDS = ("blood_group", "genotype", "weight", "height", "allergies")
+
+    @staticmethod
+    def max_rows():
+        return getattr(settings, "BULK_PATIENT_REGISTRATION_MAX_ROWS", 100)
+
+    @staticmethod
+    def rows_from_csv(uploaded_file):
+        """
+        Rows of an uploaded CSV file with a header line. Empty cells are dropped and the
+        medical record columns are nested under `medical_record`.
+        """
+        text = io.TextIOWrapper(uploaded_file, encoding="utf-8-sig", newline="")
+        rows = []
+        try:
+            for record in csv.DictReader(text):
+                row = {
+                    key.strip(): value.strip() for key, value in record.items()
+                    if isinstance(key, str) and isinstance(value, str) and key and value.strip()
+                }
+                medical_record = {field: row.pop(field) for field in PatientBulkRegistrationService.MEDICAL_RECORD_FIELDS if field in row}
+                if medical_record:
+                    row["medical_record"] = medical_record
+                rows.append(row)
+        except (UnicodeDecodeError, csv.Error):
+            raise InvalidPatientFileException()
+        return rows
+
+    @staticmethod
+    def existing_emails(emails):
+        """The given emails (lowercased) that already belong to an account, in one query."""
+        lowered = {email.lower() for email in emails}
+        if not lowered:
+            return set()
+        return set(
+            User.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower__in=lowered)
+            .values_list("email_lower", flat=True)
+        )
+
+    @staticmethod
+    def register_patients(rows, organization):
+        """
+        Create the patients described by already validated rows (serializer data with `email`,
+        `password` and optional `medical_record`). Returns the patients, in row order.
+        """
+        if not rows:
+            return []
+
+        password_hashes = hash_passwords(row["password"] for row in rows)
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([
+                User(
+                    email=User.objects.normalize_email(row["email"]),
+                    password=password_hash,
+                    role=UserRoles.PATIENT,
+                    is_active=True,
+                    is_verified=True,
+                )
+                for row, password_hash in zip(rows, password_hashes)
+            ])
+
+            patients = []
+            for row, user in zip(rows, users):
+                data = {key: value for key, value in row.items() if key not in ("email", "password", "medical_record")}
+                patients.append(Patient(user=user, organization=organization, **data))
+            OrganizationSequenceService.assign_medical_ids(patients)
+            Patient.objects.bulk_create(patients)
+
+            PatientMedicalRecord.objects.bulk_create([
+                PatientMedicalRecord(patient=patient, **(row.get("medical_record") or {}))
+                for row, patient in zip(rows, patients)
+            ])
+
+            totals = defaultdict(int)
+            for patient in patients:
+                for field, value in OrganizationStatsService.patient_counters(patient).items():
+                    totals[field] += value
+            OrganizationStatsService.record_change(organization.pk, after=totals)
+
+            # bulk_create sends no post_save signals
+            TenantCache.invalidate(organization.pk, CacheNamespaces.PATIENTS, CacheNamespaces.MEDICAL_RECORDS)
+
+            recipients = [(patient.user.email, f"{patient.first_name} {patient.last_name}") for patient in patients]
+            transaction.on_commit(lambda: send_patient_welcome_emails.delay(recipients, organization.name))
+
+        return patients
+
+class OrganizationStatsService:
+    """
+    Maintains OrganizationStats incrementally.
+    Writers describe a patient/caregiver's contribution to the counters before and after a change
+    (`patient_counters` / `caregiver_counters`) and `record_change` applies the difference with F()
+    expressions, in the transaction of the write itself. `reconcile` recomputes everything from
+    the source tables.
+    """
+
+    @staticmethod
+    def patient_counters(patient):
+        user = patient.user
+        return {
+            "patients_total": 1,
+            "patients_active": int(user.is_active),
+            "patients_verified": int(user.is_verified),
+            **OrganizationStatsService.patient_gender_counters(user, patient.gender),
+        }
+
+    @staticmethod
+    def patient_gender_counters(user, gender):
+        is_male = gender == "Male"
+        is_female = gender == "Female"
+        return {
+            "patients_active_male": int(user.is_active and is_male),
+            "patients_active_female": int(user.is_active and is_female),
+            "patients_verified_male": int(user.is_verified and is_male),
+            "patients_verified_female": int(user.is_verified and is_female),
+        }
+
+    @staticmethod
+    def caregiver_counters(caregiver):
+        user = caregiver.user
+        return {
+            "caregivers_total": 1,
+            "caregivers_active": int(user.is_active),
+            "caregivers_verified": int(user.is_verified),
+        }
+
+    @staticmethod
+    def record_change(organization_id, before=None, after=None):
+        before, after = before or {}, after or {}
+        deltas = {
+            field: after.get(field, 0) - before.get(field, 0)
+            for field in set(before) | set(after)
+        }
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        updated = OrganizationStats.objects.filter(organization_id=organization_id).update(
+            updated_at=timezone.now(),
+            **{field: F(field) + delta for field, delta in deltas.items()},
+        )
+        if not updated:
+            # First write for this organization: the full recount already includes this change
+            OrganizationStatsService.reconcile(organization_ids=[organization_id])
+
+    @staticmethod
+    def get_stats(organization_id):
+        try:
+            return OrganizationStats.objects.get(organization_id=organization_id)
+        except OrganizationStats.DoesNotExist:
+            OrganizationStatsService.reconcile(organization_ids=[organization_id])
+            return OrganizationStats.objects.get(organization_id=organization_id)
+
+    @staticmethod
+    def reconcile(organization_ids=None, batch_size=500):
+        """
+        Recompute the counters of the given organizations (all when None), `batch_size`
+        organizations per transaction, and upsert them. Returns the number of organizations written.
+        """
+        organizations = Organization.objects.order_by("pkid")
+        if organization_ids is not None:
+            organizations = organizations.filter(pk__in=organization_ids)
+        organization_ids = list(organizations.values_list("pkid", flat=True))
+
+        for start in range(0, len(organization_ids), batch_size):
+            OrganizationStatsService.reconcile_batch(organization_ids[start:start + batch_size])
+        return len(organization_ids)
+
+    @staticmethod
+    @transaction.atomic
+    def reconcile_batch(organization_ids):
+        """
+        The counter rows are locked before counting. A concurrent `record_change` either committed
+        first, and its write is part of the recount, or waits for the lock and applies its delta
+        on top of the recount: the upsert never overwrites an increment.
+        """
+        list(OrganizationStats.objects.select_for_update().filter(
+            organization_id__in=organization_ids
+        ).order_by("organization_id").values_list("pk", flat=True))
+
+        caregiver_stats = {
+            row.pop("organization"): row
+            for row in Caregiver.objects.filter(organization_id__in=organization_ids).order_by().values("organization").annotate(
+                caregivers_total=Count("pkid"),
+                caregivers_active=Count("pkid", filter=Q(user__is_active=True)),
+                caregivers_verified=Count("pkid", filter=Q(user__is_verified=True)),
+            )
+        }
+        patient_stats = {
+            row.pop("organization"): row
+            for row in Patient.objects.filter(organization_id__in=organization_ids).order_by().values("organization").annotate(
+                patients_total=Count("pkid"),
+                patients_active=Count("pkid", filter=Q(user__is_active=True)),
+                patients_verified=Count("pkid", filter=Q(user__is_verified=True)),
+                patients_active_male=Count("pkid", filter=Q(user__is_active=True, gender="Male")),
+                patients_active_female=Count("pkid", filter=Q(user__is_active=True, gender="Female")),
+                patients_verified_male=Count("pkid", filter=Q(user__is_verified=True, gender="Male")),
+                patients_verified_female=Count("pkid", filter=Q(user__is_verified=True, gender="Female")),
+            )
+        }
+
+        rows = [
+            OrganizationStats(
+                organization_id=organization_id,
+                **caregiver_stats.get(organization_id, {}),
+                **patient_stats.get(organization_id, {}),
+            )
+            for organization_id in organization_ids
+        ]
+        update_fields = [
+            field.name for field in OrganizationStats._meta.concrete_fields if not field.primary_key
+        ]
+        OrganizationStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["organization"],
+            update_fields=update_fields,
+        )
+
+
+class OrganizationSequenceService:
+    """
+    Gap-free, per-organization identifier allocation backed by the OrganizationSequence table.
+
+    `allocate` reserves a block of values with a single upsert; the counter row stays locked until
+    the surrounding transaction ends, so concurrent writers for the same organization and scope
+    queue behind each other instead of colliding. Bulk writers reserve one block for all their rows.
+    """
+    MEDICAL_ID_SCOPE = "medical_id"
+    STAFF_NUMBER_SCOPE = "staff_number:{role}"
+
+    @staticmethod
+    def allocate(organization_id, scope, count=1):
+        """Reserve `count` consecutive values and return them as a range."""
+        if count < 1:
+            return range(0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {OrganizationSequence._meta.db_table} (organization_id, scope, last_value)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (organization_id, scope)
+                DO UPDATE SET last_value = {OrganizationSequence._meta.db_table}.last_value + EXCLUDED.last_value
+                RETURNING last_value
+                """,
+                [organization_id, scope, count],
+            )
+            last_value = cursor.fetchone()[0]
+        return range(last_value - count + 1, last_value + 1)
+
+    @staticmethod
+    def next_medical_ids(organization, count=1):
+        acronym = organization.acronym.upper()
+        values = OrganizationSequenceService.allocate(organization.pk, OrganizationSequenceService.MEDICAL_ID_SCOPE, count)
+        return [f"{acronym}_{value:07d}" for value in values]
+
+    @staticmethod
+    def next_staff_numbers(organization, caregiver_type, count=1):
+        from apps.caregivers.utils import role_abbreviation
+        acronym = organization.acronym.upper()
+        role_abbr = role_abbreviation.get(caregiver_type, "UNK")
+        scope = OrganizationSequenceService.STAFF_NUMBER_SCOPE.format(role=role_abbr)
+        values = OrganizationSequenceService.allocate(organization.pk, scope, count)
+        return [f"{acronym}_{role_abbr}_{value:05d}" for value in values]
+
+    @staticmethod
+    def assign_medical_ids(patients):
+        """Fill in missing medical ids of unsaved patients (e.g. before bulk_create), one allocation per organization."""
+        pending = defaultdict(list)
+        for patient in patients:
+            if not patient.medical_id:
+                pending[patient.organization_id].append(patient)
+
+        for group in pending.values():
+            medical_ids = OrganizationSequenceService.next_medical_ids(group[0].organization, len(group))
+            for patient, medical_id in zip(group, medical_ids):
+                patient.medical_id = medical_id
+        return patients
+
+    @staticmethod
+    def assign_staff_numbers(caregivers):
+        """Fill in missing staff numbers of unsaved caregivers, one allocation per organization and role."""
+        pending = defaultdict(list)
+        for caregiver in caregivers:
+            if not caregiver.staff_number:
+                pending[(caregiver.organization_id, caregiver.caregiver_type)].append(caregiver)
+
+        for (_, caregiver_type), group in pending.items():
+            staff_numbers = OrganizationSequenceService.next_staff_numbers(group[0].organization, caregiver_type, len(group))
+            for caregiver, staff_number in zip(group, staff_numbers):
+                caregiver.staff_number = staff_number
+        return caregivers
+
@@ -1,6 +1,7 @@
 from rest_framework.permissions import BasePermission
 from shared.text_choices import UserRoles
 from rest_framework.exceptions import NotFound
+from .models import Organization
 
 
 
@@ -18,15 +19,25 @@ class IsOrganizationWithAccount(BasePermission):
         if not user or user.role != UserRoles.ORGANIZATION:
             return False
 
-        # Ensure user has an organization
+        # Ensure user has an organization (read from the token claims when present)
+        if getattr(user, "organization_id", None) is not None:
+            return True
         if not hasattr(user, "organization") or user.organization is None:
             raise NotFound("Organization not found for this user.")
 
         return True
 
     def has_object_permission(self, request, view, obj):
-        # Optional: enforce object-level check if needed
-        return getattr(request.user, "organization", None) == obj
+        # The organization itself, or an object belonging to it
+        organization_id = getattr(request.user, "organization_id", None)
+        if organization_id is None:
+            organization = getattr(request.user, "organization", None)
+            organization_id = organization.pk if organization is not None else None
+        if organization_id is None:
+            return False
+        if isinstance(obj, Organization):
+            return obj.pk == organization_id
+        return getattr(obj, "organization_id", None) == organization_id
 
 
 class IsOrganization(BasePermission):
@@ -5,8 +5,9 @@ from apps.patients.models import Patient
 from django.db import IntegrityError, transaction
 from shared.text_choices import UserRoles
 from apps.patients.models import PatientMedicalRecord
-from .models import Organization
-from .organization_service import OrganizationService
+from .models import Organization, OrganizationExportJob, ExportJobStatus
+from django.urls import reverse
+from .organization_service import OrganizationService, PatientBulkRegistrationService
 from apps.patients.serializers import BasePatientSerializer
 from apps.patients.mixins import PatientRepresentationMixin
 
@@ -76,4 +77,103 @@ class OrganizationRegisterPatientSerializer(PatientRepresentationMixin, BasePati
         return representation
 
 
-    
\ No newline at end of file
+    
+
+
+
+class OrganizationBulkPatientRowSerializer(BasePatientSerializer):
+    """One row of a bulk patient registration."""
+
+    email = serializers.EmailField()
+    password = serializers.CharField(validators=[validate_password])
+
+    class Meta(BasePatientSerializer.Meta):
+        fields = [field for field in BasePatientSerializer.Meta.fields if field != 'profile_picture'] + ['email', 'password']
+
+
+class OrganizationBulkPatientRegistrationSerializer(serializers.Serializer):
+    """
+    Validates every row up front, including email uniqueness against existing accounts (one query)
+    and within the payload. By default a single invalid row rejects the whole batch; with
+    `partial_success` the valid rows are registered and the invalid ones reported.
+    """
+    patients = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    partial_success = serializers.BooleanField(default=False)
+
+    def validate_patients(self, rows):
+        max_rows = PatientBulkRegistrationService.max_rows()
+        if len(rows) > max_rows:
+            raise serializers.ValidationError(f"At most {max_rows} patients can be registered per request.")
+        return rows
+
+    def validate(self, attrs):
+        rows = attrs['patients']
+        errors, valid = {}, []
+        for number, row in enumerate(rows, start=1):
+            row_serializer = OrganizationBulkPatientRowSerializer(data=row)
+            if row_serializer.is_valid():
+                valid.append((number, row_serializer.validated_data))
+            else:
+                errors[number] = row_serializer.errors
+
+        taken = PatientBulkRegistrationService.existing_emails(data['email'] for _, data in valid)
+        seen = set()
+        for number, data in valid:
+            email = data['email'].lower()
+            if email in taken:
+                errors[number] = {'email': ["An account with this email already exists."]}
+            elif email in seen:
+                errors[number] = {'email': ["This email appears more than once in the upload."]}
+            seen.add(email)
+
+        if errors and not attrs['partial_success']:
+            raise serializers.ValidationError({'patients': errors})
+
+        attrs['valid_rows'] = [(number, data) for number, data in valid if number not in errors]
+        attrs['row_errors'] = errors
+        return attrs
+
+    def create(self, validated_data):
+        valid_rows = validated_data['valid_rows']
+        patients = PatientBulkRegistrationService.register_patients([data for _, data in valid_rows], self.context['organization'])
+
+        results = {
+            number: {'row': number, 'status': 'created', 'id': patient.id, 'medical_id': patient.medical_id, 'email': patient.user.email}
+            for (number, _), patient in zip(valid_rows, patients)
+        }
+        results.update({
+            number: {'row': number, 'status': 'failed', 'errors': row_errors}
+            for number, row_errors in validated_data['row_errors'].items()
+        })
+        return {
+            'created': len(patients),
+            'failed': len(validated_data['row_errors']),
+            'results': [results[number] for number in sorted(results)],
+        }
+
+    def to_representation(self, instance):
+        return instance
+
+class OrganizationExportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.FloatField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrganizationExportJob
+        fields = ['id', 'dataset', 'file_format', 'created_after', 'created_before', 'status', 'progress',
+                  'total_rows', 'rows_written', 'bytes_written', 'error', 'started_at', 'completed_at',
+                  'expires_at', 'created_at', 'download_url']
+        read_only_fields = [field for field in fields if field not in ('dataset', 'file_format', 'created_after', 'created_before')]
+
+    def validate(self, attrs):
+        created_after, created_before = attrs.get('created_after'), attrs.get('created_before')
+        if created_after and created_before and created_after >= created_before:
+            raise serializers.ValidationError({"created_before": "Must be later than created_after."})
+        return attrs
+
+    def get_download_url(self, obj):
+        request = self.context.get("request")
+        if obj.status != ExportJobStatus.COMPLETED or request is None:
+            return None
+        return request.build_absolute_uri(reverse('organization-export-job-download', kwargs={'id': obj.id}))
+
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.accounts.models import User
+from apps.caregivers.models import Caregiver
+from apps.patients.models import Patient
+from shared.cache import CacheNamespaces, TenantCache
+from .models import Organization
+
+
+@receiver([post_save, post_delete], sender=Organization)
+def invalidate_organization_cache(sender, instance, **kwargs):
+    TenantCache.invalidate(instance.pk, CacheNamespaces.ORGANIZATION)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_profile_cache(sender, instance, **kwargs):
+    """
+    Patient and caregiver responses embed user fields (email, active/verified flags).
+    Login only touches last_login, which no cached response exposes.
+    """
+    update_fields = kwargs.get("update_fields")
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+
+    organization_id = Patient.objects.all_with_deleted().filter(user_id=instance.pk).values_list("organization_id", flat=True).first()
+    if organization_id is not None:
+        TenantCache.invalidate(organization_id, CacheNamespaces.PATIENTS)
+        return
+
+    organization_id = Caregiver.objects.all_with_deleted().filter(user_id=instance.pk).values_list("organization_id", flat=True).first()
+    if organization_id is not None:
+        TenantCache.invalidate(organization_id, CacheNamespaces.CAREGIVERS)
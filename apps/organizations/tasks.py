@@ -24,3 +24,57 @@ def send_patient_welcome_email( patient_email, patient_full_name, organization_n
         OrganizationEmailService.send_patient_account_creation_notification_email(patient_email, patient_full_name, organization_name, )
     except Exception as e:
         logger.error(f"Failed to send welcome email to {patient_email}: {str(e)}")
+
+
+
+@shared_task
+def send_patient_welcome_emails(recipients, organization_name):
+    """
+    Sends the welcome email to every patient of a bulk registration, over one SMTP connection.
+    `recipients` is a list of (email, full name) pairs.
+    """
+    try:
+        sent = OrganizationEmailService.send_patient_account_creation_notification_emails(recipients, organization_name)
+        logger.info(f"Sent {sent} welcome emails for {organization_name}")
+    except Exception as e:
+        logger.error(f"Failed to send {len(recipients)} welcome emails for {organization_name}: {str(e)}")
+
+@shared_task
+def reconcile_organization_stats():
+    """
+    Periodically recompute the dashboard counters of every organization, correcting any drift
+    from writes that bypass OrganizationStatsService (bulk updates, admin actions, ...).
+    """
+    from .organization_service import OrganizationStatsService
+    count = OrganizationStatsService.reconcile()
+    logger.info(f"Reconciled dashboard statistics for {count} organizations")
+
+
+@shared_task(bind=True, acks_late=True, max_retries=3)
+def run_organization_export_job(self, job_id):
+    """
+    Write an organization export file. Failed attempts are retried with a backoff and continue
+    from the job's last checkpoint.
+    """
+    from .organization_export_service import OrganizationExportJobService
+    try:
+        job = OrganizationExportJobService.run(job_id)
+    except Exception as e:
+        logger.error(f"Export job {job_id} failed: {str(e)}")
+        OrganizationExportJobService.mark_failed(job_id, e)
+        raise self.retry(exc=e, countdown=30 * 2 ** self.request.retries)
+
+    if job is None:
+        logger.info(f"Export job {job_id} is already running or finished, skipping")
+    else:
+        logger.info(f"Export job {job_id} completed with {job.rows_written} rows")
+
+
+@shared_task
+def purge_expired_organization_exports():
+    """
+    Delete the files of completed exports past their retention period.
+    """
+    from .organization_export_service import OrganizationExportJobService
+    count = OrganizationExportJobService.purge_expired()
+    logger.info(f"Expired {count} organization export files")
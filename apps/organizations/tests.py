@@ -1,3 +1,643 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import tempfile
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import URLResolver, get_resolver
+from rest_framework.generics import GenericAPIView
+from rest_framework.parsers import MultiPartParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from apps.accounts.models import User
+from apps.accounts.serializers import OrganizationSignupSerializer
+from apps.patients.models import Patient, PatientDiagnosisDetails
+from apps.patients.views import PatientDiagnosisHistoryView
+from shared.mixins import OrganizationContextMixin
+from shared.models import SoftDeleteModel
+from shared.testing import client_for, create_caregiver, create_organization, create_patient, create_user
+from shared.text_choices import CaregiverTypes, UserRoles
+from shared.utils import approximate_count, hash_passwords
+from .models import OrganizationExportJob, OrganizationStats, ExportJobStatus
+from .organization_export_service import OrganizationExportService, OrganizationExportJobService
+from .organization_service import OrganizationSequenceService, OrganizationStatsService, PatientBulkRegistrationService
+from .views import RegisterPatientView
 
 # Create your tests here.
+
+class OrganizationContextQueryCountTests(TestCase):
+    """
+    Query-count regression tests for the organization views using OrganizationContextMixin.
+    The organization must be resolved once per request, whatever the number of get_organization() calls.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@qcount.test", "Query Count Hospital", "QCH")
+        for i in range(3):
+            create_patient(cls.organization, f"patient{i}@qcount.test", first_name=f"Patient{i}", last_name="Test")
+            create_caregiver(cls.organization, f"caregiver{i}@qcount.test", first_name=f"Caregiver{i}", last_name="Test")
+
+    def setUp(self):
+        cache.clear()
+        self.client = client_for(self.organization.user_id)
+
+    def test_profile(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/organizations/profile/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_latest_patients(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/organizations/latest-patients/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_latest_caregivers(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/organizations/latest-caregivers/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_patient_list(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/organizations/all-patients/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_caregiver_list(self):
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/organizations/all-caregivers/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_responses_skip_the_database(self):
+        self.client.get("/api/v1/organizations/latest-patients/")
+        self.client.force_authenticate(User.objects.get(pk=self.organization.user_id))
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/organizations/latest-patients/")
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ResponseCacheInvalidationTests(TestCase):
+    """Every kind of write to the data behind a cached response evicts it once the transaction commits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@cache.test", "Cache Hospital", "CCH")
+        cls.patient = create_patient(cls.organization, "patient@cache.test", first_name="Cached")
+
+    def setUp(self):
+        cache.clear()
+        self.client = client_for(self.organization.user_id)
+
+    def latest_patients(self):
+        response = self.client.get("/api/v1/organizations/latest-patients/")
+        self.assertEqual(response.status_code, 200)
+        return sorted(row["first_name"] for row in response.data["results"])
+
+    def test_post_save(self):
+        self.assertEqual(self.latest_patients(), ["Cached"])
+        with self.captureOnCommitCallbacks(execute=True):
+            Patient.objects.filter(pk=self.patient.pk).update(first_name="Stale")
+        self.assertEqual(self.latest_patients(), ["Cached"])
+
+        patient = Patient.objects.get(pk=self.patient.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            patient.save()
+        self.assertEqual(self.latest_patients(), ["Stale"])
+
+    def test_post_delete(self):
+        self.assertEqual(self.latest_patients(), ["Cached"])
+        with self.captureOnCommitCallbacks(execute=True):
+            Patient.objects.get(pk=self.patient.pk).hard_delete()
+        self.assertEqual(self.latest_patients(), [])
+
+    def test_user_save(self):
+        self.assertEqual(self.latest_patients(), ["Cached"])
+        user = User.objects.get(pk=self.patient.user_id)
+        user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(self.latest_patients(), [])
+
+    def test_bulk_registration(self):
+        self.assertEqual(self.latest_patients(), ["Cached"])
+        rows = [{"first_name": "Bulk", "last_name": "Patient", "email": "bulk@cache.test", "password": "Str0ng!Passw0rd"}]
+        with mock.patch("apps.organizations.organization_service.send_patient_welcome_emails"):
+            with self.captureOnCommitCallbacks(execute=True):
+                PatientBulkRegistrationService.register_patients(rows, self.organization)
+        self.assertEqual(self.latest_patients(), ["Bulk", "Cached"])
+
+    def test_uncommitted_writes_do_not_evict(self):
+        self.assertEqual(self.latest_patients(), ["Cached"])
+        with self.captureOnCommitCallbacks(execute=False):
+            Patient.objects.get(pk=self.patient.pk).hard_delete()
+        self.assertEqual(self.latest_patients(), ["Cached"])
+
+
+class KeysetPaginationTests(TestCase):
+    url = "/api/v1/organizations/all-patients/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@keyset.test", "Keyset Hospital", "KSH")
+        cls.patients = [create_patient(cls.organization, f"patient{i}@keyset.test", first_name=f"Patient{i:02d}") for i in range(12)]
+
+    def setUp(self):
+        self.client = client_for(self.organization.user_id)
+
+    def names(self, response):
+        return [row["first_name"] for row in response.data["results"]]
+
+    def test_cursor_walks_every_row_once_in_both_directions(self):
+        response = self.client.get(self.url, {"pagination": "cursor", "ordering": "first_name", "page_size": 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["previous"])
+        pages = [self.names(response)]
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            pages.append(self.names(response))
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertEqual(sum(pages, []), [f"Patient{i:02d}" for i in range(12)])
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(self.names(response), pages[1])
+
+    def test_cursor_mode_keeps_the_page_size_cap_of_the_paginator(self):
+        response = self.client.get(self.url, {"pagination": "cursor", "page_size": 100})
+        self.assertEqual(len(response.data["results"]), 10)
+
+    def test_counts_only_on_request(self):
+        response = self.client.get(self.url, {"pagination": "cursor"})
+        self.assertNotIn("count", response.data)
+        response = self.client.get(self.url, {"pagination": "cursor", "count": "exact"})
+        self.assertEqual(response.data["count"], 12)
+        response = self.client.get(self.url, {"pagination": "cursor", "count": "approximate"})
+        self.assertIsInstance(response.data["count"], int)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_approximate_count_is_a_planner_estimate(self):
+        queryset = Patient.objects.filter(organization=self.organization)
+        with self.assertNumQueries(1), mock.patch.object(QuerySet, "count", side_effect=AssertionError("COUNT(*) ran")):
+            estimate = approximate_count(queryset)
+        self.assertIsInstance(estimate, int)
+        self.assertGreaterEqual(estimate, 1)
+
+
+class PatientSearchTests(TestCase):
+    url = "/api/v1/organizations/all-patients/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@patient-search.test", "Patient Search Hospital", "PSH")
+        create_patient(cls.organization, "john1@patient-search.test", first_name="John", last_name="Mensah", medical_id="PSH_0000123")
+        create_patient(cls.organization, "john2@patient-search.test", first_name="John", last_name="Owusu", medical_id="PSH_0000456")
+        create_patient(cls.organization, "jane@patient-search.test", first_name="Jane", last_name="Boateng", medical_id="PSH_0001234")
+
+    def setUp(self):
+        self.client = client_for(self.organization.user_id)
+
+    def search(self, term):
+        response = self.client.get(self.url, {"search": term, "ordering": "last_name"})
+        self.assertEqual(response.status_code, 200)
+        return [row["last_name"] for row in response.data["results"]]
+
+    def test_names(self):
+        self.assertEqual(self.search("john"), ["Mensah", "Owusu"])
+        self.assertEqual(self.search("boat"), ["Boateng"])
+
+    def test_medical_id_prefix_and_numeric_part(self):
+        self.assertEqual(self.search("psh_00004"), ["Owusu"])
+        self.assertEqual(self.search("123"), ["Boateng", "Mensah"])
+
+    def test_name_and_identifier_terms_combine(self):
+        self.assertEqual(self.search("john 123"), ["Mensah"])
+        self.assertEqual(self.search("owusu 123"), [])
+
+
+class OrganizationStatsTests(TestCase):
+    COUNTERS = [
+        "caregivers_total", "caregivers_active", "caregivers_verified",
+        "patients_total", "patients_active", "patients_verified",
+        "patients_active_male", "patients_active_female", "patients_verified_male", "patients_verified_female",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@stats.test", "Stats Hospital", "STH")
+        cls.patient = create_patient(cls.organization, "patient@stats.test", gender="Male")
+        create_patient(cls.organization, "other@stats.test", gender="Female")
+        cls.caregiver = create_caregiver(cls.organization, "caregiver@stats.test")
+        OrganizationStatsService.reconcile(organization_ids=[cls.organization.pk])
+
+    def setUp(self):
+        self.client = client_for(self.organization.user_id)
+
+    def counters(self):
+        return OrganizationStats.objects.filter(organization=self.organization).values(*self.COUNTERS).get()
+
+    def assertCountersChanged(self, before, **deltas):
+        """The counters moved by exactly `deltas`, and agree with a full recount."""
+        after = self.counters()
+        self.assertEqual({field: after[field] - before[field] for field in self.COUNTERS if after[field] != before[field]}, deltas)
+        OrganizationStatsService.reconcile(organization_ids=[self.organization.pk])
+        self.assertEqual(self.counters(), after)
+
+    def test_initial_counters(self):
+        self.assertEqual(self.counters(), {
+            "caregivers_total": 1, "caregivers_active": 1, "caregivers_verified": 1,
+            "patients_total": 2, "patients_active": 2, "patients_verified": 2,
+            "patients_active_male": 1, "patients_active_female": 1, "patients_verified_male": 1, "patients_verified_female": 1,
+        })
+
+    def test_patient_toggle_status(self):
+        before = self.counters()
+        response = self.client.patch(f"/api/v1/organizations/all-patients/{self.patient.slug}/toggle-status/")
+        self.assertEqual(response.status_code, 200)
+        self.assertCountersChanged(before, patients_active=-1, patients_verified=-1, patients_active_male=-1, patients_verified_male=-1)
+
+    def test_caregiver_toggle_status(self):
+        before = self.counters()
+        response = self.client.patch(f"/api/v1/organizations/all-caregivers/{self.caregiver.id}/toggle-status/")
+        self.assertEqual(response.status_code, 200)
+        self.assertCountersChanged(before, caregivers_active=-1, caregivers_verified=-1)
+
+    def test_gender_edit_moves_the_patient_between_gender_counters(self):
+        before = self.counters()
+        response = self.client.patch(f"/api/v1/organizations/all-patients/{self.patient.slug}/", {"gender": "Female"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertCountersChanged(
+            before, patients_active_male=-1, patients_verified_male=-1, patients_active_female=1, patients_verified_female=1,
+        )
+
+        before = self.counters()
+        patient = Patient.objects.get(pk=self.patient.pk)
+        patient.first_name = "Renamed"
+        patient.save()
+        self.assertCountersChanged(before)
+
+    def test_soft_delete_and_restore(self):
+        before = self.counters()
+        patient = Patient.objects.get(pk=self.patient.pk)
+        patient.delete()
+        removed = dict(patients_total=-1, patients_active=-1, patients_verified=-1, patients_active_male=-1, patients_verified_male=-1)
+        self.assertCountersChanged(before, **removed)
+
+        patient.restore()
+        self.assertCountersChanged(before)
+
+    def test_reconcile_repairs_drift(self):
+        expected = self.counters()
+        OrganizationStats.objects.filter(organization=self.organization).update(patients_total=42, caregivers_active=0)
+        self.assertEqual(OrganizationStatsService.reconcile(organization_ids=[self.organization.pk]), 1)
+        self.assertEqual(self.counters(), expected)
+
+
+class OrganizationSequenceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@sequence.test", "Sequence Hospital", "Seq")
+        cls.other = create_organization("other@sequence.test", "Other Sequence Hospital", "OSQ")
+
+    def test_medical_ids_are_allocated_per_organization(self):
+        first = create_patient(self.organization, "patient1@sequence.test")
+        second = create_patient(self.organization, "patient2@sequence.test")
+        other = create_patient(self.other, "patient@sequence.test")
+        self.assertEqual([first.medical_id, second.medical_id, other.medical_id], ["SEQ_0000001", "SEQ_0000002", "OSQ_0000001"])
+        self.assertEqual(OrganizationSequenceService.next_medical_ids(self.organization, 3), ["SEQ_0000003", "SEQ_0000004", "SEQ_0000005"])
+
+    def test_staff_numbers_are_allocated_per_role(self):
+        doctors = [create_caregiver(self.organization, f"doctor{i}@sequence.test", caregiver_type=CaregiverTypes.DOCTOR) for i in range(2)]
+        nurse = create_caregiver(self.organization, "nurse@sequence.test", caregiver_type=CaregiverTypes.NURSE)
+        self.assertEqual([caregiver.staff_number for caregiver in doctors], ["SEQ_DR_00001", "SEQ_DR_00002"])
+        self.assertEqual(nurse.staff_number, "SEQ_NUR_00001")
+
+    def test_acronyms_differing_only_by_case_are_rejected(self):
+        serializer = OrganizationSignupSerializer(data={"name": "Clash", "acronym": "seq", "email": "clash@sequence.test", "password": "pass"})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("acronym", serializer.errors)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            create_organization("clash@sequence.test", "Clash Hospital", "SEQ")
+
+        # The first organization keeps allocating
+        self.assertEqual(create_patient(self.organization, "after@sequence.test").medical_id, "SEQ_0000001")
+
+
+class OrganizationExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@export.test", "Export Hospital", "EXH")
+        for i in range(5):
+            create_patient(cls.organization, f"patient{i}@export.test", first_name=f"Patient{i}", last_name="Export")
+        Patient.objects.order_by("pkid").last().delete()
+
+        other = create_organization("other@export.test", "Other Hospital", "OTH")
+        create_patient(other, "outsider@export.test", first_name="Outsider", last_name="Export")
+
+    def setUp(self):
+        self.client = client_for(self.organization.user_id)
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_streams_alive_rows_of_the_organization_in_a_single_query(self):
+        with self.assertNumQueries(2):
+            lines = self.export("/api/v1/organizations/exports/patients.csv").splitlines()
+        self.assertTrue(lines[0].startswith("id,medical_id,first_name"))
+        self.assertEqual([line.split(",")[2] for line in lines[1:]], [f"Patient{i}" for i in range(4)])
+
+    def test_ndjson_resumes_after_cursor(self):
+        rows = [json.loads(line) for line in self.export("/api/v1/organizations/exports/patients.ndjson").splitlines()]
+        resumed = [json.loads(line) for line in self.export(f"/api/v1/organizations/exports/patients.ndjson?after={rows[1]['id']}").splitlines()]
+        self.assertEqual([row["id"] for row in resumed], [row["id"] for row in rows[2:]])
+
+    def test_created_range_filter(self):
+        body = self.export("/api/v1/organizations/exports/patients.csv?created_before=2000-01-01")
+        self.assertEqual(len(body.splitlines()), 1)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get("/api/v1/organizations/exports/unknown.csv").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/organizations/exports/patients.csv?after=not-a-cursor").status_code, 400)
+        self.assertEqual(self.client.get("/api/v1/organizations/exports/patients.csv?created_after=yesterday").status_code, 400)
+
+
+class OrganizationExportJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@exportjob.test", "Export Job Hospital", "EJH")
+        for i in range(7):
+            create_patient(cls.organization, f"patient{i}@exportjob.test", first_name=f"Patient{i}", last_name="Export")
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(EXPORT_FILES_ROOT=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def read_file(self, job):
+        with OrganizationExportJobService.get_storage().open(job.file_name, "rb") as f:
+            return gzip.decompress(f.read()).decode()
+
+    def test_identical_requests_share_a_job(self):
+        job, created = OrganizationExportJobService.request_export(self.organization.pk, "patients", "csv")
+        again, created_again = OrganizationExportJobService.request_export(self.organization.pk, "patients", "csv")
+        other, created_other = OrganizationExportJobService.request_export(self.organization.pk, "patients", "ndjson")
+        self.assertTrue(created)
+        self.assertFalse(created_again)
+        self.assertEqual(job.pk, again.pk)
+        self.assertTrue(created_other)
+
+    def test_racing_request_retries_when_the_winning_job_is_no_longer_active(self):
+        create = OrganizationExportJob.objects.create
+        attempts = []
+
+        def lose_the_race_once(**fields):
+            attempts.append(fields["fingerprint"])
+            if len(attempts) == 1:
+                # A concurrent job held the fingerprint, and is no longer pending or running
+                raise IntegrityError("duplicate key value violates unique constraint")
+            return create(**fields)
+
+        with mock.patch.object(OrganizationExportJob.objects, "create", side_effect=lose_the_race_once), \
+                mock.patch.object(OrganizationExportJobService, "enqueue"):
+            job, created = OrganizationExportJobService.request_export(self.organization.pk, "patients", "csv")
+        self.assertEqual((len(attempts), created, job.status), (2, True, ExportJobStatus.PENDING))
+
+    def test_interrupted_job_resumes_from_its_checkpoint(self):
+        job, _ = OrganizationExportJobService.request_export(self.organization.pk, "patients", "csv")
+        fetch_batch = OrganizationExportService.fetch_batch
+        calls = []
+
+        def failing_fetch_batch(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 3:
+                raise RuntimeError("connection lost")
+            return fetch_batch(*args, **kwargs)
+
+        with mock.patch.object(OrganizationExportService, "fetch_batch", side_effect=failing_fetch_batch):
+            with self.assertRaises(RuntimeError):
+                OrganizationExportJobService.run(job.pk, batch_size=3)
+        OrganizationExportJobService.mark_failed(job.pk, "connection lost")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written), (ExportJobStatus.FAILED, 6))
+
+        job = OrganizationExportJobService.run(job.pk, batch_size=3)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_written, job.attempts), (ExportJobStatus.COMPLETED, 7, 2))
+
+        queryset = OrganizationExportService.get_queryset("patients", self.organization.pk)
+        self.assertEqual(self.read_file(job), "".join(OrganizationExportService.stream(queryset, "patients", "csv")))
+
+    def test_job_detail_is_scoped_to_the_organization_account(self):
+        job, _ = OrganizationExportJobService.request_export(self.organization.pk, "patients", "csv")
+        url = f"/api/v1/organizations/export-jobs/{job.id}/"
+        response = client_for(self.organization.user_id).get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["id"], str(job.id))
+
+        other = create_organization("other@exportjob.test", "Other Export Hospital", "OEH")
+        self.assertEqual(client_for(other.user_id).get(url).status_code, 404)
+        # An organization account without its organization profile
+        user = create_user("no-profile@exportjob.test", UserRoles.ORGANIZATION)
+        self.assertEqual(client_for(user.pk).get(url).status_code, 404)
+
+    def test_running_job_is_not_claimed_twice(self):
+        job, _ = OrganizationExportJobService.request_export(self.organization.pk, "patients", "csv")
+        self.assertIsNotNone(OrganizationExportJobService.claim(job.pk))
+        self.assertIsNone(OrganizationExportJobService.claim(job.pk))
+
+
+class RegisterPatientIdempotencyTests(TestCase):
+    url = "/api/v1/organizations/register-new-patient/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@register.test", "Register Hospital", "RGH")
+
+    def payload(self, password="Str0ng!Passw0rd", picture=b"not an image"):
+        return {
+            "first_name": "Multi", "last_name": "Part", "email": "multipart@register.test", "password": password,
+            "profile_picture": SimpleUploadedFile("face.png", picture, content_type="image/png"),
+        }
+
+    def fingerprint(self, payload):
+        request = Request(APIRequestFactory().post(self.url, payload, format="multipart"), parsers=[MultiPartParser()])
+        fingerprint = RegisterPatientView().get_idempotency_fingerprint(request)
+        # The upload is still readable by the serializer
+        self.assertEqual(request.data["profile_picture"].read(), payload["profile_picture"].open().read())
+        return fingerprint
+
+    def test_multipart_upload_is_fingerprinted(self):
+        response = client_for(self.organization.user_id).post(self.url, self.payload(), format="multipart", HTTP_IDEMPOTENCY_KEY="picture")
+        self.assertEqual(response.status_code, 400)
+        # Rejected by the serializer, after the fingerprint of the upload
+        self.assertIn("profile_picture", str(response.data))
+
+    def test_fingerprint_hashes_file_contents_and_skips_passwords(self):
+        fingerprint = self.fingerprint(self.payload())
+        self.assertEqual(fingerprint, self.fingerprint(self.payload(password="An0ther!Passw0rd")))
+        self.assertNotEqual(fingerprint, self.fingerprint(self.payload(picture=b"another image")))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BulkRegisterPatientsTests(TestCase):
+    url = "/api/v1/organizations/bulk-register-patients/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@bulk.test", "Bulk Hospital", "BLK")
+        create_user("taken@bulk.test", UserRoles.PATIENT)
+
+    def setUp(self):
+        self.client = client_for(self.organization.user_id)
+
+    def row(self, i, **overrides):
+        row = {"first_name": "Bulk", "last_name": "Patient", "email": f"patient{i}@bulk.test", "password": "Str0ng!Passw0rd", "gender": "Female"}
+        row.update(overrides)
+        return row
+
+    def test_registers_all_rows(self):
+        rows = [self.row(i, medical_record={"blood_group": "O+", "genotype": "AA"}) for i in range(3)]
+        with mock.patch("apps.organizations.organization_service.send_patient_welcome_emails") as send:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 3)
+        self.assertEqual([result["medical_id"] for result in response.data["results"]], ["BLK_0000001", "BLK_0000002", "BLK_0000003"])
+        send.delay.assert_called_once()
+        self.assertEqual(len(send.delay.call_args.args[0]), 3)
+
+        patient = Patient.objects.get(user__email="patient1@bulk.test")
+        self.assertTrue(patient.user.check_password("Str0ng!Passw0rd"))
+        self.assertEqual(patient.patientmedicalrecord.blood_group, "O+")
+        self.assertEqual(OrganizationStats.objects.get(organization=self.organization).patients_total, 3)
+
+    def test_invalid_row_rejects_the_batch(self):
+        rows = [self.row(0), self.row(1, email="TAKEN@bulk.test"), self.row(2, email="patient0@bulk.test")]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Patient.objects.filter(organization=self.organization).exists())
+
+    def test_partial_success_reports_failed_rows(self):
+        rows = [self.row(0), self.row(1, email="taken@bulk.test")]
+        response = self.client.post(f"{self.url}?partial_success=true", rows, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result["status"] for result in response.data["results"]], ["created", "failed"])
+
+    def test_csv_upload(self):
+        content = "first_name,last_name,email,password,blood_group,genotype\nCsv,Patient,csv@bulk.test,Str0ng!Passw0rd,A+,AS\n"
+        response = self.client.post(self.url, {"file": SimpleUploadedFile("patients.csv", content.encode(), content_type="text/csv")}, format="multipart")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Patient.objects.get(user__email="csv@bulk.test").patientmedicalrecord.genotype, "AS")
+
+    def test_unreadable_csv_upload_is_rejected(self):
+        for name, content in [
+            ("latin-1", "first_name,last_name,email,password\nJos\xe9,Patient,jose@bulk.test,Str0ng!Passw0rd\n".encode("latin-1")),
+            ("unterminated quote", b'first_name,last_name\n"Csv,Patient\n' + b"x" * (csv.field_size_limit() + 1)),
+        ]:
+            with self.subTest(name):
+                response = self.client.post(self.url, {"file": SimpleUploadedFile("patients.csv", content, content_type="text/csv")}, format="multipart")
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(Patient.objects.filter(organization=self.organization).exists())
+
+    def test_password_hashes_keep_the_input_order(self):
+        passwords = [f"Passw0rd!{i}" for i in range(6)]
+        hashes = hash_passwords(passwords, workers=3)
+        self.assertTrue(all(check_password(password, hashed) for password, hashed in zip(passwords, hashes)))
+
+
+class OrganizationQuerysetIndexTests(TestCase):
+    """
+    Every organization-scoped queryset of the API must be served by the partial index on the
+    alive rows (WHERE deleted_at IS NULL) of its model. Sequential scans are disabled so that the
+    planner picks an index even on the tiny test tables.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@explain.test", "Explain Hospital", "EXH")
+        cls.patient = create_patient(cls.organization, "patient@explain.test", first_name="Explain", last_name="Patient")
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+        self.addCleanup(self.reset_seqscan)
+
+    @staticmethod
+    def reset_seqscan():
+        with connection.cursor() as cursor:
+            cursor.execute("RESET enable_seqscan")
+
+    @staticmethod
+    def alive_indexes(model, first_field):
+        return [
+            index.name for index in model._meta.indexes
+            if index.condition is not None and index.fields[0] == first_field and "deleted_at__isnull" in str(index.condition)
+        ]
+
+    def organization_views(self, patterns=None):
+        for pattern in get_resolver().url_patterns if patterns is None else patterns:
+            if isinstance(pattern, URLResolver):
+                yield from self.organization_views(pattern.url_patterns)
+                continue
+            view_class = getattr(pattern.callback, "cls", None)
+            if view_class and issubclass(view_class, OrganizationContextMixin) and getattr(view_class, "get_queryset", GenericAPIView.get_queryset) is not GenericAPIView.get_queryset:
+                yield view_class, getattr(pattern.callback, "initkwargs", {})
+
+    def build_view(self, view_class, initkwargs):
+        view = view_class(**initkwargs)
+        view.request = Request(APIRequestFactory().get("/"))
+        view.request.user = User.objects.get(pk=self.organization.user_id)
+        view.args, view.kwargs, view.format_kwarg = (), {}, None
+        return view
+
+    def assertUsesIndex(self, queryset, index_names, label):
+        self.assertTrue(index_names, f"{label}: {queryset.model.__name__} has no partial index on its alive rows")
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in index_names), f"{label} does not use {index_names}:\n{plan}")
+
+    def test_organization_scoped_view_querysets_use_the_alive_partial_indexes(self):
+        checked = set()
+        for view_class, initkwargs in self.organization_views():
+            queryset = self.build_view(view_class, initkwargs).get_queryset()
+            if not isinstance(queryset, QuerySet) or not issubclass(queryset.model, SoftDeleteModel):
+                continue
+            self.assertUsesIndex(queryset, self.alive_indexes(queryset.model, "organization"), view_class.__name__)
+            checked.add(view_class.__name__)
+        self.assertTrue({"PatientViewSet", "CaregiverViewSet", "PatientDiagnosisVitalSignViewSet", "PatientDiagnosisHistoryView"} <= checked, checked)
+
+    def test_export_querysets_use_the_alive_partial_indexes(self):
+        for dataset in ("patients", "diagnoses"):
+            queryset = OrganizationExportService.get_queryset(dataset, self.organization.pk)
+            self.assertUsesIndex(queryset, self.alive_indexes(queryset.model, "organization"), f"{dataset} export")
+
+    def test_protected_foreign_keys_keep_a_full_index(self):
+        from apps.caregivers.models import Caregiver
+
+        for model, field in ((PatientDiagnosisDetails, "patient"), (PatientDiagnosisDetails, "organization"), (Caregiver, "organization")):
+            column = model._meta.get_field(field).column
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(*) FROM pg_index i JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0] "
+                    "WHERE i.indrelid = %s::regclass AND a.attname = %s AND i.indpred IS NULL",
+                    [model._meta.db_table, column],
+                )
+                self.assertTrue(cursor.fetchone()[0], f"{model.__name__}.{field} has no index covering soft-deleted rows")
+
+    def test_patient_diagnosis_history_uses_the_alive_partial_index(self):
+        view = self.build_view(PatientDiagnosisHistoryView, {})
+        queryset = view.get_diagnoses_queryset(self.patient)
+        self.assertUsesIndex(queryset, self.alive_indexes(PatientDiagnosisDetails, "patient"), "diagnosis history")
@@ -1,6 +1,7 @@
 from django.urls import path,include
 from rest_framework.routers import DefaultRouter
-from .views import (LatestPatientsView, OrganizationDashboardView,OrganizationProfileView,PatientViewSet, RegisterPatientView,CaregiverViewSet,LatestCaregiverView)
+from .views import (LatestPatientsView, OrganizationDashboardView,OrganizationProfileView,PatientViewSet, RegisterPatientView,BulkRegisterPatientsView,CaregiverViewSet,LatestCaregiverView,OrganizationExportView,
+                    OrganizationExportJobListCreateView,OrganizationExportJobDetailView,OrganizationExportJobDownloadView)
 
 
 router = DefaultRouter()
@@ -14,8 +15,14 @@ urlpatterns = [
     
     path('latest-patients/', LatestPatientsView.as_view(),name='latest-patients'),
     path('register-new-patient/', RegisterPatientView.as_view(), name='register-new-patient'),
+    path('bulk-register-patients/', BulkRegisterPatientsView.as_view(), name='bulk-register-patients'),
     
     path('latest-caregivers/', LatestCaregiverView.as_view(),name='latest-caregivers'),
+
+    path('exports/<str:dataset>.<str:file_format>', OrganizationExportView.as_view(), name='organization-export'),
+    path('export-jobs/', OrganizationExportJobListCreateView.as_view(), name='organization-export-jobs'),
+    path('export-jobs/<uuid:id>/', OrganizationExportJobDetailView.as_view(), name='organization-export-job-detail'),
+    path('export-jobs/<uuid:id>/download/', OrganizationExportJobDownloadView.as_view(), name='organization-export-job-download'),
 ]
 
 
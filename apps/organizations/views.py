@@ -1,4 +1,6 @@
 from django.shortcuts import get_object_or_404
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.db.models import Count, Q,Sum
 from apps.patients.models import Patient
 from rest_framework.response import Response
@@ -6,27 +8,37 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.generics import UpdateAPIView,RetrieveAPIView,ListAPIView,CreateAPIView
-from shared.mixins import OrganizationContextMixin
+from shared.mixins import OrganizationContextMixin, FileResponseMixin
+from shared.cache import CachedResponseMixin, CacheNamespaces
+from shared.idempotency import IdempotentCreateMixin
 from apps.patients.serializers import PatientSerializer
-from .models import Organization
+from .models import Organization, OrganizationExportJob, ExportJobStatus
+from .organization_service import OrganizationStatsService, PatientBulkRegistrationService
+from .organization_export_service import OrganizationExportService, OrganizationExportJobService
+from .exceptions import CaregiverNotFoundException, ExportJobNotFoundException, ExportJobNotReadyException
+from apps.patients.exceptions import PatientNotFoundException
+from django.db import transaction
 from .permissions import IsOrganization, IsOrganizationWithAccount
 from apps.caregivers.models import Caregiver
 from rest_framework.exceptions import NotFound
 from rest_framework import generics
-from .serializers import OrganizationRegisterPatientSerializer, OrganizationSerializer
+from .serializers import OrganizationRegisterPatientSerializer, OrganizationSerializer, OrganizationExportJobSerializer, OrganizationBulkPatientRegistrationSerializer
 from apps.caregivers.serializers import CaregiverSerializer
 from apps.caregivers.permissions import IsCaregiver
 from shared.text_choices import UserRoles
 from shared.pagination import StandardResultsSetPagination
+from shared.search import TrigramSearchFilter
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
 from rest_framework.mixins import RetrieveModelMixin,UpdateModelMixin,DestroyModelMixin,ListModelMixin
 from rest_framework import viewsets
 from rest_framework.decorators import action
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 
 
 #james65@example.com
 
-class OrganizationDashboardView(APIView):
+class OrganizationDashboardView(OrganizationContextMixin, APIView):
     """
     Retrieves organization statistics and latest 10 caregivers and patient for the dashboard.
     """
@@ -34,23 +46,23 @@ class OrganizationDashboardView(APIView):
 
     def get(self, request, *args, **kwargs):
 
-        organization = request.user.organization
+        stats = OrganizationStatsService.get_stats(self.get_organization_id())
 
-        caregiver_stats = Caregiver.objects.filter(organization=organization).aggregate(
-            total=Count("pkid"),
-            active=Count("pkid", filter=Q(user__is_active=True)),
-            verified=Count("pkid", filter=Q(user__is_verified=True)),
-        )
+        caregiver_stats = {
+            "total": stats.caregivers_total,
+            "active": stats.caregivers_active,
+            "verified": stats.caregivers_verified,
+        }
 
-        patient_stats = Patient.objects.filter(organization=organization).aggregate(
-            total=Count("pkid"),
-            active=Count("pkid", filter=Q(user__is_active=True)),
-            verified=Count("pkid", filter=Q(user__is_verified=True)),
-            active_male=Count("pkid", filter=Q(user__is_active=True, gender="Male")),
-            active_female=Count("pkid", filter=Q(user__is_active=True, gender="Female")),
-            verified_male=Count("pkid", filter=Q(user__is_verified=True, gender="Male")),
-            verified_female=Count("pkid", filter=Q(user__is_verified=True, gender="Female")),
-        )
+        patient_stats = {
+            "total": stats.patients_total,
+            "active": stats.patients_active,
+            "verified": stats.patients_verified,
+            "active_male": stats.patients_active_male,
+            "active_female": stats.patients_active_female,
+            "verified_male": stats.patients_verified_male,
+            "verified_female": stats.patients_verified_female,
+        }
 
         response_data = {
             "statistics": {
@@ -62,19 +74,18 @@ class OrganizationDashboardView(APIView):
         return Response({"message": "Organization Dashboard Data", "data": response_data}, status=status.HTTP_200_OK)
 
 
-class OrganizationProfileView(generics.RetrieveUpdateAPIView):
+class OrganizationProfileView(CachedResponseMixin, OrganizationContextMixin, generics.RetrieveUpdateAPIView):
     """
     Retrieve or update the profile of the logged-in organization.
     """
     serializer_class = OrganizationSerializer
     permission_classes = [IsAuthenticated, IsOrganization]
     parser_classes = (MultiPartParser, FormParser)
+    cache_ttl = 60 * 30
+    cache_dependencies = (CacheNamespaces.ORGANIZATION,)
 
     def get_object(self):
-        try:
-            return Organization.objects.get(user=self.request.user)
-        except Organization.DoesNotExist:
-            raise NotFound("Organization not found for this user")
+        return self.get_organization()
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -90,55 +101,64 @@ class OrganizationProfileView(generics.RetrieveUpdateAPIView):
         return Response({"message": "Organization profile updated successfully","data": serializer.data})
     
 
-class LatestPatientsView(OrganizationContextMixin, ListAPIView):
+class LatestPatientsView(CachedResponseMixin, OrganizationContextMixin, ListAPIView):
     permission_classes = [IsAuthenticated, IsOrganization | IsCaregiver]
     serializer_class = PatientSerializer
+    cache_ttl = 60 * 5
+    cache_dependencies = (CacheNamespaces.PATIENTS,)
 
     def get_queryset(self):
-        organization = self.get_organization()
+        organization_id = self.get_organization_id()
         return Patient.objects.filter(
-            organization=organization,
+            organization_id=organization_id,
             user__is_verified=True,
             user__is_active=True,
             user__role=UserRoles.PATIENT
-        )[:5]
+        ).select_related('user')[:5]
     
 class PatientViewSet(OrganizationContextMixin,ListModelMixin,RetrieveModelMixin,UpdateModelMixin,DestroyModelMixin,viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated, IsOrganization | IsCaregiver]
     serializer_class = PatientSerializer
-    search_fields = ['first_name', 'last_name', 'medical_id']
+    search_fields = ['first_name', 'last_name', '^medical_id']
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter, OrderingFilter]
     filterset_fields = ['medical_id', 'user__is_active']
     pagination_class = StandardResultsSetPagination
     lookup_field = 'slug'
 
     def get_queryset(self):
-        organization = self.get_organization()
+        organization_id = self.get_organization_id()
         return Patient.objects.filter(
-                organization=organization,
+                organization_id=organization_id,
                 user__is_verified=True,
                 user__is_active=True,
                 user__role=UserRoles.PATIENT
-            )
+            ).select_related('user')
     
     @action(detail=True, methods=['patch'], url_path='toggle-status')
     def toggle_status(self, request, slug=None):
         """
         Toggle the patient's active status
         """
-        patient = Patient.objects.filter(slug=slug,organization=self.get_organization()).first()
-        patient.user.is_active = not patient.user.is_active
-        patient.user.is_verified = not patient.user.is_verified
-        patient.user.save()
+        patient = Patient.objects.select_related('user').filter(slug=slug,organization_id=self.get_organization_id()).first()
+        if patient is None:
+            raise PatientNotFoundException()
+        with transaction.atomic():
+            before = OrganizationStatsService.patient_counters(patient)
+            patient.user.is_active = not patient.user.is_active
+            patient.user.is_verified = not patient.user.is_verified
+            patient.user.save()
+            OrganizationStatsService.record_change(patient.organization_id, before, OrganizationStatsService.patient_counters(patient))
         serializer = self.get_serializer(patient)
         return Response({"message": "Patient status toggled {} successfully".format("off" if patient.user.is_active else "on"), "data": serializer.data},status=status.HTTP_200_OK)
     
 from drf_yasg.utils import swagger_auto_schema
 @swagger_auto_schema(parser_classes=[MultiPartParser, FormParser])
-class RegisterPatientView(CreateAPIView):
+class RegisterPatientView(IdempotentCreateMixin, CreateAPIView):
 
     """
     Creates a new patient associated with the authenticated organization and send a notification
-    to the user notifying them that an account has been created for them
+    to the user notifying them that an account has been created for them. Honors the
+    `Idempotency-Key` header, so a retried request registers the patient once.
     """ 
 
     serializer_class = OrganizationRegisterPatientSerializer
@@ -149,45 +169,171 @@ class RegisterPatientView(CreateAPIView):
         serializer.save()
 
 
-class LatestCaregiverView(OrganizationContextMixin, ListAPIView):
+
+class BulkRegisterPatientsView(OrganizationContextMixin, APIView):
+    """
+    Registers many patients in one request, from a JSON array (or {"patients": [...]}) or an
+    uploaded CSV `file` whose header names the patient fields. Returns a result per row.
+    """
+    permission_classes = [IsAuthenticated, IsOrganizationWithAccount]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = OrganizationBulkPatientRegistrationSerializer(
+            data=self.get_payload(request),
+            context={'request': request, 'organization': self.get_organization()},
+        )
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
+    def get_payload(self, request):
+        partial_success = request.query_params.get('partial_success')
+        if 'file' in request.FILES:
+            payload = {
+                'patients': PatientBulkRegistrationService.rows_from_csv(request.FILES['file'].file),
+                'partial_success': request.data.get('partial_success', partial_success),
+            }
+        elif isinstance(request.data, list):
+            payload = {'patients': request.data, 'partial_success': partial_success}
+        else:
+            payload = request.data.copy() if hasattr(request.data, 'copy') else dict(request.data)
+            payload.setdefault('partial_success', partial_success)
+        if payload.get('partial_success') is None:
+            payload.pop('partial_success')
+        return payload
+
+class LatestCaregiverView(CachedResponseMixin, OrganizationContextMixin, ListAPIView):
     permission_classes = [IsAuthenticated, IsOrganization | IsCaregiver]
     serializer_class = CaregiverSerializer
+    cache_ttl = 60 * 5
+    cache_dependencies = (CacheNamespaces.CAREGIVERS,)
 
     def get_queryset(self):
-        organization = self.get_organization()
+        organization_id = self.get_organization_id()
         return Caregiver.objects.filter(
-            organization=organization,
+            organization_id=organization_id,
             user__is_verified=True,
             user__is_active=True,
             user__role=UserRoles.CAREGIVER
-        )[:5]
+        ).select_related('user')[:5]
     
 class CaregiverViewSet(OrganizationContextMixin,ListModelMixin,RetrieveModelMixin,UpdateModelMixin,DestroyModelMixin,viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated, IsOrganization]
     serializer_class = CaregiverSerializer
-    search_fields = ['first_name', 'last_name', 'staff_number']
+    search_fields = ['first_name', 'last_name', '^staff_number']
+    filter_backends = [DjangoFilterBackend, TrigramSearchFilter, OrderingFilter]
     filterset_fields = ['caregiver_type', 'user__is_active']
     pagination_class = StandardResultsSetPagination
     lookup_field = 'id'
 
     def get_queryset(self):
-        organization = self.get_organization()
+        organization_id = self.get_organization_id()
         return Caregiver.objects.filter(
-                organization=organization,
+                organization_id=organization_id,
                 user__is_verified=True,
                 user__is_active=True,
                 user__role=UserRoles.CAREGIVER
-            )
+            ).select_related('user')
     
     @action(detail=True, methods=['patch'], url_path='toggle-status')
-    def toggle_status(self, request, slug=None):
+    def toggle_status(self, request, id=None):
         """
         Toggle the caregiver's active status
         """
-        caregiver = Caregiver.objects.filter(slug=slug,organization=self.get_organization()).first()
-        caregiver.user.is_active = not caregiver.user.is_active
-        caregiver.user.is_verified = not caregiver.user.is_verified
-        caregiver.user.save()
+        caregiver = Caregiver.objects.select_related('user').filter(id=id,organization_id=self.get_organization_id()).first()
+        if caregiver is None:
+            raise CaregiverNotFoundException()
+        with transaction.atomic():
+            before = OrganizationStatsService.caregiver_counters(caregiver)
+            caregiver.user.is_active = not caregiver.user.is_active
+            caregiver.user.is_verified = not caregiver.user.is_verified
+            caregiver.user.save()
+            OrganizationStatsService.record_change(caregiver.organization_id, before, OrganizationStatsService.caregiver_counters(caregiver))
         serializer = self.get_serializer(caregiver)
         return Response({"message": "Caregiver status toggled {} successfully".format("off" if caregiver.user.is_active else "on"), "data": serializer.data},status=status.HTTP_200_OK)
     
+
+
+class OrganizationExportView(FileResponseMixin, OrganizationContextMixin, APIView):
+    """
+    Streams an organization's patients, medical records, diagnoses or vital signs as CSV or NDJSON,
+    e.g. `exports/diagnoses.ndjson?created_after=2024-01-01&created_before=2024-06-30`.
+    Rows are ordered by creation; an interrupted export resumes with `?after=<id of the last row received>`.
+    """
+    permission_classes = [IsAuthenticated, IsOrganizationWithAccount]
+
+    def get(self, request, dataset, file_format, *args, **kwargs):
+        if file_format not in OrganizationExportService.FORMATS:
+            raise NotFound(f"Unsupported export format '{file_format}'.")
+
+        params = request.query_params
+        queryset = OrganizationExportService.get_queryset(
+            dataset,
+            self.get_organization_id(),
+            created_after=OrganizationExportService.parse_created_bound(params.get('created_after'), 'created_after'),
+            created_before=OrganizationExportService.parse_created_bound(params.get('created_before'), 'created_before', end_of_day=True),
+            after=params.get('after') or None,
+        )
+
+        response = StreamingHttpResponse(
+            OrganizationExportService.stream(queryset, dataset, file_format),
+            content_type=f"{OrganizationExportService.FORMATS[file_format]}; charset=utf-8",
+        )
+        acronym = getattr(request.user, 'organization_acronym', None) or self.get_organization().acronym
+        filename = f"{acronym.lower()}-{dataset}-{timezone.now():%Y%m%d%H%M%S}.{file_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class OrganizationExportJobListCreateView(OrganizationContextMixin, generics.ListCreateAPIView):
+    """
+    POST queues a background export (or returns the job already serving the same export);
+    GET lists the organization's export jobs.
+    """
+    permission_classes = [IsAuthenticated, IsOrganizationWithAccount]
+    serializer_class = OrganizationExportJobSerializer
+
+    def get_queryset(self):
+        return OrganizationExportJob.objects.filter(organization_id=self.get_organization_id())
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job, created = OrganizationExportJobService.request_export(
+            self.get_organization_id(),
+            requested_by_id=request.user.pk,
+            **serializer.validated_data,
+        )
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+
+
+class OrganizationExportJobDetailView(OrganizationContextMixin, RetrieveAPIView):
+    """Status and progress of an export job, for polling."""
+    permission_classes = [IsAuthenticated, IsOrganizationWithAccount]
+    serializer_class = OrganizationExportJobSerializer
+    lookup_field = 'id'
+
+    def get_queryset(self):
+        return OrganizationExportJob.objects.filter(organization_id=self.get_organization_id())
+
+
+class OrganizationExportJobDownloadView(FileResponseMixin, OrganizationContextMixin, APIView):
+    """Downloads the gzip file of a completed export job."""
+    permission_classes = [IsAuthenticated, IsOrganizationWithAccount]
+
+    def get(self, request, id, *args, **kwargs):
+        job = OrganizationExportJob.objects.filter(organization_id=self.get_organization_id(), id=id).first()
+        if job is None:
+            raise ExportJobNotFoundException()
+        if job.status != ExportJobStatus.COMPLETED:
+            raise ExportJobNotReadyException(f"Export job is {job.status.lower()}.")
+
+        storage = OrganizationExportJobService.get_storage()
+        if not storage.exists(job.file_name):
+            raise ExportJobNotFoundException("Export file is no longer available.")
+
+        filename = f"{job.dataset}-{job.created_at:%Y%m%d%H%M%S}.{job.file_format}.gz"
+        return FileResponse(storage.open(job.file_name, 'rb'), as_attachment=True, filename=filename, content_type='application/gzip')
+
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Patient,PatientMedicalRecord,PatientDiagnosisDetails,VitalSign
+from .models import Patient,PatientMedicalRecord,PatientDiagnosisDetails,PatientDiagnosisSummary,VitalSign,VitalSignRollup,ProcessingWatermark,VitalAlert,VitalAlertRule
 from shared.admin import SoftDeleteAdmin
 
 @admin.register(Patient)
@@ -16,11 +16,38 @@ class PatientDiagnosisDetailsAdmin(SoftDeleteAdmin):
 
 @admin.register(VitalSign)
 class VitalSignAdmin(SoftDeleteAdmin):
-    list_display = ('patient_diagnoses_details', 'body_temperature', 'pulse_rate', 'blood_pressure', 'blood_oxygen', 'respiration_rate','id')  # Updated field name
-    search_fields = ('patient_diagnoses_details__patient__first_name', 'patient_diagnoses_details__patient__last_name')  # Updated field name
-    list_filter = ('is_deleted','patient_diagnoses_details__organization')  
+    list_display = ('patient', 'recorded_at', 'body_temperature', 'pulse_rate', 'blood_pressure', 'blood_oxygen', 'respiration_rate','id')
+    search_fields = ('patient__first_name', 'patient__last_name')
+    list_filter = ('is_deleted','patient__organization')
 
 @admin.register(PatientMedicalRecord)
 class PatientMedicalRecordAdmin(SoftDeleteAdmin):
     list_display = ('patient', 'blood_group', 'genotype', 'weight', 'height','id')
     search_fields = ('is_deleted','patient__first_name', 'patient__last_name')
+
+@admin.register(PatientDiagnosisSummary)
+class PatientDiagnosisSummaryAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'organization', 'diagnosis_count', 'last_visit_at', 'updated_at')
+    list_filter = ('organization',)
+    readonly_fields = ('patient', 'organization', 'latest_diagnosis', 'diagnosis_count', 'last_visit_at', 'updated_at')
+
+@admin.register(VitalSignRollup)
+class VitalSignRollupAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'period', 'period_start', 'samples', 'updated_at')
+    list_filter = ('period',)
+    raw_id_fields = ('patient',)
+
+@admin.register(ProcessingWatermark)
+class ProcessingWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('name', 'position_at', 'position_pkid', 'updated_at')
+
+@admin.register(VitalAlertRule)
+class VitalAlertRuleAdmin(admin.ModelAdmin):
+    list_display = ('organization', 'metric', 'comparison', 'threshold', 'is_active')
+    list_filter = ('is_active', 'metric', 'organization')
+
+@admin.register(VitalAlert)
+class VitalAlertAdmin(admin.ModelAdmin):
+    list_display = ('patient', 'metric', 'value', 'comparison', 'threshold', 'recorded_at', 'status')
+    list_filter = ('status', 'metric', 'organization')
+    raw_id_fields = ('organization', 'patient', 'vital_sign')
@@ -0,0 +1,143 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from .models import AlertComparison, AlertStatus, ProcessingWatermark, VitalAlert, VitalAlertRule, VitalMetric, VitalSign
+
+
+class VitalAlertScanService:
+    """
+    Incremental scan of the vital signs against the organizations' alert rules. Every run reads
+    the readings written since its watermark in (updated_at, pkid) batches, evaluates them
+    against the rules of their organizations in memory, upserts the hits into VitalAlert and
+    resolves the open alerts that the batch supersedes or invalidates. Organizations without
+    rules of their own get VITAL_ALERT_DEFAULT_RULES.
+    """
+    WATERMARK = "vital_alerts"
+    UPDATED_FIELDS = ["comparison", "threshold", "value", "recorded_at", "status", "updated_at"]
+
+    @staticmethod
+    def default_rules():
+        return getattr(settings, "VITAL_ALERT_DEFAULT_RULES", [
+            (VitalMetric.BLOOD_OXYGEN, AlertComparison.BELOW, 92),
+            (VitalMetric.BODY_TEMPERATURE, AlertComparison.ABOVE, 38.5),
+        ])
+
+    @staticmethod
+    def rules_for(organization_ids):
+        """Active (metric, comparison, threshold) rules of each organization, the defaults if it has none."""
+        rules = {organization_id: [] for organization_id in organization_ids}
+        configured = set()
+        for organization_id, metric, comparison, threshold, is_active in VitalAlertRule.objects.filter(
+            organization_id__in=organization_ids
+        ).values_list("organization_id", "metric", "comparison", "threshold", "is_active"):
+            configured.add(organization_id)
+            if is_active:
+                rules[organization_id].append((metric, comparison, threshold))
+        for organization_id in rules.keys() - configured:
+            rules[organization_id] = list(VitalAlertScanService.default_rules())
+        return rules
+
+    @staticmethod
+    def breaches(value, comparison, threshold):
+        if value is None:
+            return False
+        return value < threshold if comparison == AlertComparison.BELOW else value > threshold
+
+    @staticmethod
+    def scan(now=None, batch_size=None):
+        """
+        Evaluate the vital signs written since the last run. Rows younger than
+        VITAL_ALERT_SCAN_SETTLE_SECONDS wait for the next run, so that a transaction committing
+        late with an older updated_at is not skipped. Returns the rows scanned.
+        """
+        now = now or timezone.now()
+        cutoff = now - timedelta(seconds=getattr(settings, "VITAL_ALERT_SCAN_SETTLE_SECONDS", 60))
+        batch_size = batch_size or getattr(settings, "VITAL_ALERT_SCAN_BATCH_SIZE", 5000)
+        ProcessingWatermark.objects.get_or_create(name=VitalAlertScanService.WATERMARK)
+
+        scanned = 0
+        while True:
+            with transaction.atomic():
+                # Also serializes concurrent runs
+                watermark = ProcessingWatermark.objects.select_for_update().get(name=VitalAlertScanService.WATERMARK)
+                changed = watermark.rows_after(VitalSign.objects.all_with_deleted().filter(updated_at__lte=cutoff))
+                rows = list(
+                    changed.values(
+                        "pkid", "patient_id", "patient__organization_id", "recorded_at", "updated_at", "deleted_at",
+                        *VitalMetric.values,
+                    )[:batch_size]
+                )
+                if not rows:
+                    break
+                VitalAlertScanService.evaluate(rows)
+                watermark.advance(rows[-1]["updated_at"], rows[-1]["pkid"])
+            scanned += len(rows)
+            if len(rows) < batch_size:
+                break
+        return scanned
+
+    @staticmethod
+    def newest_readings(patient_ids):
+        """
+        Time of the newest stored reading of every (patient, metric), over all the patients'
+        alive vital signs rather than the batch: an alert older than it is superseded, so a
+        backdated reading does not open one.
+        """
+        latest = VitalSign.objects.filter(patient_id__in=patient_ids).values("patient_id").annotate(**{
+            metric: Max("recorded_at", filter=Q(**{f"{metric}__isnull": False})) for metric in VitalMetric.values
+        })
+        return {
+            (row["patient_id"], metric): row[metric]
+            for row in latest
+            for metric in VitalMetric.values
+            if row[metric] is not None
+        }
+
+    @staticmethod
+    def evaluate(rows):
+        """Write the alerts of a batch of vital sign rows and resolve the ones it makes stale."""
+        rules = VitalAlertScanService.rules_for({row["patient__organization_id"] for row in rows})
+        alive = [row for row in rows if row["deleted_at"] is None]
+
+        newest = VitalAlertScanService.newest_readings({row["patient_id"] for row in rows})
+
+        alerts = [
+            VitalAlert(
+                organization_id=row["patient__organization_id"],
+                patient_id=row["patient_id"],
+                vital_sign_id=row["pkid"],
+                metric=metric,
+                comparison=comparison,
+                threshold=threshold,
+                value=row[metric],
+                recorded_at=row["recorded_at"],
+                status=AlertStatus.RESOLVED if row["recorded_at"] < newest.get((row["patient_id"], metric), row["recorded_at"]) else AlertStatus.OPEN,
+            )
+            for row in alive
+            for metric, comparison, threshold in rules[row["patient__organization_id"]]
+            if VitalAlertScanService.breaches(row[metric], comparison, threshold)
+        ]
+        hits = {(alert.vital_sign_id, alert.metric) for alert in alerts}
+
+        scanned_ids = {row["pkid"] for row in rows}
+        stale = [
+            pkid
+            for pkid, patient_id, vital_sign_id, metric, recorded_at in VitalAlert.objects.filter(
+                patient_id__in={row["patient_id"] for row in rows}, status=AlertStatus.OPEN
+            ).values_list("pkid", "patient_id", "vital_sign_id", "metric", "recorded_at")
+            # Corrected or deleted reading, or a newer reading of the same metric
+            if (vital_sign_id in scanned_ids and (vital_sign_id, metric) not in hits)
+            or recorded_at < newest.get((patient_id, metric), recorded_at)
+        ]
+        if stale:
+            VitalAlert.objects.filter(pkid__in=stale).update(status=AlertStatus.RESOLVED, updated_at=timezone.now())
+        if alerts:
+            VitalAlert.objects.bulk_create(
+                alerts,
+                update_conflicts=True,
+                unique_fields=["vital_sign", "metric"],
+                update_fields=VitalAlertScanService.UPDATED_FIELDS,
+            )
+        return len(alerts)
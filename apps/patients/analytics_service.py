@@ -0,0 +1,179 @@
+from datetime import datetime, timezone
+import numpy as np
+from django.conf import settings
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.functions import Cast, Coalesce
+from .models import PatientMedicalRecord, VitalSign
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+class VitalSignAnalyticsService:
+    """
+    Trend statistics over the vital sign history of one patient or a whole cohort. The
+    measurements are loaded with a single `values_list` query into column arrays sorted by
+    (patient, recorded_at), and every statistic is computed for all patients at once with
+    segmented NumPy operations: no Python loop over the measurements.
+    """
+    METRICS = ("body_temperature", "pulse_rate", "systolic", "diastolic", "blood_oxygen", "respiration_rate", "weight")
+    DEFAULT_NORMAL_RANGES = {
+        "body_temperature": (36.1, 37.8),
+        "blood_oxygen": (95.0, 100.0),
+        "pulse_rate": (60.0, 100.0),
+    }
+
+    @staticmethod
+    def normal_ranges():
+        return getattr(settings, "VITAL_SIGN_NORMAL_RANGES", VitalSignAnalyticsService.DEFAULT_NORMAL_RANGES)
+
+    @staticmethod
+    def load(queryset):
+        """
+        Columns of the given vital signs as float arrays (NaN for missing values), plus
+        `patient_id` and `recorded_at` (epoch seconds), sorted by patient then time.
+        """
+        epoch = Func(F("recorded_at"), template="EXTRACT(EPOCH FROM %(expressions)s)", output_field=FloatField())
+        # Floats only, NaN rather than NULL: the fastest rows for NumPy to convert
+        metrics = [Coalesce(Cast(metric, FloatField()), Value(float("nan"))) for metric in VitalSignAnalyticsService.METRICS]
+        rows = queryset.order_by("patient_id", "recorded_at", "pkid").values_list("patient_id", epoch, *metrics)
+        return VitalSignAnalyticsService.columns(rows)
+
+    @staticmethod
+    def columns(rows):
+        """Column arrays of (patient_id, recorded_at, *METRICS) rows already sorted by patient then time."""
+        names = ("patient_id", "recorded_at", *VitalSignAnalyticsService.METRICS)
+        # One 2-D conversion of the row tuples is several times faster than one per column
+        table = np.ascontiguousarray(np.array(list(rows), dtype=np.float64).reshape(-1, len(names)).T)
+        columns = dict(zip(names, table))
+        columns["patient_id"] = columns["patient_id"].astype(np.int64)
+        return columns
+
+    @staticmethod
+    def heights(patient_ids):
+        """Height (m) and recorded weight (kg) of the patients' medical records, keyed by patient pkid."""
+        return {
+            patient_id: (float(height) / 100 if height else None, float(weight) if weight else None)
+            for patient_id, height, weight in PatientMedicalRecord.objects.filter(patient_id__in=patient_ids)
+            .values_list("patient_id", "height", "weight")
+        }
+
+    @staticmethod
+    def analyze(queryset, window=None):
+        """Statistics of every patient having vital signs in `queryset`, keyed by patient pkid."""
+        columns = VitalSignAnalyticsService.load(queryset)
+        patient_ids = np.unique(columns["patient_id"]).tolist()
+        return VitalSignAnalyticsService.compute(columns, VitalSignAnalyticsService.heights(patient_ids), window)
+
+    @staticmethod
+    def compute(columns, heights, window=None):
+        """
+        Per patient: sample count and time span, mean of the last `window` values of each
+        metric (VITAL_ANALYTICS_ROLLING_WINDOW by default), least-squares weight slope in kg per
+        week, BMI from the latest weight and the medical record height, and counts of readings
+        outside VITAL_SIGN_NORMAL_RANGES.
+        """
+        window = window or getattr(settings, "VITAL_ANALYTICS_ROLLING_WINDOW", 7)
+        patient = columns["patient_id"]
+        if not len(patient):
+            return {}
+
+        # Segment boundaries: rows [starts[g], ends[g]) belong to the g-th patient
+        starts = np.flatnonzero(np.r_[True, patient[1:] != patient[:-1]])
+        ends = np.r_[starts[1:], len(patient)]
+        ids = patient[starts]
+        recorded_at = columns["recorded_at"]
+
+        # Whole arrays are converted to Python values at once, not element by element
+        as_list = VitalSignAnalyticsService.as_list
+        rolling = {
+            metric: as_list(VitalSignAnalyticsService.window_mean(columns[metric], starts, ends, window))
+            for metric in VitalSignAnalyticsService.METRICS
+        }
+        out_of_range = {
+            metric: np.add.reduceat(((columns[metric] < low) | (columns[metric] > high)).astype(np.int64), starts).tolist()
+            for metric, (low, high) in VitalSignAnalyticsService.normal_ranges().items()
+        }
+        slope = as_list(VitalSignAnalyticsService.slope(recorded_at, columns["weight"], starts, ends) * 7)
+        latest_weight = as_list(VitalSignAnalyticsService.latest(columns["weight"], starts, ends), decimals=None)
+        samples, first, last = (ends - starts).tolist(), recorded_at[starts].tolist(), recorded_at[ends - 1].tolist()
+
+        results = {}
+        for index, patient_id in enumerate(ids.tolist()):
+            height, record_weight = heights.get(patient_id, (None, None))
+            weight = latest_weight[index] if latest_weight[index] is not None else record_weight
+            results[patient_id] = {
+                "samples": samples[index],
+                "first_recorded_at": datetime.fromtimestamp(first[index], tz=timezone.utc),
+                "last_recorded_at": datetime.fromtimestamp(last[index], tz=timezone.utc),
+                "rolling_mean": {metric: values[index] for metric, values in rolling.items()},
+                "weight_slope_per_week": slope[index],
+                "bmi": round(weight / height ** 2, 1) if weight and height else None,
+                "out_of_range": {metric: counts[index] for metric, counts in out_of_range.items()},
+            }
+        return results
+
+    @staticmethod
+    def window_mean(values, starts, ends, window):
+        """Mean of the non-missing values among the last `window` rows of every segment."""
+        valid = ~np.isnan(values)
+        sums = np.r_[0.0, np.cumsum(np.where(valid, values, 0.0))]
+        counts = np.r_[0, np.cumsum(valid)]
+        first = np.maximum(starts, ends - window)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (sums[ends] - sums[first]) / (counts[ends] - counts[first])
+
+    @staticmethod
+    def slope(times, values, starts, ends):
+        """Least-squares slope per day of `values` over `times` (epoch seconds) in every segment."""
+        valid = ~np.isnan(values)
+        # Days since the segment's first row, to keep the sums well conditioned
+        x = np.where(valid, (times - np.repeat(times[starts], ends - starts)) / DAY_SECONDS, 0.0)
+        y = np.where(valid, values, 0.0)
+        n = np.add.reduceat(valid.astype(np.float64), starts)
+        sx, sy = np.add.reduceat(x, starts), np.add.reduceat(y, starts)
+        sxx, sxy = np.add.reduceat(x * x, starts), np.add.reduceat(x * y, starts)
+        denominator = n * sxx - sx * sx
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where((n >= 2) & (denominator > 1e-9), (n * sxy - sx * sy) / denominator, np.nan)
+
+    @staticmethod
+    def latest(values, starts, ends):
+        """Last non-missing value of every segment (NaN when it has none)."""
+        positions = np.maximum.accumulate(np.where(~np.isnan(values), np.arange(len(values)), -1))[ends - 1]
+        return np.where(positions >= starts, values[np.maximum(positions, 0)], np.nan)
+
+    @staticmethod
+    def as_list(values, decimals=3):
+        """Values (rounded unless `decimals` is None) as a list, None in place of NaN."""
+        values = values if decimals is None else np.round(values, decimals)
+        return [None if value != value else value for value in values.tolist()]
+
+    @staticmethod
+    def cohort_summary(results):
+        """Totals and averages over the per-patient statistics of a cohort."""
+        def mean(values):
+            values = [value for value in values if value is not None]
+            return round(sum(values) / len(values), 3) if values else None
+
+        return {
+            "patients": len(results),
+            "samples": sum(result["samples"] for result in results),
+            "mean_weight_slope_per_week": mean(result["weight_slope_per_week"] for result in results),
+            "mean_bmi": mean(result["bmi"] for result in results),
+            "out_of_range": {
+                metric: sum(result["out_of_range"][metric] for result in results)
+                for metric in VitalSignAnalyticsService.normal_ranges()
+            },
+        }
+
+    @staticmethod
+    def vital_signs(organization_id, patient_ids=None, start=None, end=None):
+        """Alive vital signs of the organization's patients (or the given ones), optionally within [start, end)."""
+        queryset = VitalSign.objects.filter(patient__organization_id=organization_id)
+        if patient_ids is not None:
+            queryset = queryset.filter(patient_id__in=patient_ids)
+        if start is not None:
+            queryset = queryset.filter(recorded_at__gte=start)
+        if end is not None:
+            queryset = queryset.filter(recorded_at__lt=end)
+        return queryset
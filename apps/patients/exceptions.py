@@ -5,4 +5,16 @@ from rest_framework import generics, status
 class PatientNotFoundException(CustomValidationError):
     status_code = status.HTTP_404_NOT_FOUND
     default_detail = "Patient not Found"
-    default_code = "organization_patient_details_not_found"
\ No newline at end of file
+    default_code = "organization_patient_details_not_found"
+
+
+class VitalTrendsWindowTooLargeException(CustomValidationError):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = "Too many points for this window, choose a shorter window or a coarser resolution"
+    default_code = "vital_trends_window_too_large"
+
+
+class DiagnosisIdempotencyConflictException(CustomValidationError):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Another request is creating diagnoses with the same idempotency keys, retry the request"
+    default_code = "diagnosis_idempotency_conflict"
@@ -0,0 +1,21 @@
+from rest_framework.filters import BaseFilterBackend
+from .patient_service import PatientDiagnosisSearchService
+
+
+class DiagnosisSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text and trigram search over diagnoses through the `?search=` parameter.
+    Results are ordered by rank unless the client also sends `?ordering=`.
+    """
+    search_param = 'search'
+    ordering_param = 'ordering'
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+
+        queryset = PatientDiagnosisSearchService.search(queryset, term)
+        if self.ordering_param not in request.query_params:
+            queryset = queryset.order_by('-rank', '-created_at')
+        return queryset
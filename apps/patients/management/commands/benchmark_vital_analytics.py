@@ -0,0 +1,133 @@
+import math
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from apps.organizations.models import Organization
+from apps.patients.analytics_service import VitalSignAnalyticsService
+
+DAY_SECONDS = 24 * 60 * 60
+
+
+def synthetic_rows(count, patients, seed=0):
+    """
+    `count` rows shaped like VitalSignAnalyticsService.load() reads them, sorted by patient then
+    time: a per-patient baseline with noise, a weight drift and about 5% missing (NaN) values.
+    """
+    rng = np.random.default_rng(seed)
+    patient = np.sort(rng.integers(1, patients + 1, count))
+    recorded_at = 1.6e9 + rng.uniform(0, 3 * 365 * DAY_SECONDS, count)
+    recorded_at = recorded_at[np.lexsort((recorded_at, patient))]
+    baseline = rng.normal(0, 1, patients + 1)[patient]
+    metrics = [
+        rng.normal(36.9, 0.5, count),
+        rng.normal(75 + 8 * baseline, 12, count).round(),
+        rng.normal(125 + 10 * baseline, 12, count).round(),
+        rng.normal(80 + 6 * baseline, 8, count).round(),
+        rng.normal(97.5, 1.5, count).clip(80, 100).round(1),
+        rng.normal(16, 2, count).round(),
+        70 + 12 * baseline + (recorded_at - 1.6e9) / DAY_SECONDS * rng.normal(0, 0.01, patients + 1)[patient],
+    ]
+    columns = [patient.tolist(), recorded_at.tolist()]
+    for values in metrics:
+        values[rng.random(count) < 0.05] = np.nan
+        columns.append(values.tolist())
+    return list(zip(*columns))
+
+
+def python_reference(rows, heights, window):
+    """The same statistics computed row by row in plain Python, as the baseline (NaN != NaN skips missing values)."""
+    ranges = VitalSignAnalyticsService.normal_ranges()
+    metrics = VitalSignAnalyticsService.METRICS
+    by_patient = {}
+    for row in rows:
+        by_patient.setdefault(row[0], []).append(row)
+
+    results = {}
+    for patient_id, patient_rows in by_patient.items():
+        columns = {name: [row[index + 2] for row in patient_rows] for index, name in enumerate(metrics)}
+        rolling = {}
+        for metric, values in columns.items():
+            recent = [value for value in values[-window:] if value == value]
+            rolling[metric] = sum(recent) / len(recent) if recent else None
+        points = [((row[1] - patient_rows[0][1]) / DAY_SECONDS, row[8]) for row in patient_rows if row[8] == row[8]]
+        slope = None
+        if len(points) >= 2:
+            mean_x = sum(x for x, _ in points) / len(points)
+            mean_y = sum(y for _, y in points) / len(points)
+            spread = sum((x - mean_x) ** 2 for x, _ in points)
+            if spread > 1e-9:
+                slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread * 7
+        weights = [value for value in columns["weight"] if value == value]
+        height = heights.get(patient_id, (None, None))[0]
+        results[patient_id] = {
+            "samples": len(patient_rows),
+            "rolling_mean": rolling,
+            "weight_slope_per_week": slope,
+            "bmi": round(weights[-1] / height ** 2, 1) if weights and height else None,
+            "out_of_range": {
+                metric: sum(1 for value in columns[metric] if value == value and not low <= value <= high)
+                for metric, (low, high) in ranges.items()
+            },
+        }
+    return results
+
+
+class Command(BaseCommand):
+    help = "Measure the vital sign analytics on a synthetic dataset (and optionally an organization's data)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Synthetic vital sign rows')
+        parser.add_argument('--patients', type=int, default=10_000, help='Synthetic patients the rows are spread over')
+        parser.add_argument('--window', type=int, default=7, help='Rolling mean window')
+        parser.add_argument('--rounds', type=int, default=3, help='Best of this many rounds is reported')
+        parser.add_argument('--skip-baseline', action='store_true', help='Do not run the plain Python baseline')
+        parser.add_argument('--organization', type=str, help='Acronym of an organization whose stored vital signs are also analyzed')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Generating {options['rows']} synthetic rows over {options['patients']} patients...")
+        rows = synthetic_rows(options['rows'], options['patients'])
+        heights = {patient_id: (1.5 + (patient_id % 40) / 100, None) for patient_id in range(1, options['patients'] + 1)}
+        window = options['window']
+
+        columns, load = self.measure(options['rounds'], lambda: VitalSignAnalyticsService.columns(rows))
+        results, compute = self.measure(options['rounds'], lambda: VitalSignAnalyticsService.compute(columns, heights, window))
+        self.stdout.write(f"{'rows to arrays':<30}{load * 1000:>10.1f} ms")
+        self.stdout.write(f"{'vectorized statistics':<30}{compute * 1000:>10.1f} ms")
+
+        if not options['skip_baseline']:
+            reference, baseline = self.measure(1, lambda: python_reference(rows, heights, window))
+            self.stdout.write(f"{'plain Python baseline':<30}{baseline * 1000:>10.1f} ms  ({baseline / (load + compute):.1f}x slower)")
+            self.check_agreement(results, reference)
+
+        if options['organization']:
+            try:
+                organization = Organization.objects.get(acronym__iexact=options['organization'])
+            except Organization.DoesNotExist:
+                raise CommandError(f"Organization '{options['organization']}' does not exist.")
+            vital_signs = VitalSignAnalyticsService.vital_signs(organization.pk)
+            stored, elapsed = self.measure(options['rounds'], lambda: VitalSignAnalyticsService.analyze(vital_signs, window))
+            samples = sum(result['samples'] for result in stored.values())
+            self.stdout.write(f"{organization.acronym + ' (query + statistics)':<30}{elapsed * 1000:>10.1f} ms  ({samples} rows, {len(stored)} patients)")
+
+    def check_agreement(self, results, reference):
+        def same(left, right):
+            if left is None or right is None:
+                return left is None and right is None
+            return math.isclose(left, right, rel_tol=1e-6, abs_tol=1e-3)
+
+        for patient_id, expected in reference.items():
+            result = results[patient_id]
+            assert result['samples'] == expected['samples'] and result['out_of_range'] == expected['out_of_range'], patient_id
+            assert same(result['bmi'], expected['bmi']) and same(result['weight_slope_per_week'], expected['weight_slope_per_week']), patient_id
+            assert all(same(result['rolling_mean'][metric], value) for metric, value in expected['rolling_mean'].items()), patient_id
+        self.stdout.write(self.style.SUCCESS(f"Vectorized results match the baseline for {len(reference)} patients."))
+
+    @staticmethod
+    def measure(rounds, run):
+        best, result = None, None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return result, best
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.organizations.models import Organization
+from apps.patients.patient_service import PatientDiagnosisSummaryService
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-patient diagnosis summary table from the diagnosis history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', type=str, help='Acronym of a single organization to rebuild')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of summary rows written per query')
+
+    def handle(self, *args, **options):
+        organization = None
+        if options['organization']:
+            try:
+                organization = Organization.objects.get(acronym__iexact=options['organization'])
+            except Organization.DoesNotExist:
+                raise CommandError(f"Organization '{options['organization']}' does not exist.")
+
+        written = PatientDiagnosisSummaryService.rebuild(organization=organization, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} patient diagnosis summaries."))
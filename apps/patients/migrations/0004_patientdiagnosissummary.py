@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+BATCH_SIZE = 1000
+
+
+def populate_diagnosis_summaries(apps, schema_editor):
+    Patient = apps.get_model('patients', 'Patient')
+    PatientDiagnosisDetails = apps.get_model('patients', 'PatientDiagnosisDetails')
+    PatientDiagnosisSummary = apps.get_model('patients', 'PatientDiagnosisSummary')
+
+    # Patients are streamed, and every batch of them aggregated and written on its own
+    batch = []
+    for row in Patient.objects.order_by('pkid').values_list('pkid', 'organization_id').iterator(chunk_size=BATCH_SIZE):
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            write_summaries(PatientDiagnosisDetails, PatientDiagnosisSummary, batch)
+            batch = []
+    if batch:
+        write_summaries(PatientDiagnosisDetails, PatientDiagnosisSummary, batch)
+
+
+def write_summaries(PatientDiagnosisDetails, PatientDiagnosisSummary, patients):
+    diagnoses = PatientDiagnosisDetails.objects.filter(deleted_at__isnull=True, patient_id__in=[pkid for pkid, _ in patients])
+    stats = {
+        row['patient']: row
+        for row in diagnoses.order_by().values('patient').annotate(total=Count('pkid'), last_visit_at=Max('created_at'))
+    }
+    latest = dict(
+        diagnoses.order_by('patient_id', '-created_at', '-pkid')
+        .distinct('patient_id')
+        .values_list('patient_id', 'pkid')
+    )
+    PatientDiagnosisSummary.objects.bulk_create([
+        PatientDiagnosisSummary(
+            patient_id=patient_id,
+            organization_id=organization_id,
+            latest_diagnosis_id=latest.get(patient_id),
+            diagnosis_count=stats.get(patient_id, {}).get('total', 0),
+            last_visit_at=stats.get(patient_id, {}).get('last_visit_at'),
+        )
+        for patient_id, organization_id in patients
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0002_organization_deleted_at_organization_is_deleted'),
+        ('patients', '0003_alter_patientdiagnosisdetails_patient'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientDiagnosisSummary',
+            fields=[
+                ('patient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='diagnosis_summary', serialize=False, to='patients.patient', verbose_name='Patient')),
+                ('diagnosis_count', models.PositiveIntegerField(default=0)),
+                ('last_visit_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('latest_diagnosis', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='patients.patientdiagnosisdetails', verbose_name='Latest Diagnosis')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='organizations.organization', verbose_name='Organization')),
+            ],
+            options={
+                'verbose_name': 'Patient Diagnosis Summary',
+                'verbose_name_plural': 'Patient Diagnosis Summaries',
+                'indexes': [models.Index(fields=['organization', 'diagnosis_count'], name='patients_pa_organiz_4cd252_idx')],
+            },
+        ),
+        migrations.RunPython(populate_diagnosis_summaries, migrations.RunPython.noop),
+    ]
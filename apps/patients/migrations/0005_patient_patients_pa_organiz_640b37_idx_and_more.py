@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caregivers', '0003_caregiver_caregivers__organiz_90621b_idx'),
+        ('organizations', '0002_organization_deleted_at_organization_is_deleted'),
+        ('patients', '0004_patientdiagnosissummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['organization', 'created_at', 'pkid'], name='patients_pa_organiz_640b37_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientdiagnosisdetails',
+            index=models.Index(fields=['organization', 'created_at', 'pkid'], name='patients_pa_organiz_c550bc_idx'),
+        ),
+    ]
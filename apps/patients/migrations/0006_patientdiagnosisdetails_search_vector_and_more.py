@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:57
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caregivers', '0003_caregiver_caregivers__organiz_90621b_idx'),
+        ('organizations', '0002_organization_deleted_at_organization_is_deleted'),
+        ('patients', '0005_patient_patients_pa_organiz_640b37_idx_and_more'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='patientdiagnosisdetails',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('diagnoses', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('assessment', 'medication', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('notes', config='english', weight='C'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='patientdiagnosisdetails',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='diagnosis_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='patientdiagnosisdetails',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['diagnoses'], name='diagnosis_diagnoses_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='patientdiagnosisdetails',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['assessment'], name='diagnosis_assessment_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='patientdiagnosisdetails',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['medication'], name='diagnosis_medication_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:09
+
+import shared.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0007_patient_patient_first_name_trgm_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='patient',
+            name='slug',
+            field=shared.fields.UUIDSlugField(blank=True, editable=False, populate_from=('first_name', 'last_name'), unique=True),
+        ),
+        migrations.AlterField(
+            model_name='patientdiagnosisdetails',
+            name='slug',
+            field=shared.fields.UUIDSlugField(blank=True, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='patientmedicalrecord',
+            name='slug',
+            field=shared.fields.UUIDSlugField(blank=True, editable=False, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='vitalsign',
+            name='slug',
+            field=shared.fields.UUIDSlugField(blank=True, editable=False, unique=True),
+        ),
+    ]
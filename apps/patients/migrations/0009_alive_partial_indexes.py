@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caregivers', '0006_alive_partial_indexes'),
+        ('organizations', '0005_organization_export_job'),
+        ('patients', '0008_alter_patient_slug_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='patient',
+            name='patients_pa_organiz_640b37_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='patientdiagnosisdetails',
+            name='patients_pa_organiz_c550bc_idx',
+        ),
+        migrations.AlterField(
+            model_name='patient',
+            name='organization',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='organizations.organization'),
+        ),
+        migrations.AlterField(
+            model_name='patientdiagnosisdetails',
+            name='organization',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='organizations.organization', verbose_name='Organization'),
+        ),
+        migrations.AlterField(
+            model_name='patientdiagnosisdetails',
+            name='patient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='diagnoses', to='patients.patient', verbose_name='Patient'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['organization', 'created_at', 'pkid'], name='patient_org_alive_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientdiagnosisdetails',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['organization', 'created_at', 'pkid'], name='diagnosis_org_alive_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patientdiagnosisdetails',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['patient', 'created_at', 'pkid'], name='diagnosis_patient_alive_idx'),
+        ),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:38
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0009_alive_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position_at', models.DateTimeField(blank=True, null=True)),
+                ('position_pkid', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Processing Watermark',
+                'verbose_name_plural': 'Processing Watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='VitalSignRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('body_temperature_min', models.FloatField(null=True)),
+                ('body_temperature_max', models.FloatField(null=True)),
+                ('body_temperature_mean', models.FloatField(null=True)),
+                ('pulse_rate_min', models.FloatField(null=True)),
+                ('pulse_rate_max', models.FloatField(null=True)),
+                ('pulse_rate_mean', models.FloatField(null=True)),
+                ('systolic_min', models.FloatField(null=True)),
+                ('systolic_max', models.FloatField(null=True)),
+                ('systolic_mean', models.FloatField(null=True)),
+                ('diastolic_min', models.FloatField(null=True)),
+                ('diastolic_max', models.FloatField(null=True)),
+                ('diastolic_mean', models.FloatField(null=True)),
+                ('blood_oxygen_min', models.FloatField(null=True)),
+                ('blood_oxygen_max', models.FloatField(null=True)),
+                ('blood_oxygen_mean', models.FloatField(null=True)),
+                ('respiration_rate_min', models.FloatField(null=True)),
+                ('respiration_rate_max', models.FloatField(null=True)),
+                ('respiration_rate_mean', models.FloatField(null=True)),
+                ('weight_min', models.FloatField(null=True)),
+                ('weight_max', models.FloatField(null=True)),
+                ('weight_mean', models.FloatField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Vital Sign Rollup',
+                'verbose_name_plural': 'Vital Sign Rollups',
+            },
+        ),
+        migrations.AddField(
+            model_name='vitalsign',
+            name='diastolic',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Diastolic blood pressure (mmHg), parsed from blood_pressure', null=True),
+        ),
+        migrations.AddField(
+            model_name='vitalsign',
+            name='patient',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='vital_signs', to='patients.patient', verbose_name='Patient'),
+        ),
+        migrations.AddField(
+            model_name='vitalsign',
+            name='recorded_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the vital signs were measured'),
+        ),
+        migrations.AddField(
+            model_name='vitalsign',
+            name='systolic',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Systolic blood pressure (mmHg), parsed from blood_pressure', null=True),
+        ),
+        # Existing rows: patient from their diagnosis, measured when they were created,
+        # blood pressure split into integers
+        migrations.RunSQL(
+            sql="""
+                UPDATE patients_vitalsign AS vital_sign
+                SET patient_id = diagnosis.patient_id,
+                    recorded_at = vital_sign.created_at,
+                    systolic = CASE WHEN vital_sign.blood_pressure ~ '^[0-9]{2,3}/[0-9]{2,3}$'
+                                    THEN split_part(vital_sign.blood_pressure, '/', 1)::smallint END,
+                    diastolic = CASE WHEN vital_sign.blood_pressure ~ '^[0-9]{2,3}/[0-9]{2,3}$'
+                                     THEN split_part(vital_sign.blood_pressure, '/', 2)::smallint END
+                FROM patients_patientdiagnosisdetails AS diagnosis
+                WHERE diagnosis.pkid = vital_sign.patient_diagnoses_details_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='vitalsignrollup',
+            name='patient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='vital_sign_rollups', to='patients.patient'),
+        ),
+        migrations.AddConstraint(
+            model_name='vitalsignrollup',
+            constraint=models.UniqueConstraint(fields=('patient', 'period', 'period_start'), name='unique_vital_sign_rollup'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Separate from 0010: its backfill leaves pending trigger events on the table in that transaction."""
+
+    dependencies = [
+        ('patients', '0010_vital_sign_time_series'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vitalsign',
+            name='patient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='vital_signs', to='patients.patient', verbose_name='Patient'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalsign',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['patient', 'recorded_at'], name='vitalsign_patient_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalsign',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['recorded_at', 'updated_at'], name='vitalsign_time_brin'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:49
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0005_organization_export_job'),
+        ('patients', '0011_vital_sign_time_series_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VitalAlert',
+            fields=[
+                ('pkid', models.BigAutoField(editable=False, primary_key=True, serialize=False)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('metric', models.CharField(choices=[('body_temperature', 'Body temperature'), ('pulse_rate', 'Pulse rate'), ('systolic', 'Systolic blood pressure'), ('diastolic', 'Diastolic blood pressure'), ('blood_oxygen', 'Blood oxygen'), ('respiration_rate', 'Respiration rate'), ('weight', 'Weight')], max_length=20, verbose_name='Metric')),
+                ('comparison', models.CharField(choices=[('below', 'Below'), ('above', 'Above')], max_length=10, verbose_name='Comparison')),
+                ('threshold', models.FloatField(verbose_name='Threshold')),
+                ('value', models.FloatField(verbose_name='Value')),
+                ('recorded_at', models.DateTimeField(verbose_name='Recorded at')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('resolved', 'Resolved')], default='open', max_length=10, verbose_name='Status')),
+                ('organization', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='organizations.organization', verbose_name='Organization')),
+                ('patient', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='vital_alerts', to='patients.patient', verbose_name='Patient')),
+                ('vital_sign', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='patients.vitalsign', verbose_name='Vital Sign')),
+            ],
+            options={
+                'verbose_name': 'Vital Alert',
+                'verbose_name_plural': 'Vital Alerts',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['organization', 'status', 'created_at', 'pkid'], name='vitalalert_org_status_idx'), models.Index(condition=models.Q(('status', 'open')), fields=['patient'], name='vitalalert_open_patient_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vital_sign', 'metric'), name='unique_vital_alert')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VitalAlertRule',
+            fields=[
+                ('pkid', models.BigAutoField(editable=False, primary_key=True, serialize=False)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('metric', models.CharField(choices=[('body_temperature', 'Body temperature'), ('pulse_rate', 'Pulse rate'), ('systolic', 'Systolic blood pressure'), ('diastolic', 'Diastolic blood pressure'), ('blood_oxygen', 'Blood oxygen'), ('respiration_rate', 'Respiration rate'), ('weight', 'Weight')], max_length=20, verbose_name='Metric')),
+                ('comparison', models.CharField(choices=[('below', 'Below'), ('above', 'Above')], max_length=10, verbose_name='Comparison')),
+                ('threshold', models.FloatField(verbose_name='Threshold')),
+                ('is_active', models.BooleanField(default=True)),
+                ('organization', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='vital_alert_rules', to='organizations.organization', verbose_name='Organization')),
+            ],
+            options={
+                'verbose_name': 'Vital Alert Rule',
+                'verbose_name_plural': 'Vital Alert Rules',
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(fields=('organization', 'metric', 'comparison'), name='unique_vital_alert_rule')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('caregivers', '0006_alive_partial_indexes'),
+        ('organizations', '0005_organization_export_job'),
+        ('patients', '0012_vital_alerts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patientdiagnosisdetails',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Idempotency Key'),
+        ),
+        migrations.AddConstraint(
+            model_name='patientdiagnosisdetails',
+            constraint=models.UniqueConstraint(fields=('organization', 'idempotency_key'), name='diagnosis_idempotency_key_uniq'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0006_organization_acronym_upper_unique'),
+        ('patients', '0013_diagnosis_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='patientdiagnosisdetails',
+            name='organization',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='organizations.organization', verbose_name='Organization'),
+        ),
+        migrations.AlterField(
+            model_name='patientdiagnosisdetails',
+            name='patient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='diagnoses', to='patients.patient', verbose_name='Patient'),
+        ),
+    ]
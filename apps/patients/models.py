@@ -1,19 +1,22 @@
 from django.db import models
 
 # Create your models here.
-from django.db import models
+from django.db import models, transaction
 from apps.accounts.models import User
 from shared.models import SoftDeleteModel, TimeStampedUUID
 from django.core.validators import FileExtensionValidator
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, OpClass
+from django.utils import timezone
+from django.db.models.functions import Upper
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 # from shared.validators import validate_blood_pressure
 from cloudinary.models import CloudinaryField
-from autoslug import AutoSlugField
+from shared.fields import UUIDSlugField
 from imagekit.models import ProcessedImageField
 from imagekit.processors import ResizeToFill
 from django.utils.translation import gettext_lazy as _ 
 from shared.validators import validate_phone_number,validate_blood_pressure
 from shared.text_choices import BloodGroupChoices, Gender, GenotypeChoices,MaritalStatus
-import uuid
 from apps.organizations.models import Organization
 from apps.caregivers.models import Caregiver
 from cloudinary.models import CloudinaryField
@@ -21,7 +24,8 @@ from cloudinary.models import CloudinaryField
 
 class Patient(TimeStampedUUID,SoftDeleteModel):
     user = models.OneToOneField(User,on_delete=models.CASCADE)
-    organization = models.ForeignKey(Organization,on_delete=models.CASCADE,db_index=True)
+    # Indexed by the composite indexes below, which all lead with organization
+    organization = models.ForeignKey(Organization,on_delete=models.CASCADE,db_index=False)
     first_name = models.CharField(max_length=255,verbose_name=_("Patient First Name"),db_index=True)
     last_name = models.CharField(max_length=255,verbose_name=_("Patient Last Name"),db_index=True)
     medical_id = models.CharField(max_length=30, unique=True,blank=True,null=True)
@@ -37,7 +41,7 @@ class Patient(TimeStampedUUID,SoftDeleteModel):
     gender = models.CharField(max_length=20,choices=Gender.choices,blank=True,null=True)
     phone_number=models.CharField(max_length=15,validators=[validate_phone_number],blank=True,null=True)
     emergency_phone_number=models.CharField(max_length=15,validators=[validate_phone_number],blank=True,null=True)
-    slug = AutoSlugField(populate_from='user', unique=True)
+    slug = UUIDSlugField(populate_from=('first_name', 'last_name'))
     address = models.TextField(verbose_name=_("Patient's Address"),blank=True,null=True)
 
     class Meta:
@@ -46,13 +50,74 @@ class Patient(TimeStampedUUID,SoftDeleteModel):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=['organization', 'last_name', 'first_name']),
+            # Soft-deleted rows are never listed: keep them out of the hot lookup indexes
+            models.Index(fields=['organization', 'created_at', 'pkid'], condition=models.Q(deleted_at__isnull=True), name='patient_org_alive_idx'),
+            GinIndex(OpClass(Upper('first_name'), name='gin_trgm_ops'), name='patient_first_name_trgm'),
+            GinIndex(OpClass(Upper('last_name'), name='gin_trgm_ops'), name='patient_last_name_trgm'),
         ]
 
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The stored gender, to move an edited patient between the dashboard's gender counters
+        instance._stored_gender = instance.__dict__.get('gender', models.DEFERRED)
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'gender' in fields:
+            self._stored_gender = self.__dict__.get('gender', models.DEFERRED)
+
     def save(self, *args, **kwargs):
         if not self.medical_id:
             self.medical_id = self.generate_unique_medical_id()
-        super(Patient, self).save(*args, **kwargs)
+        stored_gender = getattr(self, '_stored_gender', models.DEFERRED)
+        update_fields = kwargs.get('update_fields')
+        if (
+            stored_gender is models.DEFERRED
+            or (update_fields is not None and 'gender' not in update_fields)
+            or stored_gender == self.gender
+            or self.deleted_at is not None
+        ):
+            super(Patient, self).save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            super(Patient, self).save(*args, **kwargs)
+            self._record_gender_change(stored_gender)
+        self._stored_gender = self.gender
+
+    def delete(self, using=None, keep_parents=False):
+        """Soft delete and remove the patient from the organization's dashboard counters"""
+        was_alive = self.deleted_at is None
+        with transaction.atomic():
+            super().delete(using=using, keep_parents=keep_parents)
+            if was_alive:
+                self._record_stats_change(removed=True)
+
+    def restore(self, using=None, keep_parents=False):
+        """Restore and add the patient back to the organization's dashboard counters"""
+        was_deleted = self.deleted_at is not None
+        with transaction.atomic():
+            super().restore(using=using, keep_parents=keep_parents)
+            if was_deleted:
+                self._record_stats_change(removed=False)
+
+    def _record_stats_change(self, removed):
+        from apps.organizations.organization_service import OrganizationStatsService
+        counters = OrganizationStatsService.patient_counters(self)
+        if removed:
+            OrganizationStatsService.record_change(self.organization_id, before=counters)
+        else:
+            OrganizationStatsService.record_change(self.organization_id, after=counters)
+
+    def _record_gender_change(self, previous_gender):
+        from apps.organizations.organization_service import OrganizationStatsService
+        OrganizationStatsService.record_change(
+            self.organization_id,
+            before=OrganizationStatsService.patient_gender_counters(self.user, previous_gender),
+            after=OrganizationStatsService.patient_gender_counters(self.user, self.gender),
+        )
 
     @property
     def profile_picture_url(self):
@@ -66,12 +131,8 @@ class Patient(TimeStampedUUID,SoftDeleteModel):
         return f"Patient account for {self.first_name.title()} {self.last_name.title()}"
     
     def generate_unique_medical_id(self):
-        acronym = self.organization.acronym.upper()  
-        while True:
-            unique_id = str(uuid.uuid4()).replace('-', '')[:8].upper()
-            medical_id = f"{acronym}_{unique_id}"
-            if not Patient.objects.filter(medical_id=medical_id).exists():
-                return medical_id
+        from apps.organizations.organization_service import OrganizationSequenceService
+        return OrganizationSequenceService.next_medical_ids(self.organization)[0]
     
     @property
     def full_name(self):
@@ -87,7 +148,7 @@ class PatientMedicalRecord(TimeStampedUUID,SoftDeleteModel):
     weight = models.DecimalField(max_digits=5, decimal_places=2, help_text="Weight of the patient in kilograms (kg)",blank=True, null=True)
     height = models.DecimalField(max_digits=5, decimal_places=2, help_text="Height of the patient in centimeters (cm)",blank=True, null=True)
     allergies = models.TextField(blank=True, null=True, help_text="Allergies (if any)")
-    slug = AutoSlugField(populate_from='patient', unique=True)
+    slug = UUIDSlugField()
     
 
     class Meta:
@@ -96,6 +157,8 @@ class PatientMedicalRecord(TimeStampedUUID,SoftDeleteModel):
         verbose_name_plural = "Patient Medical Records"
 
 class PatientDiagnosisDetails(TimeStampedUUID,SoftDeleteModel):
+    # Plain FK indexes besides the partial ones of Meta.indexes: the PROTECT checks and any
+    # lookup that includes soft-deleted rows cannot use a partial index
     patient = models.ForeignKey(Patient,on_delete=models.PROTECT,verbose_name=_("Patient"), related_name="diagnoses",db_index=True)
     organization = models.ForeignKey(Organization,on_delete=models.PROTECT,verbose_name=_("Organization"),db_index=True)
     caregiver= models.ForeignKey(Caregiver,on_delete=models.SET_NULL,verbose_name=_("Caregiver"),db_index=True,null=True)
@@ -104,8 +167,19 @@ class PatientDiagnosisDetails(TimeStampedUUID,SoftDeleteModel):
     medication = models.CharField(max_length=255,verbose_name=_("Medication"))
     health_allergies = models.TextField(blank=True, null=True, help_text="Health Allergies (if any)")
     health_care_center = models.CharField(max_length=255,verbose_name=_("Health Care Center"),db_index=True)
-    slug = AutoSlugField(populate_from='patient', unique=True)
+    slug = UUIDSlugField()
     notes=models.TextField()
+    # Client-supplied key of a bulk submission, so that retried syncs do not duplicate visits
+    idempotency_key = models.CharField(max_length=100,blank=True,null=True,verbose_name=_("Idempotency Key"))
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('diagnoses', weight='A', config='english')
+            + SearchVector('assessment', 'medication', weight='B', config='english')
+            + SearchVector('notes', weight='C', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
 
     def __str__(self):
         return f"Patient Diagnosis Details for {self.patient.full_name} at {self.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
@@ -121,6 +195,7 @@ class PatientDiagnosisDetails(TimeStampedUUID,SoftDeleteModel):
         
         # Then soft delete this instance
         super().delete(using=using, keep_parents=keep_parents)
+        self._refresh_patient_summary()
 
     def restore(self, using=None, keep_parents=False):
         """Override to cascade restore to related VitalSign"""
@@ -133,22 +208,67 @@ class PatientDiagnosisDetails(TimeStampedUUID,SoftDeleteModel):
                 self.vitalsign.restore()
         except VitalSign.DoesNotExist:
             pass
+        self._refresh_patient_summary()
+
+    def _refresh_patient_summary(self):
+        from .patient_service import PatientDiagnosisSummaryService
+        PatientDiagnosisSummaryService.refresh_for_patient(self.patient)
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Patient Diagnosis Details"
         verbose_name_plural = "Patient Diagnosis Details"
+        indexes = [
+            models.Index(fields=['organization', 'created_at', 'pkid'], condition=models.Q(deleted_at__isnull=True), name='diagnosis_org_alive_idx'),
+            models.Index(fields=['patient', 'created_at', 'pkid'], condition=models.Q(deleted_at__isnull=True), name='diagnosis_patient_alive_idx'),
+            GinIndex(fields=['search_vector'], name='diagnosis_search_vector_gin'),
+            GinIndex(fields=['diagnoses'], opclasses=['gin_trgm_ops'], name='diagnosis_diagnoses_trgm'),
+            GinIndex(fields=['assessment'], opclasses=['gin_trgm_ops'], name='diagnosis_assessment_trgm'),
+            GinIndex(fields=['medication'], opclasses=['gin_trgm_ops'], name='diagnosis_medication_trgm'),
+        ]
+        constraints = [
+            # NULL keys never conflict: only keyed submissions are deduplicated
+            models.UniqueConstraint(fields=['organization', 'idempotency_key'], name='diagnosis_idempotency_key_uniq'),
+        ]
+
+
+class PatientDiagnosisSummary(models.Model):
+    """
+    One narrow row per patient with the figures patient listings need, so they don't
+    aggregate the diagnosis history on every request. Maintained by PatientDiagnosisSummaryService.
+    """
+    patient = models.OneToOneField(Patient,on_delete=models.CASCADE,primary_key=True,related_name="diagnosis_summary",verbose_name=_("Patient"))
+    organization = models.ForeignKey(Organization,on_delete=models.CASCADE,verbose_name=_("Organization"))
+    latest_diagnosis = models.ForeignKey(PatientDiagnosisDetails,on_delete=models.SET_NULL,null=True,blank=True,related_name="+",verbose_name=_("Latest Diagnosis"))
+    diagnosis_count = models.PositiveIntegerField(default=0)
+    last_visit_at = models.DateTimeField(blank=True,null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Patient Diagnosis Summary"
+        verbose_name_plural = "Patient Diagnosis Summaries"
+        indexes = [
+            models.Index(fields=['organization', 'diagnosis_count']),
+        ]
+
+    def __str__(self):
+        return f"Diagnosis summary for patient {self.patient_id}"
 
 
 class VitalSign(TimeStampedUUID,SoftDeleteModel):
     patient_diagnoses_details = models.OneToOneField(PatientDiagnosisDetails,on_delete=models.CASCADE,verbose_name=_('Patient Diagnosis Details'),db_index=True)
+    # Time-series layout: the patient and the measurement time are stored on the row itself
+    patient = models.ForeignKey(Patient,on_delete=models.CASCADE,verbose_name=_("Patient"),related_name="vital_signs",db_index=False)
+    recorded_at = models.DateTimeField(default=timezone.now,help_text="When the vital signs were measured")
     body_temperature = models.DecimalField(max_digits=4, decimal_places=1, help_text="Body temperature in degrees Celsius (°C)",blank=True, null=True)
     pulse_rate = models.PositiveIntegerField(help_text="Pulse rate in beats per minute (bpm)",blank=True, null=True)
     blood_pressure = models.CharField(max_length=7, validators=[validate_blood_pressure], help_text="Blood pressure in the format 'Systolic/Diastolic' (e.g., '120/80')",blank=True, null=True)
+    systolic = models.PositiveSmallIntegerField(help_text="Systolic blood pressure (mmHg), parsed from blood_pressure",blank=True, null=True)
+    diastolic = models.PositiveSmallIntegerField(help_text="Diastolic blood pressure (mmHg), parsed from blood_pressure",blank=True, null=True)
     blood_oxygen = models.DecimalField(max_digits=4, decimal_places=1, help_text="Blood oxygen level as a percentage (%)",blank=True, null=True)
     respiration_rate = models.PositiveIntegerField(help_text="Respiration rate in breaths per minute (bpm)",blank=True, null=True)
     weight = models.DecimalField(max_digits=5, decimal_places=2, help_text="Weight of the patient in kilograms (kg)",blank=True, null=True)
-    slug = AutoSlugField(populate_from='patient_diagnoses_details', unique=True)
+    slug = UUIDSlugField()
 
     def __str__(self):
         return f"Vital Signs recorded on {self.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
@@ -157,3 +277,182 @@ class VitalSign(TimeStampedUUID,SoftDeleteModel):
         ordering = ['-created_at']
         verbose_name = "Vital Sign"
         verbose_name_plural = "Vital Signs"
+        indexes = [
+            # Per-patient time ranges (charts, trends)
+            models.Index(fields=['patient', 'recorded_at'], condition=models.Q(deleted_at__isnull=True), name='vitalsign_patient_time_idx'),
+            # Rows are appended in time order: a tiny BRIN index serves organization-wide time
+            # ranges and the incremental rollup scan
+            BrinIndex(fields=['recorded_at', 'updated_at'], name='vitalsign_time_brin'),
+        ]
+
+    @staticmethod
+    def split_blood_pressure(blood_pressure):
+        """(systolic, diastolic) of a '120/80' reading, (None, None) when missing or malformed."""
+        try:
+            systolic, diastolic = (int(part) for part in blood_pressure.split("/"))
+        except (AttributeError, ValueError):
+            return None, None
+        return systolic, diastolic
+
+    def save(self, *args, **kwargs):
+        self.systolic, self.diastolic = self.split_blood_pressure(self.blood_pressure)
+        if self.patient_id is None and self.patient_diagnoses_details_id is not None:
+            self.patient_id = self.patient_diagnoses_details.patient_id
+        super().save(*args, **kwargs)
+
+
+class RollupPeriod(models.TextChoices):
+    DAY = "day", _("Day")
+    WEEK = "week", _("Week")
+    MONTH = "month", _("Month")
+
+
+class VitalSignRollup(models.Model):
+    """
+    Min / max / mean of a patient's vital signs per day, week (starting Monday) and month,
+    maintained by the `refresh_vital_sign_rollups` task. Trends over long windows read these
+    instead of the raw measurements.
+    """
+    patient = models.ForeignKey(Patient,on_delete=models.CASCADE,related_name="vital_sign_rollups",db_index=False)
+    period = models.CharField(max_length=10,choices=RollupPeriod.choices)
+    period_start = models.DateField()
+    samples = models.PositiveIntegerField(default=0)
+    body_temperature_min = models.FloatField(null=True)
+    body_temperature_max = models.FloatField(null=True)
+    body_temperature_mean = models.FloatField(null=True)
+    pulse_rate_min = models.FloatField(null=True)
+    pulse_rate_max = models.FloatField(null=True)
+    pulse_rate_mean = models.FloatField(null=True)
+    systolic_min = models.FloatField(null=True)
+    systolic_max = models.FloatField(null=True)
+    systolic_mean = models.FloatField(null=True)
+    diastolic_min = models.FloatField(null=True)
+    diastolic_max = models.FloatField(null=True)
+    diastolic_mean = models.FloatField(null=True)
+    blood_oxygen_min = models.FloatField(null=True)
+    blood_oxygen_max = models.FloatField(null=True)
+    blood_oxygen_mean = models.FloatField(null=True)
+    respiration_rate_min = models.FloatField(null=True)
+    respiration_rate_max = models.FloatField(null=True)
+    respiration_rate_mean = models.FloatField(null=True)
+    weight_min = models.FloatField(null=True)
+    weight_max = models.FloatField(null=True)
+    weight_mean = models.FloatField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Vital Sign Rollup"
+        verbose_name_plural = "Vital Sign Rollups"
+        constraints = [
+            # Also the index of the trends lookups: (patient, period, period_start range)
+            models.UniqueConstraint(fields=['patient', 'period', 'period_start'], name='unique_vital_sign_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.period} vital signs of patient {self.patient_id} from {self.period_start}"
+
+
+class ProcessingWatermark(models.Model):
+    """
+    Position reached by an incremental background job over a table, as the (timestamp, pkid) of
+    the last row it processed. Jobs read and advance their own row, by name.
+    """
+    name = models.CharField(max_length=100,unique=True)
+    position_at = models.DateTimeField(null=True,blank=True)
+    position_pkid = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Processing Watermark"
+        verbose_name_plural = "Processing Watermarks"
+
+    def __str__(self):
+        return f"{self.name} at {self.position_at} #{self.position_pkid}"
+
+    def rows_after(self, queryset, field="updated_at"):
+        """Rows of `queryset` past this position, in (field, pkid) order."""
+        if self.position_at is not None:
+            queryset = queryset.filter(
+                models.Q(**{f"{field}__gt": self.position_at})
+                | models.Q(**{field: self.position_at, "pkid__gt": self.position_pkid})
+            )
+        return queryset.order_by(field, "pkid")
+
+    def advance(self, position_at, position_pkid):
+        self.position_at, self.position_pkid = position_at, position_pkid
+        self.save(update_fields=["position_at", "position_pkid", "updated_at"])
+
+
+class VitalMetric(models.TextChoices):
+    BODY_TEMPERATURE = "body_temperature", _("Body temperature")
+    PULSE_RATE = "pulse_rate", _("Pulse rate")
+    SYSTOLIC = "systolic", _("Systolic blood pressure")
+    DIASTOLIC = "diastolic", _("Diastolic blood pressure")
+    BLOOD_OXYGEN = "blood_oxygen", _("Blood oxygen")
+    RESPIRATION_RATE = "respiration_rate", _("Respiration rate")
+    WEIGHT = "weight", _("Weight")
+
+
+class AlertComparison(models.TextChoices):
+    BELOW = "below", _("Below")
+    ABOVE = "above", _("Above")
+
+
+class AlertStatus(models.TextChoices):
+    OPEN = "open", _("Open")
+    RESOLVED = "resolved", _("Resolved")
+
+
+class VitalAlertRule(TimeStampedUUID):
+    """A threshold on one vital sign metric, e.g. blood_oxygen below 92, set by an organization."""
+    organization = models.ForeignKey(Organization,on_delete=models.CASCADE,verbose_name=_("Organization"),related_name="vital_alert_rules",db_index=False)
+    metric = models.CharField(max_length=20,choices=VitalMetric.choices,verbose_name=_("Metric"))
+    comparison = models.CharField(max_length=10,choices=AlertComparison.choices,verbose_name=_("Comparison"))
+    threshold = models.FloatField(verbose_name=_("Threshold"))
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Vital Alert Rule"
+        verbose_name_plural = "Vital Alert Rules"
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'metric', 'comparison'], name='unique_vital_alert_rule'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.comparison} {self.threshold}"
+
+
+class VitalAlert(TimeStampedUUID):
+    """
+    A vital sign reading that broke an alert threshold, written by the `scan_vital_alerts` task.
+    An alert stays open while it is the patient's latest reading of that metric, and is resolved
+    once a newer reading arrives or the reading is corrected or deleted.
+    """
+    organization = models.ForeignKey(Organization,on_delete=models.CASCADE,verbose_name=_("Organization"),db_index=False)
+    patient = models.ForeignKey(Patient,on_delete=models.CASCADE,verbose_name=_("Patient"),related_name="vital_alerts",db_index=False)
+    vital_sign = models.ForeignKey(VitalSign,on_delete=models.CASCADE,verbose_name=_("Vital Sign"),db_index=False)
+    metric = models.CharField(max_length=20,choices=VitalMetric.choices,verbose_name=_("Metric"))
+    comparison = models.CharField(max_length=10,choices=AlertComparison.choices,verbose_name=_("Comparison"))
+    threshold = models.FloatField(verbose_name=_("Threshold"))
+    value = models.FloatField(verbose_name=_("Value"))
+    recorded_at = models.DateTimeField(verbose_name=_("Recorded at"))
+    status = models.CharField(max_length=10,choices=AlertStatus.choices,default=AlertStatus.OPEN,verbose_name=_("Status"))
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Vital Alert"
+        verbose_name_plural = "Vital Alerts"
+        indexes = [
+            # The alert list: one organization and status, newest first (keyset pages)
+            models.Index(fields=['organization', 'status', 'created_at', 'pkid'], name='vitalalert_org_status_idx'),
+            # Open alerts of the patients of a scanned batch
+            models.Index(fields=['patient'], condition=models.Q(status='open'), name='vitalalert_open_patient_idx'),
+        ]
+        constraints = [
+            # Also the index of the upserts and of the vital sign foreign key
+            models.UniqueConstraint(fields=['vital_sign', 'metric'], name='unique_vital_alert'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.value} of patient {self.patient_id} ({self.status})"
@@ -1,10 +1,18 @@
+from datetime import datetime, time, timedelta
+from django.conf import settings
 from django.db import transaction, IntegrityError
+from django.db.models import Avg, Count, DateField, F, Max, Min, Q
+from django.db.models.functions import Greatest, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
 from django.core.exceptions import ValidationError
 from apps.organizations.models import Organization, User
 from shared.text_choices import UserRoles
 import logging
 from apps.patients.models import Patient,PatientMedicalRecord
-from .models import PatientDiagnosisDetails,VitalSign
+from .models import PatientDiagnosisDetails,PatientDiagnosisSummary,VitalSign,VitalSignRollup,RollupPeriod,ProcessingWatermark
+from .exceptions import DiagnosisIdempotencyConflictException, VitalTrendsWindowTooLargeException
+from shared.cache import CacheNamespaces, TenantCache
 
 
 logger = logging.getLogger(__name__)
@@ -25,9 +33,10 @@ class PatientService:
 
                 # Update or create medical record
                 if medical_record_data:
-                    PatientMedicalRecord.objects.update_or_create(
+                    # One record per patient, soft-deleted or not: a deleted one is restored
+                    PatientMedicalRecord.objects.all_with_deleted().update_or_create(
                         patient=instance,
-                        defaults=medical_record_data
+                        defaults={**medical_record_data, 'is_deleted': False, 'deleted_at': None}
                     )
 
                 return instance
@@ -52,8 +61,11 @@ class PatientDiagnosisVitalSignService:
                 if vital_sign_data:
                     VitalSign.objects.create(
                         patient_diagnoses_details=diagnosis,
+                        patient=patient,
+                        recorded_at=diagnosis.created_at,
                         **vital_sign_data
                     )
+                PatientDiagnosisSummaryService.refresh_for_patient(patient)
             return diagnosis
         except IntegrityError as e:
             raise ValidationError(f"Error creating diagnosis: {str(e)}")
@@ -68,10 +80,420 @@ class PatientDiagnosisVitalSignService:
                 instance.save()
 
                 if vital_sign_data:
-                    VitalSign.objects.update_or_create(
+                    # One vital sign per diagnosis: a soft-deleted one is restored with the new readings
+                    VitalSign.objects.all_with_deleted().update_or_create(
                         patient_diagnoses_details=instance,
-                        defaults=vital_sign_data
+                        defaults={**vital_sign_data, 'is_deleted': False, 'deleted_at': None}
                     )
+                PatientDiagnosisSummaryService.refresh_for_patient(instance.patient)
             return instance
         except IntegrityError as e:
-            raise ValidationError(f"Error updating diagnosis: {str(e)}")
\ No newline at end of file
+            raise ValidationError(f"Error updating diagnosis: {str(e)}")
+
+
+class PatientDiagnosisBulkService:
+    """
+    Creates many diagnoses with their vital signs at once, e.g. visits synced by ward devices:
+    referenced patients and caregivers are resolved in one IN query each, and the rows are
+    written with two bulk INSERTs and one summary refresh in a single transaction. Items may
+    carry an `idempotency_key`, unique per organization, so a retried sync creates nothing twice.
+    """
+
+    @staticmethod
+    def max_rows():
+        return getattr(settings, "BULK_DIAGNOSIS_MAX_ROWS", 200)
+
+    @staticmethod
+    def resolve(model, organization, ids):
+        """pkid of each given UUID of an organization's `model` rows, in one query."""
+        if not ids:
+            return {}
+        return dict(model.objects.filter(organization=organization, id__in=ids).order_by().values_list('id', 'pkid'))
+
+    @staticmethod
+    def existing_keys(organization, keys):
+        """UUID of the organization's diagnoses already created under the given idempotency keys."""
+        if not keys:
+            return {}
+        return dict(
+            PatientDiagnosisDetails.objects.all_with_deleted()
+            .filter(organization=organization, idempotency_key__in=keys)
+            .order_by()
+            .values_list('idempotency_key', 'id')
+        )
+
+    @staticmethod
+    def create_diagnoses(rows, organization):
+        """
+        Insert already validated rows: diagnosis fields with `patient_id` / `caregiver_id` pkids,
+        plus an optional `vital_sign` dict and its `recorded_at`. Returns the diagnoses.
+        """
+        now = timezone.now()
+        diagnoses, vital_signs = [], []
+        for row in rows:
+            row = dict(row)
+            vital_sign_data = row.pop('vital_sign', None)
+            recorded_at = row.pop('recorded_at', None) or now
+            diagnosis = PatientDiagnosisDetails(organization=organization, **row)
+            diagnoses.append(diagnosis)
+            if vital_sign_data:
+                # bulk_create skips VitalSign.save()
+                systolic, diastolic = VitalSign.split_blood_pressure(vital_sign_data.get('blood_pressure'))
+                vital_signs.append(VitalSign(
+                    patient_diagnoses_details=diagnosis, patient_id=row['patient_id'], recorded_at=recorded_at,
+                    systolic=systolic, diastolic=diastolic, **vital_sign_data,
+                ))
+
+        try:
+            with transaction.atomic():
+                PatientDiagnosisDetails.objects.bulk_create(diagnoses)
+                VitalSign.objects.bulk_create(vital_signs)
+                PatientDiagnosisSummaryService.refresh_for_patients({diagnosis.patient_id for diagnosis in diagnoses})
+        except IntegrityError as e:
+            # A concurrent request created one of the keys first: retrying replays it
+            logger.warning(f"Bulk diagnosis creation conflicted for organization {organization.pk}: {e}")
+            raise DiagnosisIdempotencyConflictException()
+        # bulk_create sends no post_save
+        TenantCache.invalidate(organization.pk, CacheNamespaces.DIAGNOSES)
+        return diagnoses
+
+
+class PatientDiagnosisSummaryService:
+    SUMMARY_FIELDS = ['organization', 'latest_diagnosis', 'diagnosis_count', 'last_visit_at', 'updated_at']
+
+    @staticmethod
+    def refresh_for_patient(patient):
+        """
+        Recompute the summary row of one patient from its live diagnoses.
+        The patient row is locked so concurrent diagnosis writes can't leave a stale count behind.
+        """
+        with transaction.atomic():
+            Patient.objects.select_for_update().filter(pk=patient.pk).values_list('pk', flat=True).first()
+
+            diagnoses = PatientDiagnosisDetails.objects.filter(patient=patient)
+            stats = diagnoses.aggregate(total=Count('pkid'), last_visit_at=Max('created_at'))
+            latest_diagnosis_id = diagnoses.order_by('-created_at', '-pkid').values_list('pkid', flat=True).first()
+
+            PatientDiagnosisSummaryService._upsert([
+                PatientDiagnosisSummary(
+                    patient_id=patient.pk,
+                    organization_id=patient.organization_id,
+                    latest_diagnosis_id=latest_diagnosis_id,
+                    diagnosis_count=stats['total'],
+                    last_visit_at=stats['last_visit_at'],
+                )
+            ])
+
+    @staticmethod
+    def refresh_for_patients(patient_ids):
+        """refresh_for_patient for several patients at once, locked in pkid order to avoid deadlocks."""
+        with transaction.atomic():
+            list(Patient.objects.select_for_update().filter(pk__in=patient_ids).order_by('pk').values_list('pk', flat=True))
+            return PatientDiagnosisSummaryService.rebuild(patient_ids=patient_ids)
+
+    @staticmethod
+    def rebuild(organization=None, batch_size=1000, patient_ids=None):
+        """
+        Rebuild the summaries of every patient (optionally of one organization, or of the given
+        patients) in bulk. Returns the number of summary rows written.
+        """
+        diagnoses = PatientDiagnosisDetails.objects.all()
+        patients = Patient.objects.all()
+        if organization is not None:
+            diagnoses = diagnoses.filter(organization=organization)
+            patients = patients.filter(organization=organization)
+        if patient_ids is not None:
+            diagnoses = diagnoses.filter(patient_id__in=patient_ids)
+            patients = patients.filter(pk__in=patient_ids)
+
+        stats = {
+            row['patient']: row
+            for row in diagnoses.order_by().values('patient').annotate(total=Count('pkid'), last_visit_at=Max('created_at'))
+        }
+        # DISTINCT ON (patient_id) keeps the newest diagnosis of every patient
+        latest = dict(
+            diagnoses.order_by('patient_id', '-created_at', '-pkid')
+            .distinct('patient_id')
+            .values_list('patient_id', 'pkid')
+        )
+
+        written = 0
+        batch = []
+        for patient_id, organization_id in patients.values_list('pkid', 'organization_id').iterator(chunk_size=batch_size):
+            row = stats.get(patient_id, {})
+            batch.append(
+                PatientDiagnosisSummary(
+                    patient_id=patient_id,
+                    organization_id=organization_id,
+                    latest_diagnosis_id=latest.get(patient_id),
+                    diagnosis_count=row.get('total', 0),
+                    last_visit_at=row.get('last_visit_at'),
+                )
+            )
+            if len(batch) >= batch_size:
+                written += PatientDiagnosisSummaryService._upsert(batch)
+                batch = []
+        if batch:
+            written += PatientDiagnosisSummaryService._upsert(batch)
+        return written
+
+    @staticmethod
+    def _upsert(summaries):
+        PatientDiagnosisSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['patient'],
+            update_fields=PatientDiagnosisSummaryService.SUMMARY_FIELDS,
+        )
+        return len(summaries)
+
+
+class PatientDiagnosisQueryService:
+
+    @staticmethod
+    def patients_with_latest_diagnosis(organization):
+        """
+        Patients of an organization that have at least one diagnosis, read from
+        PatientDiagnosisSummary: one joined row per patient, no aggregation over the history table.
+        """
+        return (
+            Patient.objects
+            .filter(
+                organization=organization,
+                diagnosis_summary__diagnosis_count__gt=0,
+            )
+            .select_related('diagnosis_summary__latest_diagnosis')
+        )
+
+
+class PatientDiagnosisSearchService:
+    SEARCH_CONFIG = 'english'
+    TRIGRAM_FIELDS = ('diagnoses', 'assessment', 'medication')
+
+    @staticmethod
+    def search(queryset, term):
+        """
+        Filter diagnoses matching `term` and annotate them with a `rank`.
+        Full-text matches come from the stored `search_vector` (GIN index). Partial words and
+        misspellings are caught by trigram word similarity on the short text columns (trigram GIN indexes).
+        Both predicates are index-backed, so the query stays fast over a whole organization.
+        """
+        query = SearchQuery(term, search_type='websearch', config=PatientDiagnosisSearchService.SEARCH_CONFIG)
+
+        trigram_match = Q()
+        for field in PatientDiagnosisSearchService.TRIGRAM_FIELDS:
+            trigram_match |= Q(**{f'{field}__trigram_word_similar': term})
+        similarity = Greatest(*[
+            TrigramWordSimilarity(term, field) for field in PatientDiagnosisSearchService.TRIGRAM_FIELDS
+        ])
+
+        return (
+            queryset
+            .filter(Q(search_vector=query) | trigram_match)
+            .annotate(rank=SearchRank(F('search_vector'), query) + similarity)
+        )
+
+
+class VitalSignRollupService:
+    """
+    Maintains the daily, weekly and monthly VitalSignRollup rows incrementally. Vital signs
+    written since the watermark are read in (updated_at, pkid) order, so edits and soft deletes
+    are picked up too; the buckets they fall in are recomputed from the alive measurements,
+    upserted, and deleted once no measurement is left in them.
+    """
+    WATERMARK = "vital_sign_rollups"
+    METRICS = ("body_temperature", "pulse_rate", "systolic", "diastolic", "blood_oxygen", "respiration_rate", "weight")
+    TRUNCATIONS = {RollupPeriod.DAY: TruncDay, RollupPeriod.WEEK: TruncWeek, RollupPeriod.MONTH: TruncMonth}
+    AGGREGATES = {
+        f"{metric}_{name}": aggregate(metric)
+        for metric in METRICS
+        for name, aggregate in (("min", Min), ("max", Max), ("mean", Avg))
+    }
+    UPDATED_FIELDS = ["samples", *AGGREGATES, "updated_at"]
+
+    @staticmethod
+    def period_start(period, moment):
+        """First day of the bucket containing `moment` (in the current time zone, like Trunc)."""
+        day = timezone.localtime(moment).date()
+        if period == RollupPeriod.WEEK:
+            return day - timedelta(days=day.weekday())
+        if period == RollupPeriod.MONTH:
+            return day.replace(day=1)
+        return day
+
+    @staticmethod
+    def next_period_start(period, start):
+        if period == RollupPeriod.WEEK:
+            return start + timedelta(days=7)
+        if period == RollupPeriod.MONTH:
+            return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return start + timedelta(days=1)
+
+    @staticmethod
+    def midnight(day):
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    @staticmethod
+    def refresh(now=None, batch_size=None):
+        """
+        Fold the vital signs changed since the last run into the rollups. Rows younger than
+        VITAL_SIGN_ROLLUP_SETTLE_SECONDS are left for the next run, so that a transaction
+        committing late with an older updated_at is not skipped. Returns the rows processed.
+        """
+        now = now or timezone.now()
+        cutoff = now - timedelta(seconds=getattr(settings, "VITAL_SIGN_ROLLUP_SETTLE_SECONDS", 60))
+        batch_size = batch_size or getattr(settings, "VITAL_SIGN_ROLLUP_BATCH_SIZE", 5000)
+        ProcessingWatermark.objects.get_or_create(name=VitalSignRollupService.WATERMARK)
+
+        processed = 0
+        while True:
+            with transaction.atomic():
+                # Also serializes concurrent runs
+                watermark = ProcessingWatermark.objects.select_for_update().get(name=VitalSignRollupService.WATERMARK)
+                changed = watermark.rows_after(VitalSign.objects.all_with_deleted().filter(updated_at__lte=cutoff))
+                rows = list(changed.values_list("pkid", "patient_id", "recorded_at", "updated_at")[:batch_size])
+                if not rows:
+                    break
+                VitalSignRollupService.recompute([(patient_id, recorded_at) for _, patient_id, recorded_at, _ in rows])
+                watermark.advance(rows[-1][3], rows[-1][0])
+            processed += len(rows)
+            if len(rows) < batch_size:
+                break
+        return processed
+
+    @staticmethod
+    def recompute(measurements):
+        """Recompute every rollup containing one of the (patient id, recorded_at) measurements."""
+        for period, truncate in VitalSignRollupService.TRUNCATIONS.items():
+            buckets = {
+                (patient_id, VitalSignRollupService.period_start(period, recorded_at))
+                for patient_id, recorded_at in measurements
+            }
+            # The touched patients over the span of all touched buckets, served by the
+            # (patient, recorded_at) index; buckets outside the touched set are discarded below
+            starts = [start for _, start in buckets]
+            window = Q(
+                patient_id__in={patient_id for patient_id, _ in buckets},
+                recorded_at__gte=VitalSignRollupService.midnight(min(starts)),
+                recorded_at__lt=VitalSignRollupService.midnight(VitalSignRollupService.next_period_start(period, max(starts))),
+            )
+
+            rollups = [
+                rollup for rollup in VitalSignRollupService._aggregate(VitalSign.objects.filter(window), period, truncate)
+                if (rollup.patient_id, rollup.period_start) in buckets
+            ]
+            VitalSignRollupService._upsert(rollups)
+
+            emptied = buckets - {(rollup.patient_id, rollup.period_start) for rollup in rollups}
+            if emptied:
+                stale = Q()
+                for patient_id, start in emptied:
+                    stale |= Q(patient_id=patient_id, period_start=start)
+                VitalSignRollup.objects.filter(stale, period=period).delete()
+
+    @staticmethod
+    def rebuild(organization=None, batch_size=1000):
+        """
+        Recompute every rollup (optionally of one organization's patients) from scratch, for
+        data written behind the watermark's back (seeding, imports). Returns the rows written.
+        """
+        vital_signs = VitalSign.objects.all()
+        rollups = VitalSignRollup.objects.all()
+        if organization is not None:
+            vital_signs = vital_signs.filter(patient__organization=organization)
+            rollups = rollups.filter(patient__organization=organization)
+
+        written = 0
+        with transaction.atomic():
+            rollups.delete()
+            for period, truncate in VitalSignRollupService.TRUNCATIONS.items():
+                batch = []
+                for rollup in VitalSignRollupService._aggregate(vital_signs, period, truncate):
+                    batch.append(rollup)
+                    if len(batch) >= batch_size:
+                        written += VitalSignRollupService._upsert(batch)
+                        batch = []
+                written += VitalSignRollupService._upsert(batch)
+        return written
+
+    @staticmethod
+    def _aggregate(vital_signs, period, truncate):
+        rows = (
+            vital_signs.annotate(period_start=truncate("recorded_at", output_field=DateField()))
+            .order_by()
+            .values("patient_id", "period_start")
+            .annotate(samples=Count("pkid"), **VitalSignRollupService.AGGREGATES)
+        )
+        for row in rows.iterator(chunk_size=2000):
+            yield VitalSignRollup(period=period, **row)
+
+    @staticmethod
+    def _upsert(rollups):
+        if rollups:
+            VitalSignRollup.objects.bulk_create(
+                rollups,
+                update_conflicts=True,
+                unique_fields=["patient", "period", "period_start"],
+                update_fields=VitalSignRollupService.UPDATED_FIELDS,
+            )
+        return len(rollups)
+
+
+class VitalSignTrendService:
+    """
+    A patient's vital signs over a time window in at most VITAL_TRENDS_MAX_POINTS points: the raw
+    measurements when they fit, otherwise the finest rollup period that does. Either way a single
+    bounded index range scan, whatever the length of the window.
+    """
+    RESOLUTIONS = ("auto", "raw", *RollupPeriod.values)
+    RAW_FIELDS = ("recorded_at", *VitalSignRollupService.METRICS)
+    ROLLUP_FIELDS = ("period_start", "samples", *VitalSignRollupService.AGGREGATES)
+
+    @staticmethod
+    def max_points():
+        return getattr(settings, "VITAL_TRENDS_MAX_POINTS", 500)
+
+    @staticmethod
+    def bucket_count(period, start, end):
+        """Number of `period` buckets overlapping [start, end)."""
+        first = VitalSignRollupService.period_start(period, start)
+        last = VitalSignRollupService.period_start(period, end - timedelta(microseconds=1))
+        if period == RollupPeriod.MONTH:
+            return (last.year - first.year) * 12 + last.month - first.month + 1
+        return (last - first).days // (7 if period == RollupPeriod.WEEK else 1) + 1
+
+    @staticmethod
+    def trends(patient, start, end, resolution="auto"):
+        """Returns (resolution, points) for the measurements recorded in [start, end)."""
+        max_points = VitalSignTrendService.max_points()
+
+        if resolution in ("auto", "raw"):
+            points = list(
+                VitalSign.objects.filter(patient=patient, recorded_at__gte=start, recorded_at__lt=end)
+                .order_by("recorded_at", "pkid")
+                .values(*VitalSignTrendService.RAW_FIELDS)[:max_points + 1]
+            )
+            if len(points) <= max_points:
+                return "raw", points
+            if resolution == "raw":
+                raise VitalTrendsWindowTooLargeException()
+            resolution = next(
+                (period for period in RollupPeriod.values if VitalSignTrendService.bucket_count(period, start, end) <= max_points),
+                None,
+            )
+            if resolution is None:
+                raise VitalTrendsWindowTooLargeException()
+        elif VitalSignTrendService.bucket_count(resolution, start, end) > max_points:
+            raise VitalTrendsWindowTooLargeException()
+
+        points = list(
+            VitalSignRollup.objects.filter(
+                patient=patient,
+                period=resolution,
+                period_start__gte=VitalSignRollupService.period_start(resolution, start),
+                period_start__lte=VitalSignRollupService.period_start(resolution, end - timedelta(microseconds=1)),
+            )
+            .order_by("period_start")
+            .values(*VitalSignTrendService.ROLLUP_FIELDS)
+        )
+        return resolution, points
@@ -2,7 +2,10 @@ import logging
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.validators import validate_email as django_validate_email, RegexValidator
+from datetime import timedelta
+from django.conf import settings
 from django.db import IntegrityError, transaction
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
@@ -12,8 +15,8 @@ from apps.caregivers.models import Caregiver
 # from apps.accounts.user_roles import UserRoles
 # from .exceptions import PatientNotificationFailedException
 from .mixins import PatientRepresentationMixin
-from .models import Patient, PatientMedicalRecord, PatientDiagnosisDetails, VitalSign
-from .patient_service import PatientService,PatientDiagnosisVitalSignService
+from .models import Patient, PatientMedicalRecord, PatientDiagnosisDetails, PatientDiagnosisSummary, VitalSign, VitalAlert, VitalAlertRule, AlertStatus
+from .patient_service import PatientService,PatientDiagnosisVitalSignService,PatientDiagnosisBulkService,VitalSignTrendService
 from rest_framework import viewsets, status
 
 logger = logging.getLogger(__name__)
@@ -103,7 +106,7 @@ class PatientDiagnosisSerializer(serializers.ModelSerializer):
     """
     diagnoses = serializers.SerializerMethodField()
     patient_name = serializers.CharField(source="full_name", read_only=True)
-    diagnosis_count = serializers.IntegerField(source="diagnoses.count", read_only=True)
+    diagnosis_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Patient
@@ -122,16 +125,39 @@ class PatientDiagnosisSerializer(serializers.ModelSerializer):
         Get diagnoses based on view type ('latest' or 'all').
         """
         view_type = self.context.get('view_type', 'all')
-        diagnoses = obj.diagnoses.all() 
+        # PatientDiagnosisHistoryView passes its filtered/ranked queryset in the context
+        diagnoses = self.context.get('diagnoses_queryset')
+        if diagnoses is None:
+            diagnoses = obj.diagnoses.all()
 
         if view_type == 'latest':
-            latest_diagnosis = diagnoses.first()
+            summary = self._get_loaded_summary(obj)
+            if summary is not None:
+                latest_diagnosis = summary.latest_diagnosis
+            else:
+                latest_diagnosis = diagnoses.first()
             return (
                 DiagnosisSerializer(latest_diagnosis, context=self.context).data
                 if latest_diagnosis else None
             )
         return DiagnosisSerializer(diagnoses, many=True, context=self.context).data
 
+    def get_diagnosis_count(self, obj):
+        summary = self._get_loaded_summary(obj)
+        if summary is not None:
+            return summary.diagnosis_count
+        return obj.diagnoses.count()
+
+    @staticmethod
+    def _get_loaded_summary(obj):
+        """Return the PatientDiagnosisSummary only if the queryset already joined it."""
+        if not Patient.diagnosis_summary.is_cached(obj):
+            return None
+        try:
+            return obj.diagnosis_summary
+        except PatientDiagnosisSummary.DoesNotExist:
+            return None
+
 
 class VitalSignSerializer(serializers.ModelSerializer):
     class Meta:
@@ -213,6 +239,110 @@ class PatientDiagnosisWithVitalSignSerializer(serializers.ModelSerializer):
         return PatientDiagnosisVitalSignService.update_diagnosis(instance, validated_data)
 
 
+class PatientDiagnosisBulkItemSerializer(serializers.ModelSerializer):
+    """One diagnosis of a bulk submission. `recorded_at` is when its vital signs were measured."""
+    patient_id = serializers.UUIDField()
+    caregiver_id = serializers.UUIDField(required=False, allow_null=True)
+    vital_sign = VitalSignSerializer(required=False)
+    recorded_at = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = PatientDiagnosisDetails
+        fields = [
+            'patient_id', 'caregiver_id', 'assessment', 'health_care_center', 'diagnoses', 'medication', 'notes',
+            'health_allergies', 'vital_sign', 'recorded_at', 'idempotency_key',
+        ]
+
+
+class PatientDiagnosisBulkSerializer(serializers.Serializer):
+    """
+    Validates every diagnosis of a batch up front, resolving the referenced patients and
+    caregivers in one query each. Items whose idempotency key was already used are reported as
+    duplicates of the existing diagnosis rather than created again. By default a single invalid
+    item rejects the whole batch; with `partial_success` the valid ones are created.
+    Caregivers are assigned to their own submissions; organization users name the caregiver.
+    """
+    diagnoses = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    partial_success = serializers.BooleanField(default=False)
+
+    def validate_diagnoses(self, rows):
+        max_rows = PatientDiagnosisBulkService.max_rows()
+        if len(rows) > max_rows:
+            raise serializers.ValidationError(f"At most {max_rows} diagnoses can be created per request.")
+        return rows
+
+    def validate(self, attrs):
+        organization, caregiver = self.context['organization'], self.context.get('caregiver')
+        errors, valid = {}, []
+        for number, row in enumerate(attrs['diagnoses'], start=1):
+            row_serializer = PatientDiagnosisBulkItemSerializer(data=row)
+            if row_serializer.is_valid():
+                valid.append((number, dict(row_serializer.validated_data)))
+            else:
+                errors[number] = row_serializer.errors
+
+        patients = PatientDiagnosisBulkService.resolve(Patient, organization, {data['patient_id'] for _, data in valid})
+        caregivers = {} if caregiver else PatientDiagnosisBulkService.resolve(
+            Caregiver, organization, {data['caregiver_id'] for _, data in valid if data.get('caregiver_id')}
+        )
+        existing = PatientDiagnosisBulkService.existing_keys(
+            organization, {data['idempotency_key'] for _, data in valid if data.get('idempotency_key')}
+        )
+
+        seen, duplicates = set(), {}
+        for number, data in valid:
+            key = data.get('idempotency_key')
+            if key and key in seen:
+                errors[number] = {'idempotency_key': ["This idempotency key appears more than once in the request."]}
+            elif key in existing:
+                duplicates[number] = existing[key]
+            elif data['patient_id'] not in patients:
+                errors[number] = {'patient_id': ["Patient not found in this organization."]}
+            elif not caregiver and not data.get('caregiver_id'):
+                errors[number] = {'caregiver_id': ["Caregiver is required for organization users."]}
+            elif not caregiver and data['caregiver_id'] not in caregivers:
+                errors[number] = {'caregiver_id': ["Caregiver not found in this organization."]}
+            else:
+                data['patient_id'] = patients[data['patient_id']]
+                data['caregiver_id'] = caregiver.pk if caregiver else caregivers[data['caregiver_id']]
+            if key:
+                seen.add(key)
+
+        if errors and not attrs['partial_success']:
+            raise serializers.ValidationError({'diagnoses': errors})
+
+        attrs['valid_rows'] = [(number, data) for number, data in valid if number not in errors and number not in duplicates]
+        attrs['duplicates'] = duplicates
+        attrs['row_errors'] = errors
+        return attrs
+
+    def create(self, validated_data):
+        valid_rows = validated_data['valid_rows']
+        diagnoses = PatientDiagnosisBulkService.create_diagnoses([data for _, data in valid_rows], self.context['organization'])
+
+        results = {
+            number: {'row': number, 'status': 'created', 'id': diagnosis.id, 'idempotency_key': diagnosis.idempotency_key}
+            for (number, _), diagnosis in zip(valid_rows, diagnoses)
+        }
+        results.update({
+            number: {'row': number, 'status': 'duplicate', 'id': diagnosis_id, 'idempotency_key': validated_data['diagnoses'][number - 1].get('idempotency_key')}
+            for number, diagnosis_id in validated_data['duplicates'].items()
+        })
+        results.update({
+            number: {'row': number, 'status': 'failed', 'errors': row_errors}
+            for number, row_errors in validated_data['row_errors'].items()
+        })
+        return {
+            'created': len(diagnoses),
+            'duplicates': len(validated_data['duplicates']),
+            'failed': len(validated_data['row_errors']),
+            'results': [results[number] for number in sorted(results)],
+        }
+
+    def to_representation(self, instance):
+        return instance
+
+
 class PatientProfileSerializer(ValidationMixin, serializers.ModelSerializer):
     """Serializer for patient profile"""
     profile_picture = serializers.ImageField(required=False, allow_null=True)
@@ -230,4 +360,80 @@ class PatientProfileSerializer(ValidationMixin, serializers.ModelSerializer):
         return self.validate_name_field(value, "First name")
 
     def validate_last_name(self, value):
-        return self.validate_name_field(value, "Last name")
\ No newline at end of file
+        return self.validate_name_field(value, "Last name")
+
+
+class VitalSignTrendQuerySerializer(serializers.Serializer):
+    """Query parameters of the vital sign trends: [start, end) defaults to the last VITAL_TRENDS_DEFAULT_DAYS days."""
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    resolution = serializers.ChoiceField(choices=VitalSignTrendService.RESOLUTIONS, default="auto")
+
+    def validate(self, attrs):
+        attrs["end"] = attrs.get("end") or timezone.now()
+        attrs["start"] = attrs.get("start") or attrs["end"] - timedelta(days=getattr(settings, "VITAL_TRENDS_DEFAULT_DAYS", 90))
+        if attrs["start"] >= attrs["end"]:
+            raise serializers.ValidationError({"start": "Start must be before end."})
+        return attrs
+
+
+class VitalSignAnalyticsQuerySerializer(serializers.Serializer):
+    """Query parameters of the vital sign analytics: an optional [start, end) window, the rolling window size and a cohort."""
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    window = serializers.IntegerField(required=False, min_value=1, max_value=365)
+    patient = serializers.ListField(child=serializers.UUIDField(), required=False, help_text="Restrict the cohort to these patient ids")
+
+    def validate(self, attrs):
+        if attrs.get("start") and attrs.get("end") and attrs["start"] >= attrs["end"]:
+            raise serializers.ValidationError({"start": "Start must be before end."})
+        return attrs
+
+
+class VitalCohortAnalyticsQuerySerializer(VitalSignAnalyticsQuerySerializer):
+    """
+    Query parameters of the cohort analytics: [start, end) defaults to the last
+    VITAL_ANALYTICS_DEFAULT_DAYS days and spans at most VITAL_ANALYTICS_MAX_DAYS days.
+    """
+
+    def validate(self, attrs):
+        attrs["end"] = attrs.get("end") or timezone.now()
+        attrs["start"] = attrs.get("start") or attrs["end"] - timedelta(days=getattr(settings, "VITAL_ANALYTICS_DEFAULT_DAYS", 90))
+        attrs = super().validate(attrs)
+        max_days = getattr(settings, "VITAL_ANALYTICS_MAX_DAYS", 366)
+        if attrs["end"] - attrs["start"] > timedelta(days=max_days):
+            raise serializers.ValidationError({"start": f"The window cannot span more than {max_days} days."})
+        return attrs
+
+
+class VitalAlertRuleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VitalAlertRule
+        fields = ['id', 'metric', 'comparison', 'threshold', 'is_active', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+    def validate(self, attrs):
+        metric = attrs.get('metric', getattr(self.instance, 'metric', None))
+        comparison = attrs.get('comparison', getattr(self.instance, 'comparison', None))
+        duplicates = VitalAlertRule.objects.filter(organization=self.context['organization'], metric=metric, comparison=comparison)
+        if self.instance is not None:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError(f"A rule for {metric} {comparison} a threshold already exists.")
+        return attrs
+
+
+class VitalAlertSerializer(serializers.ModelSerializer):
+    patient_id = serializers.UUIDField(source='patient.id', read_only=True)
+    patient_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = VitalAlert
+        fields = ['id', 'patient_id', 'patient_name', 'metric', 'comparison', 'threshold', 'value', 'recorded_at', 'status', 'created_at']
+
+    def get_patient_name(self, obj):
+        return f"{obj.patient.first_name} {obj.patient.last_name}"
+
+
+class VitalAlertQuerySerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=AlertStatus.choices, default=AlertStatus.OPEN)
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from shared.cache import CacheNamespaces, TenantCache
+from .models import Patient, PatientMedicalRecord, PatientDiagnosisDetails
+
+
+@receiver([post_save, post_delete], sender=Patient)
+def invalidate_patient_cache(sender, instance, **kwargs):
+    TenantCache.invalidate(instance.organization_id, CacheNamespaces.PATIENTS)
+
+
+@receiver([post_save, post_delete], sender=PatientMedicalRecord)
+def invalidate_medical_record_cache(sender, instance, **kwargs):
+    organization_id = Patient.objects.all_with_deleted().filter(pkid=instance.patient_id).values_list("organization_id", flat=True).first()
+    TenantCache.invalidate(organization_id, CacheNamespaces.MEDICAL_RECORDS)
+
+
+@receiver([post_save, post_delete], sender=PatientDiagnosisDetails)
+def invalidate_diagnosis_cache(sender, instance, **kwargs):
+    TenantCache.invalidate(instance.organization_id, CacheNamespaces.DIAGNOSES)
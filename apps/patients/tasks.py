@@ -0,0 +1,26 @@
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_vital_sign_rollups():
+    """
+    Periodically fold the vital signs written since the last run into the daily, weekly and
+    monthly rollups read by the trends endpoint.
+    """
+    from .patient_service import VitalSignRollupService
+    processed = VitalSignRollupService.refresh()
+    logger.info(f"Refreshed vital sign rollups from {processed} measurements")
+
+
+@shared_task
+def scan_vital_alerts():
+    """
+    Periodically evaluate the vital signs written since the last run against the
+    organizations' alert rules.
+    """
+    from .alert_service import VitalAlertScanService
+    scanned = VitalAlertScanService.scan()
+    logger.info(f"Scanned {scanned} vital signs for alerts")
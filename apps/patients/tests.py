@@ -1,3 +1,576 @@
-from django.test import TestCase
+from datetime import datetime, timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from apps.accounts.models import User
+from apps.caregivers.models import Caregiver
+from apps.caregivers.permissions import IsCaregiver
+from shared.testing import client_for, create_caregiver, create_diagnosis, create_organization, create_patient
+from .models import AlertStatus, Patient, PatientDiagnosisDetails, PatientDiagnosisSummary, PatientMedicalRecord, RollupPeriod, VitalAlert, VitalAlertRule, VitalSign, VitalSignRollup
+from .alert_service import VitalAlertScanService
+from .patient_service import PatientDiagnosisSearchService, PatientDiagnosisSummaryService, PatientDiagnosisVitalSignService, VitalSignRollupService
 
 # Create your tests here.
+
+class OrganizationContextQueryCountTests(TestCase):
+    """
+    Query-count regression tests for the patient views using OrganizationContextMixin.
+    The organization must be resolved once per request, whatever the number of get_organization() calls.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@qcount-patients.test", "Query Count Clinic", "QCC")
+        cls.caregiver = create_caregiver(cls.organization, "caregiver@qcount-patients.test")
+        cls.patient = create_patient(cls.organization, "patient@qcount-patients.test")
+        PatientMedicalRecord.objects.create(patient=cls.patient, blood_group="O+", genotype="AA")
+        cls.diagnosis = create_diagnosis(cls.patient, cls.caregiver, assessment="Fever", diagnoses="Malaria", medication="Artemether", notes="Rest")
+        PatientDiagnosisSummaryService.refresh_for_patient(cls.patient)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_registration_details(self):
+        client = client_for(self.organization.user_id)
+        with self.assertNumQueries(3):
+            response = client.get(f"/api/v1/patients/patient-registration-details/{self.patient.id}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_diagnosis_list(self):
+        client = client_for(self.organization.user_id)
+        with self.assertNumQueries(3):
+            response = client.get("/api/v1/patients/patients-diagnoses/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_diagnosis_history(self):
+        client = client_for(self.organization.user_id)
+        with self.assertNumQueries(5):
+            response = client.get(f"/api/v1/patients/patient-diagnoses-history/{self.patient.id}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_diagnosis_vital_sign_list_as_caregiver(self):
+        client = client_for(self.caregiver.user_id)
+        with self.assertNumQueries(4):
+            response = client.get("/api/v1/patients/patient-diagnoses-with-vital-sign/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_diagnosis_vital_sign_retrieve(self):
+        client = client_for(self.organization.user_id)
+        with self.assertNumQueries(3):
+            response = client.get(f"/api/v1/patients/patient-diagnoses-with-vital-sign/{self.diagnosis.id}/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_diagnosis_vital_sign_create_as_caregiver(self):
+        client = client_for(self.caregiver.user_id)
+        payload = {
+            "patient_id": str(self.patient.id), "assessment": "Cough", "diagnoses": "Flu",
+            "medication": "Rest", "health_care_center": "Main", "notes": "Fluids",
+        }
+        with self.assertNumQueries(12):
+            response = client.post("/api/v1/patients/patient-diagnoses-with-vital-sign/", payload, format="json")
+        self.assertEqual(response.status_code, 201)
+
+    def test_patient_profile_as_patient(self):
+        client = client_for(self.patient.user_id)
+        with self.assertNumQueries(2):
+            response = client.get(f"/api/v1/patients/patient-profile-view/{self.patient.id}/")
+        self.assertEqual(response.status_code, 200)
+
+
+class CachedDetailPermissionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@cache-permissions.test", "Cache Permission Clinic", "CPC")
+        cls.caregiver = create_caregiver(cls.organization, "caregiver@cache-permissions.test")
+        cls.patient = create_patient(cls.organization, "patient@cache-permissions.test")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_detail_still_checks_object_permissions(self):
+        url = f"/api/v1/patients/patient-registration-details/{self.patient.id}/"
+        self.assertEqual(client_for(self.organization.user_id).get(url).status_code, 200)
+
+        with mock.patch.object(IsCaregiver, "has_object_permission", return_value=False):
+            response = client_for(self.caregiver.user_id).get(url)
+        self.assertEqual(response.status_code, 403)
+
+        # Each user's own response is cached
+        client = client_for(self.caregiver.user_id)
+        client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(url).status_code, 200)
+
+
+class SoftDeleteManagerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@softdelete.test", "Soft Delete Clinic", "SDC")
+        for name in ("Alive", "Gone"):
+            create_patient(cls.organization, f"{name.lower()}@softdelete.test", first_name=name, last_name="Patient")
+
+    def test_deleted_rows_are_hidden_unless_asked_for(self):
+        gone = Patient.objects.get(first_name="Gone")
+        gone.delete()
+
+        self.assertEqual(list(Patient.objects.filter(organization=self.organization).values_list("first_name", flat=True)), ["Alive"])
+        self.assertFalse(self.organization.patient_set.filter(first_name="Gone").exists())
+        self.assertEqual(list(Patient.objects.dead().values_list("first_name", flat=True)), ["Gone"])
+        self.assertEqual(Patient.objects.all_with_deleted().filter(organization=self.organization).count(), 2)
+        # Accounts stay visible: their email remains taken
+        self.assertTrue(User.objects.filter(email="gone@softdelete.test").exists())
+
+        self.assertEqual(Patient.objects.restore(), 1)
+        self.assertEqual(Patient.objects.filter(organization=self.organization).count(), 2)
+
+
+class VitalSignTimeSeriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@vitals.test", "Vitals Clinic", "VTC")
+        cls.caregiver = create_caregiver(cls.organization, "caregiver@vitals.test")
+        cls.patient = create_patient(cls.organization, "patient@vitals.test")
+        # Mon 3 and Tue 4 March, Mon 10 March, Sat 5 April 2025
+        for day, pulse, blood_pressure in [(3, 60, "120/80"), (3, 80, "140/90"), (4, 70, None), (10, 90, "110/70"), (36, 100, "130/85")]:
+            cls.measure(datetime(2025, 3, 1, 10) + timedelta(days=day - 1), pulse, blood_pressure)
+
+    @classmethod
+    def measure(cls, recorded_at, pulse_rate, blood_pressure=None):
+        diagnosis = create_diagnosis(cls.patient, cls.caregiver)
+        return VitalSign.objects.create(
+            patient_diagnoses_details=diagnosis, recorded_at=timezone.make_aware(recorded_at),
+            pulse_rate=pulse_rate, blood_pressure=blood_pressure,
+        )
+
+    def later(self):
+        return timezone.now() + timedelta(minutes=5)
+
+    def rollups(self, period):
+        return {
+            str(start): (samples, pulse_min, pulse_max, pulse_mean, systolic_mean)
+            for start, samples, pulse_min, pulse_max, pulse_mean, systolic_mean in VitalSignRollup.objects.filter(patient=self.patient, period=period)
+            .order_by("period_start")
+            .values_list("period_start", "samples", "pulse_rate_min", "pulse_rate_max", "pulse_rate_mean", "systolic_mean")
+        }
+
+    def test_blood_pressure_is_split_and_the_patient_filled_in(self):
+        vital_sign = VitalSign.objects.get(pulse_rate=80)
+        self.assertEqual((vital_sign.patient_id, vital_sign.systolic, vital_sign.diastolic), (self.patient.pk, 140, 90))
+        self.assertEqual(VitalSign.objects.get(pulse_rate=70).systolic, None)
+        self.assertEqual(VitalSign.split_blood_pressure("12O/80"), (None, None))
+
+    def test_updating_a_diagnosis_restores_its_deleted_vital_sign(self):
+        vital_sign = VitalSign.objects.get(pulse_rate=70)
+        vital_sign.delete()
+        diagnosis = vital_sign.patient_diagnoses_details
+        PatientDiagnosisVitalSignService.update_diagnosis(diagnosis, {"notes": "Rechecked", "vital_sign": {"pulse_rate": 75}})
+        self.assertEqual(VitalSign.objects.get(patient_diagnoses_details=diagnosis).pulse_rate, 75)
+
+    def test_refresh_builds_day_week_and_month_rollups(self):
+        self.assertEqual(VitalSignRollupService.refresh(now=self.later()), 5)
+        self.assertEqual(self.rollups(RollupPeriod.DAY), {
+            "2025-03-03": (2, 60, 80, 70, 130), "2025-03-04": (1, 70, 70, 70, None),
+            "2025-03-10": (1, 90, 90, 90, 110), "2025-04-05": (1, 100, 100, 100, 130),
+        })
+        self.assertEqual(self.rollups(RollupPeriod.WEEK), {
+            "2025-03-03": (3, 60, 80, 70, 130), "2025-03-10": (1, 90, 90, 90, 110), "2025-03-31": (1, 100, 100, 100, 130),
+        })
+        self.assertEqual(self.rollups(RollupPeriod.MONTH), {"2025-03-01": (4, 60, 90, 75, 370 / 3), "2025-04-01": (1, 100, 100, 100, 130)})
+        self.assertEqual(VitalSignRollupService.refresh(now=self.later()), 0)
+
+    def test_refresh_only_recomputes_changed_buckets(self):
+        VitalSignRollupService.refresh(now=self.later())
+        VitalSign.objects.get(pulse_rate=90).delete()
+        self.measure(datetime(2025, 3, 4, 18), 50)
+
+        # Too recent: left for the next run
+        self.assertEqual(VitalSignRollupService.refresh(), 0)
+        self.assertEqual(VitalSignRollupService.refresh(now=self.later()), 2)
+        day = self.rollups(RollupPeriod.DAY)
+        self.assertEqual((day["2025-03-04"], "2025-03-10" in day), ((2, 50, 70, 60, None), False))
+        self.assertEqual(self.rollups(RollupPeriod.MONTH)["2025-03-01"], (4, 50, 80, 65, 130))
+        rebuilt = {period: self.rollups(period) for period in RollupPeriod.values}
+        VitalSignRollupService.rebuild(organization=self.organization)
+        self.assertEqual({period: self.rollups(period) for period in RollupPeriod.values}, rebuilt)
+
+    @override_settings(VITAL_TRENDS_MAX_POINTS=3)
+    def test_trends_downsample_to_the_finest_period_that_fits(self):
+        VitalSignRollupService.refresh(now=self.later())
+        client = client_for(self.caregiver.user_id)
+        url = f"/api/v1/patients/patient-vital-trends/{self.patient.id}/"
+
+        response = client.get(url, {"start": "2025-03-01T00:00:00+01:00", "end": "2025-03-05T00:00:00+01:00"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["data"]["resolution"], [point["pulse_rate"] for point in response.data["data"]["points"]]), ("raw", [60, 80, 70]))
+
+        # 5 measurements over 6 weeks: 37 days and 6 weeks are too many, 2 months fit
+        response = client.get(url, {"start": "2025-03-01T00:00:00+01:00", "end": "2025-04-10T00:00:00+01:00"})
+        self.assertEqual(response.data["data"]["resolution"], RollupPeriod.MONTH)
+        self.assertEqual([point["samples"] for point in response.data["data"]["points"]], [4, 1])
+
+        response = client.get(url, {"start": "2025-03-01T00:00:00+01:00", "end": "2025-04-10T00:00:00+01:00", "resolution": "raw"})
+        self.assertEqual((response.status_code, response.data["code"]), (400, "vital_trends_window_too_large"))
+
+
+class VitalSignAnalyticsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@analytics.test", "Analytics Clinic", "ANC")
+        cls.caregiver = create_caregiver(cls.organization, "caregiver@analytics.test")
+        cls.patients = []
+        for name, height in (("Gaining", 200), ("Steady", None)):
+            patient = create_patient(cls.organization, f"{name.lower()}@analytics.test", first_name=name, last_name="Patient")
+            PatientMedicalRecord.objects.create(patient=patient, height=height, weight=60)
+            cls.patients.append(patient)
+        # One measurement a week: +1 kg per week, a fever and a low SpO2 reading
+        start = timezone.make_aware(datetime(2025, 1, 6, 9))
+        for week, (temperature, oxygen, weight) in enumerate([(36.8, 98, 80), (38.5, 97, 81), (36.9, 93, None), (37.0, 99, 83)]):
+            cls.measure(cls.patients[0], start + timedelta(weeks=week), body_temperature=temperature, blood_oxygen=oxygen, weight=weight, pulse_rate=70 + week)
+        cls.measure(cls.patients[1], start, pulse_rate=120, blood_pressure="150/95")
+
+    @classmethod
+    def measure(cls, patient, recorded_at, **vital_signs):
+        diagnosis = create_diagnosis(patient, cls.caregiver)
+        VitalSign.objects.create(patient_diagnoses_details=diagnosis, recorded_at=recorded_at, **vital_signs)
+
+    def setUp(self):
+        self.client = client_for(self.organization.user_id)
+
+    def test_patient_analytics(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(f"/api/v1/patients/patient-vital-analytics/{self.patients[0].id}/", {"window": 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.data["data"]
+        self.assertEqual(data["samples"], 4)
+        self.assertEqual((data["rolling_mean"]["pulse_rate"], data["rolling_mean"]["weight"], data["rolling_mean"]["systolic"]), (72.5, 83, None))
+        self.assertEqual((data["weight_slope_per_week"], data["bmi"]), (1.0, 20.8))
+        self.assertEqual(data["out_of_range"], {"body_temperature": 1, "blood_oxygen": 1, "pulse_rate": 0})
+
+    def test_cohort_analytics(self):
+        response = self.client.get("/api/v1/patients/vital-analytics/", {"start": "2025-01-01T00:00:00Z", "end": "2025-03-01T00:00:00Z"})
+        self.assertEqual(response.status_code, 200)
+        summary = response.data["data"]["summary"]
+        self.assertEqual((summary["patients"], summary["samples"], summary["mean_weight_slope_per_week"]), (2, 5, 1.0))
+        self.assertEqual(summary["out_of_range"], {"body_temperature": 1, "blood_oxygen": 1, "pulse_rate": 1})
+        steady = next(row for row in response.data["data"]["patients"] if row["patient_id"] == self.patients[1].id)
+        # No weight measured and no height on record
+        self.assertEqual((steady["rolling_mean"]["systolic"], steady["weight_slope_per_week"], steady["bmi"]), (150, None, None))
+
+        response = self.client.get("/api/v1/patients/vital-analytics/", {"patient": [str(self.patients[1].id)], "end": "2025-01-01T00:00:00Z"})
+        self.assertEqual(response.data["data"]["summary"]["patients"], 0)
+
+    def test_cohort_analytics_window_is_bounded(self):
+        # The default window is the last VITAL_ANALYTICS_DEFAULT_DAYS days: no reading of 2025 in it
+        response = self.client.get("/api/v1/patients/vital-analytics/")
+        self.assertEqual((response.status_code, response.data["data"]["summary"]["samples"]), (200, 0))
+
+        response = self.client.get("/api/v1/patients/vital-analytics/", {"start": "2024-01-01T00:00:00Z", "end": "2025-03-01T00:00:00Z"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cohort_analytics_pages_through_the_patients(self):
+        window = {"start": "2025-01-01T00:00:00Z", "end": "2025-03-01T00:00:00Z", "page_size": 1}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/patients/vital-analytics/", window)
+        self.assertEqual(len(response.data["data"]["patients"]), 1)
+        self.assertIn("organization_id", next(query["sql"] for query in queries.captured_queries if "patients_vitalsign" in query["sql"]))
+        seen = [response.data["data"]["patients"][0]["patient_id"]]
+
+        response = self.client.get(response.data["data"]["next"])
+        self.assertEqual((response.data["data"]["summary"]["patients"], response.data["data"]["next"]), (1, None))
+        seen.append(response.data["data"]["patients"][0]["patient_id"])
+        self.assertCountEqual(seen, [patient.id for patient in self.patients])
+
+
+class VitalAlertScanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@alerts.test", "Alerts Clinic", "ALC")
+        cls.caregiver = create_caregiver(cls.organization, "caregiver@alerts.test")
+        cls.patients = []
+        for name in ("Hypoxic", "Febrile", "Healthy"):
+            cls.patients.append(create_patient(cls.organization, f"{name.lower()}@alerts.test", first_name=name, last_name="Patient"))
+
+    def measure(self, patient, hours_ago, **vital_signs):
+        diagnosis = create_diagnosis(patient, self.caregiver)
+        return VitalSign.objects.create(patient_diagnoses_details=diagnosis, recorded_at=timezone.now() - timedelta(hours=hours_ago), **vital_signs)
+
+    def scan(self):
+        return VitalAlertScanService.scan(now=timezone.now() + timedelta(minutes=5))
+
+    def alerts(self):
+        return sorted(VitalAlert.objects.values_list("patient__first_name", "metric", "status"))
+
+    def test_scan_raises_and_resolves_alerts_incrementally(self):
+        self.measure(self.patients[0], 3, blood_oxygen=90, body_temperature=37)
+        febrile = self.measure(self.patients[1], 2, body_temperature=39.2)
+        self.measure(self.patients[2], 1, blood_oxygen=98, body_temperature=36.8)
+        self.assertEqual(self.scan(), 3)
+        self.assertEqual(self.alerts(), [("Febrile", "body_temperature", AlertStatus.OPEN), ("Hypoxic", "blood_oxygen", AlertStatus.OPEN)])
+        self.assertEqual(self.scan(), 0)
+
+        # A newer normal reading resolves the alert, deleting the reading resolves its alert
+        self.measure(self.patients[0], 0, blood_oxygen=96)
+        febrile.delete()
+        self.assertEqual(self.scan(), 2)
+        self.assertEqual(self.alerts(), [("Febrile", "body_temperature", AlertStatus.RESOLVED), ("Hypoxic", "blood_oxygen", AlertStatus.RESOLVED)])
+
+    def test_restored_reading_reopens_its_alert(self):
+        reading = self.measure(self.patients[0], 1, blood_oxygen=88)
+        self.scan()
+        reading.delete()
+        self.scan()
+        self.assertEqual(self.alerts(), [("Hypoxic", "blood_oxygen", AlertStatus.RESOLVED)])
+
+        reading.restore()
+        self.assertEqual(self.scan(), 1)
+        self.assertEqual(self.alerts(), [("Hypoxic", "blood_oxygen", AlertStatus.OPEN)])
+
+    def test_backdated_reading_does_not_open_an_alert(self):
+        self.measure(self.patients[0], 1, blood_oxygen=97)
+        self.scan()
+        # Synced late: scanned after the newer normal reading, in a batch of its own
+        self.measure(self.patients[0], 7 * 24, blood_oxygen=85)
+        self.assertEqual(self.scan(), 1)
+        self.assertEqual(self.alerts(), [("Hypoxic", "blood_oxygen", AlertStatus.RESOLVED)])
+
+    def test_organization_rules_replace_the_defaults(self):
+        VitalAlertRule.objects.create(organization=self.organization, metric="pulse_rate", comparison="above", threshold=120)
+        VitalAlertRule.objects.create(organization=self.organization, metric="blood_oxygen", comparison="below", threshold=92, is_active=False)
+        self.measure(self.patients[0], 1, blood_oxygen=85, pulse_rate=130, body_temperature=39)
+        self.scan()
+        self.assertEqual(self.alerts(), [("Hypoxic", "pulse_rate", AlertStatus.OPEN)])
+
+    def test_alert_list_is_keyset_paginated(self):
+        for patient in self.patients:
+            self.measure(patient, 1, blood_oxygen=88)
+        self.scan()
+        client = client_for(self.caregiver.user_id)
+
+        # Caregiver, page and one lookahead row: no COUNT
+        with self.assertNumQueries(2):
+            response = client.get("/api/v1/patients/vital-alerts/", {"page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        first_page = response.data["results"]
+        self.assertEqual(len(first_page), 2)
+        response = client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(
+            {alert["patient_name"] for alert in first_page + response.data["results"]},
+            {"Hypoxic Patient", "Febrile Patient", "Healthy Patient"},
+        )
+        self.assertEqual(client.get("/api/v1/patients/vital-alerts/", {"status": "resolved"}).data["results"], [])
+
+
+class PatientDiagnosisBulkTests(TestCase):
+    url = "/api/v1/patients/patient-diagnoses-with-vital-sign/bulk/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@bulk-diagnoses.test", "Bulk Clinic", "BKC")
+        cls.caregiver = create_caregiver(cls.organization, "caregiver@bulk-diagnoses.test")
+        cls.patients = []
+        for name in ("First", "Second"):
+            cls.patients.append(create_patient(cls.organization, f"{name.lower()}@bulk-diagnoses.test", first_name=name, last_name="Patient"))
+
+    def item(self, patient, key, **extra):
+        return {
+            "patient_id": str(patient.id), "assessment": "Cough", "diagnoses": "Flu", "medication": "Rest",
+            "health_care_center": "Ward 3", "notes": "Synced", "idempotency_key": key, **extra,
+        }
+
+    def test_caregiver_batch_is_created_once(self):
+        items = [
+            self.item(self.patients[0], "tablet-1:1", vital_sign={"blood_pressure": "130/85", "pulse_rate": 80}, recorded_at="2025-05-01T08:00:00Z"),
+            self.item(self.patients[0], "tablet-1:2"),
+            self.item(self.patients[1], "tablet-1:3", vital_sign={"blood_oxygen": "97.5"}),
+        ]
+        client = client_for(self.caregiver.user_id)
+        # Caregiver, patients, existing keys, the two INSERTs, the summary refresh (lock, figures,
+        # upsert) and savepoints, whatever the number of items
+        with self.assertNumQueries(14):
+            response = client.post(self.url, items, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["data"]["created"], response.data["data"]["failed"]), (3, 0))
+        created = [result["id"] for result in response.data["data"]["results"]]
+
+        vital_sign = VitalSign.objects.get(patient_diagnoses_details__idempotency_key="tablet-1:1")
+        self.assertEqual((vital_sign.patient_id, vital_sign.systolic, vital_sign.diastolic), (self.patients[0].pk, 130, 85))
+        self.assertEqual(vital_sign.recorded_at.isoformat(), "2025-05-01T08:00:00+00:00")
+        self.assertEqual(PatientDiagnosisDetails.objects.get(idempotency_key="tablet-1:2").caregiver_id, self.caregiver.pk)
+        self.assertEqual(PatientDiagnosisSummary.objects.get(patient=self.patients[0]).diagnosis_count, 2)
+
+        # A retried sync replays the existing diagnoses
+        response = client.post(self.url, items, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(result["status"], result["id"]) for result in response.data["data"]["results"]], [("duplicate", pk) for pk in created])
+        self.assertEqual(PatientDiagnosisDetails.objects.filter(organization=self.organization).count(), 3)
+
+    def test_invalid_items(self):
+        stranger = create_patient(create_organization("other@bulk-diagnoses.test", "Other Clinic", "OTC"), "stranger@bulk-diagnoses.test", first_name="Stranger")
+        items = [
+            self.item(self.patients[0], "a", caregiver_id=str(self.caregiver.id)),
+            self.item(self.patients[0], "b"),
+            self.item(stranger, "c", caregiver_id=str(self.caregiver.id)),
+            self.item(self.patients[1], "a", caregiver_id=str(self.caregiver.id)),
+            {"patient_id": str(self.patients[1].id)},
+        ]
+        client = client_for(self.organization.user_id)
+        response = client.post(self.url, items, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PatientDiagnosisDetails.objects.filter(organization=self.organization).exists())
+
+        response = client.post(f"{self.url}?partial_success=true", items, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result["status"] for result in response.data["data"]["results"]], ["created"] + ["failed"] * 4)
+        self.assertEqual(set(response.data["data"]["results"][1]["errors"]), {"caregiver_id"})
+        self.assertEqual(set(response.data["data"]["results"][2]["errors"]), {"patient_id"})
+        self.assertEqual(set(response.data["data"]["results"][3]["errors"]), {"idempotency_key"})
+
+
+class PatientDiagnosisSummaryTests(TestCase):
+    url = "/api/v1/patients/patient-diagnoses-with-vital-sign/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@summary.test", "Summary Clinic", "SUC")
+        cls.caregiver = create_caregiver(cls.organization, "caregiver@summary.test")
+        cls.patient = create_patient(cls.organization, "patient@summary.test")
+
+    def setUp(self):
+        self.client = client_for(self.caregiver.user_id)
+
+    def create(self, diagnoses):
+        payload = {
+            "patient_id": str(self.patient.id), "assessment": "Cough", "diagnoses": diagnoses,
+            "medication": "Rest", "health_care_center": "Main", "notes": "Fluids",
+        }
+        response = self.client.post(self.url, payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        return PatientDiagnosisDetails.objects.get(diagnoses=diagnoses)
+
+    def summary(self):
+        summary = PatientDiagnosisSummary.objects.get(patient=self.patient)
+        return summary.diagnosis_count, summary.latest_diagnosis_id, summary.last_visit_at
+
+    def test_summary_follows_create_update_delete_and_restore(self):
+        first = self.create("Flu")
+        self.assertEqual(self.summary(), (1, first.pkid, first.created_at))
+        second = self.create("Bronchitis")
+        self.assertEqual(self.summary(), (2, second.pkid, second.created_at))
+
+        response = self.client.patch(f"{self.url}{first.id}/", {"notes": "Recovered"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.summary(), (2, second.pkid, second.created_at))
+
+        self.assertEqual(self.client.delete(f"{self.url}{second.id}/").status_code, 204)
+        self.assertEqual(self.summary(), (1, first.pkid, first.created_at))
+        first.delete()
+        self.assertEqual(self.summary(), (0, None, None))
+
+        PatientDiagnosisDetails.objects.all_with_deleted().get(pk=second.pk).restore()
+        self.assertEqual(self.summary(), (1, second.pkid, second.created_at))
+
+    def test_rebuild_matches_the_maintained_summary(self):
+        self.create("Flu")
+        self.create("Bronchitis").delete()
+        maintained = self.summary()
+        PatientDiagnosisSummary.objects.all().delete()
+        PatientDiagnosisSummaryService.rebuild(organization=self.organization)
+        self.assertEqual(self.summary(), maintained)
+
+
+class PatientDiagnosisListTests(TestCase):
+    url = "/api/v1/patients/patients-diagnoses/"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@latest.test", "Latest Clinic", "LTC")
+        caregiver = create_caregiver(cls.organization, "caregiver@latest.test")
+        cls.patients = [create_patient(cls.organization, f"patient{i}@latest.test", first_name=f"Patient{i}") for i in range(3)]
+        for patient, names in zip(cls.patients, [("Flu", "Malaria", "Typhoid"), ("Asthma", "Gone"), ()]):
+            for name in names:
+                create_diagnosis(patient, caregiver, diagnoses=name)
+        PatientDiagnosisDetails.objects.get(diagnoses="Gone").delete()
+
+        other = create_organization("other@latest.test", "Other Clinic", "OLC")
+        outsider = create_patient(other, "outsider@latest.test")
+        create_diagnosis(outsider, create_caregiver(other, "caregiver@other-latest.test"), diagnoses="Elsewhere")
+        PatientDiagnosisSummaryService.rebuild()
+
+    def test_lists_every_patient_once_with_only_the_latest_diagnosis(self):
+        client = client_for(self.organization.user_id)
+        # Organization, page of patients joined with their summary and latest diagnosis, count
+        with self.assertNumQueries(3):
+            response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        rows = {row["patient_name"]: (row["diagnoses"]["diagnoses"], row["diagnosis_count"]) for row in response.data["results"]["data"]}
+        # Soft-deleted diagnoses are neither shown nor counted, patients without any are left out
+        self.assertEqual(rows, {"Ient Patient0": ("Typhoid", 3), "Ient Patient1": ("Asthma", 1)})
+
+    def test_new_diagnosis_becomes_the_latest(self):
+        caregiver = Caregiver.objects.get(organization=self.organization)
+        client = client_for(caregiver.user_id)
+        payload = {
+            "patient_id": str(self.patients[2].id), "assessment": "Cough", "diagnoses": "Flu",
+            "medication": "Rest", "health_care_center": "Main", "notes": "Fluids",
+        }
+        self.assertEqual(client.post("/api/v1/patients/patient-diagnoses-with-vital-sign/", payload, format="json").status_code, 201)
+        rows = {row["patient_name"]: row["diagnoses"]["diagnoses"] for row in client.get(self.url).data["results"]["data"]}
+        self.assertEqual(rows["Ient Patient2"], "Flu")
+
+
+class PatientDiagnosisSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = create_organization("org@search-diagnoses.test", "Search Clinic", "SRC")
+        cls.caregiver = create_caregiver(cls.organization, "caregiver@search-diagnoses.test")
+        cls.patient = create_patient(cls.organization, "patient@search-diagnoses.test")
+        for diagnoses, medication, notes in [
+            ("Severe malaria", "Artemether", "Admitted"),
+            ("Typhoid fever", "Ciprofloxacin", "Malaria ruled out"),
+            ("Asthma", "Salbutamol", "Inhaler"),
+        ]:
+            create_diagnosis(cls.patient, cls.caregiver, diagnoses=diagnoses, medication=medication, notes=notes)
+        other = create_organization("other@search-diagnoses.test", "Other Search Clinic", "OSC")
+        create_diagnosis(create_patient(other, "outsider@search-diagnoses.test"), create_caregiver(other, "caregiver@other-search.test"), diagnoses="Malaria")
+
+    def search(self, term):
+        queryset = PatientDiagnosisDetails.objects.filter(organization=self.organization)
+        return list(PatientDiagnosisSearchService.search(queryset, term).order_by("-rank").values_list("diagnoses", flat=True))
+
+    def test_full_text_matches_are_ranked_by_field_weight(self):
+        # The diagnosis itself outranks a mention in the notes
+        self.assertEqual(self.search("malaria"), ["Severe malaria", "Typhoid fever"])
+
+    def test_misspellings_and_partial_words_fall_back_to_trigrams(self):
+        self.assertEqual(self.search("malria"), ["Severe malaria"])
+        self.assertEqual(self.search("salbut"), ["Asthma"])
+        self.assertEqual(self.search("xylophone"), [])
+
+    def test_search_filter_is_scoped_to_the_organization(self):
+        client = client_for(self.caregiver.user_id)
+        response = client.get("/api/v1/patients/patient-diagnoses-with-vital-sign/", {"search": "malaria"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["diagnoses"] for row in response.data["results"]], ["Severe malaria", "Typhoid fever"])
+
+        response = client.get(f"/api/v1/patients/patient-diagnoses-history/{self.patient.id}/", {"search": "artemeter"})
+        self.assertEqual([row["diagnoses"] for row in response.data["data"]["diagnoses"]], ["Severe malaria"])
+
+    def test_cursor_pagination_needs_an_explicit_ordering_with_search(self):
+        client = client_for(self.caregiver.user_id)
+        url = "/api/v1/patients/patient-diagnoses-with-vital-sign/"
+        response = client.get(url, {"search": "malaria", "pagination": "cursor"})
+        self.assertEqual(response.status_code, 400)
+
+        response = client.get(url, {"search": "malaria", "pagination": "cursor", "ordering": "created_at"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["diagnoses"] for row in response.data["results"]], ["Severe malaria", "Typhoid fever"])
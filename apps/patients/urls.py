@@ -2,13 +2,14 @@
 
 from django.urls import path,include
 from rest_framework.routers import DefaultRouter
-from .views import PatientRegistrationDetailsView,PatientDiagnosisListView,PatientDiagnosisHistoryView, PatientDiagnosisVitalSignViewSet,PatienProfileView
+from .views import PatientRegistrationDetailsView,PatientDiagnosisListView,PatientDiagnosisHistoryView, PatientDiagnosisVitalSignViewSet,PatienProfileView,PatientVitalTrendsView,PatientVitalAnalyticsView,VitalAnalyticsView,VitalAlertListView,VitalAlertRuleViewSet
 from rest_framework.routers import DefaultRouter
 
 
 
 router = DefaultRouter()
 router.register('patient-diagnoses-with-vital-sign', PatientDiagnosisVitalSignViewSet,basename='patient-diagnoses-with-vital-sign')
+router.register('vital-alert-rules', VitalAlertRuleViewSet,basename='vital-alert-rules')
 
 
 urlpatterns = [
@@ -17,6 +18,10 @@ urlpatterns = [
     path('patients-diagnoses/', PatientDiagnosisListView.as_view(), name='patient-diagnosis-list'),
     path('patient-diagnoses-history/<str:id>/', PatientDiagnosisHistoryView.as_view(), name='patient-diagnosis-history'),
     path('patient-profile-view/<str:id>/',PatienProfileView.as_view(), name='patient-profile-view'),
+    path('patient-vital-trends/<str:id>/', PatientVitalTrendsView.as_view(), name='patient-vital-trends'),
+    path('patient-vital-analytics/<str:id>/', PatientVitalAnalyticsView.as_view(), name='patient-vital-analytics'),
+    path('vital-analytics/', VitalAnalyticsView.as_view(), name='vital-analytics'),
+    path('vital-alerts/', VitalAlertListView.as_view(), name='vital-alerts'),
 ]
 
 
@@ -8,14 +8,25 @@ from apps.caregivers.models import Caregiver
 from apps.patients.exceptions import PatientNotFoundException
 from apps.patients.permission import IsPatient,IsPatientSelf
 from shared.mixins import OrganizationContextMixin
-from .models import Patient,PatientDiagnosisDetails
-from .serializers import PatientDetailSerializer,PatientDiagnosisSerializer,PatientDiagnosisWithVitalSignSerializer, PatientProfileSerializer
+from shared.text_choices import UserRoles
+from shared.cache import CachedResponseMixin, CacheNamespaces
+from shared.idempotency import IdempotentCreateMixin
+from .models import Patient,PatientDiagnosisDetails,VitalAlert,VitalAlertRule
+from .patient_service import PatientDiagnosisQueryService, PatientDiagnosisSearchService, VitalSignTrendService
+from .analytics_service import VitalSignAnalyticsService
+from shared.pagination import KeysetPagination
+from .serializers import PatientDetailSerializer,PatientDiagnosisSerializer,PatientDiagnosisWithVitalSignSerializer, PatientProfileSerializer, VitalSignTrendQuerySerializer, VitalSignAnalyticsQuerySerializer, VitalCohortAnalyticsQuerySerializer, VitalAlertRuleSerializer, VitalAlertSerializer, VitalAlertQuerySerializer, PatientDiagnosisBulkSerializer
 from rest_framework.response import Response
 from django.db.models import Prefetch   
 from django.db.models import Q
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import OrderingFilter
+from .filters import DiagnosisSearchFilter
 from rest_framework import status
 from rest_framework.validators import ValidationError
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from django.http import Http404
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -23,7 +34,7 @@ from rest_framework.parsers import MultiPartParser, FormParser
 # Create your views here.
 
 
-class PatientRegistrationDetailsView(OrganizationContextMixin,generics.RetrieveUpdateAPIView):
+class PatientRegistrationDetailsView(CachedResponseMixin,OrganizationContextMixin,generics.RetrieveUpdateAPIView):
     """
     Retrieve detailed information for a specific patient by id.
     Accessible to authenticated organization or caregiver users.
@@ -32,11 +43,13 @@ class PatientRegistrationDetailsView(OrganizationContextMixin,generics.RetrieveU
     serializer_class = PatientDetailSerializer
     permission_classes = [ IsAuthenticated & (IsOrganization | IsCaregiver)]
     lookup_field = 'id'
+    cache_ttl = 60 * 10
+    cache_dependencies = (CacheNamespaces.PATIENTS, CacheNamespaces.MEDICAL_RECORDS)
     # parser_classes = (MultiPartParser, FormParser)
 
     def get_queryset(self):
-        organization = self.get_organization()
-        return Patient.objects.filter(organization=organization,deleted_at__isnull=True).select_related('user').prefetch_related('patientmedicalrecord')
+        organization_id = self.get_organization_id()
+        return Patient.objects.filter(organization_id=organization_id).select_related('user').prefetch_related('patientmedicalrecord')
 
 
 class PatientDiagnosisListView(OrganizationContextMixin,generics.ListAPIView):
@@ -47,20 +60,8 @@ class PatientDiagnosisListView(OrganizationContextMixin,generics.ListAPIView):
     permission_classes = [ IsAuthenticated & (IsOrganization | IsCaregiver)]
 
     def get_queryset(self):
-        organization = self.get_organization()
-        return (
-            Patient.objects
-            .prefetch_related(
-                Prefetch(
-                    'diagnoses',
-                    queryset=PatientDiagnosisDetails.objects
-                    .select_related('caregiver')
-                    .order_by('-created_at')
-                )
-            )
-            .filter(diagnoses__isnull=False,organization=organization,deleted_at__isnull=True)
-            .distinct()
-        )
+        organization_id = self.get_organization_id()
+        return PatientDiagnosisQueryService.patients_with_latest_diagnosis(organization_id)
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -97,24 +98,28 @@ class PatientDiagnosisHistoryView(OrganizationContextMixin, generics.RetrieveAPI
     lookup_url_kwarg = "id"
 
     def get_queryset(self):
-        organization = self.get_organization()
-        return Patient.objects.filter(organization=organization)
+        organization_id = self.get_organization_id()
+        return Patient.objects.filter(organization_id=organization_id)
+
+    def get_object(self):
+        # Resolved by both get_serializer_context and retrieve
+        if not hasattr(self, "_patient"):
+            self._patient = super().get_object()
+        return self._patient
 
     def get_diagnoses_queryset(self, patient):
         qs = (
-            PatientDiagnosisDetails.objects.filter(patient=patient,deleted_at__isnull=True)
+            PatientDiagnosisDetails.objects.filter(patient=patient)
             .select_related("caregiver", "patient", "organization")
             .prefetch_related("vitalsign")
         )
 
-        # Apply search
-        search_query = self.request.GET.get("search")
+        # Ranked full-text search, ordered by rank unless ?ordering= is given
+        search_query = self.request.GET.get("search", "").strip()
         if search_query:
-            qs = qs.filter(
-                Q(assessment__icontains=search_query)
-                | Q(diagnoses__icontains=search_query)
-                | Q(medication__icontains=search_query)
-            )
+            qs = PatientDiagnosisSearchService.search(qs, search_query)
+            if "ordering" not in self.request.GET:
+                return qs.order_by("-rank", "-created_at")
 
         # Apply ordering (defaults to -created_at)
         ordering = self.request.GET.get("ordering", "-created_at")
@@ -139,9 +144,10 @@ class PatientDiagnosisHistoryView(OrganizationContextMixin, generics.RetrieveAPI
 
 
 
-class PatientDiagnosisVitalSignViewSet(OrganizationContextMixin, viewsets.ModelViewSet):
+class PatientDiagnosisVitalSignViewSet(IdempotentCreateMixin, OrganizationContextMixin, viewsets.ModelViewSet):
     """
-    Handles creation, update, retrieval of patient diagnoses with vital signs.
+    Handles creation, update, retrieval of patient diagnoses with vital signs. Creation honors
+    the `Idempotency-Key` header, so a retried request does not record the diagnosis twice.
     
     - Caregivers: create/update for their own patients; caregiver is auto-assigned.
     - Organization users: can select caregiver from organization.
@@ -150,12 +156,12 @@ class PatientDiagnosisVitalSignViewSet(OrganizationContextMixin, viewsets.ModelV
     serializer_class = PatientDiagnosisWithVitalSignSerializer
     permission_classes = [IsAuthenticated]
     lookup_field = 'id'
+    filter_backends = [DjangoFilterBackend, DiagnosisSearchFilter, OrderingFilter]
 
     def get_queryset(self):
-        organization = self.get_organization()
+        organization_id = self.get_organization_id()
         return PatientDiagnosisDetails.objects.filter(
-            organization=organization, 
-            deleted_at__isnull=True
+            organization_id=organization_id
         ).select_related(
             'patient', 'caregiver', 'organization'
         ).prefetch_related('vitalsign')
@@ -171,7 +177,7 @@ class PatientDiagnosisVitalSignViewSet(OrganizationContextMixin, viewsets.ModelV
         patient = get_object_or_404(Patient, id=patient_id, organization=organization)
 
         # Determine caregiver
-        if hasattr(self.request.user, 'caregiver'):
+        if self.request.user.role == UserRoles.CAREGIVER:
             caregiver = self.request.user.caregiver
         else:
             caregiver_id = serializer.validated_data.get('caregiver') or self.request.data.get('caregiver')
@@ -186,6 +192,32 @@ class PatientDiagnosisVitalSignViewSet(OrganizationContextMixin, viewsets.ModelV
             caregiver=caregiver
         )
 
+    @swagger_auto_schema(request_body=PatientDiagnosisBulkSerializer)
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsAuthenticated & (IsOrganization | IsCaregiver)])
+    def bulk(self, request, *args, **kwargs):
+        """
+        Create many diagnoses with their vital signs, from a JSON array of diagnoses or
+        {"diagnoses": [...], "partial_success": true}. Returns a result per item: created,
+        duplicate (idempotency key already used, with the existing id) or failed.
+        """
+        payload = {'diagnoses': request.data} if isinstance(request.data, list) else request.data
+        if isinstance(request.data, list) and 'partial_success' in request.query_params:
+            payload['partial_success'] = request.query_params['partial_success']
+
+        organization = self.get_organization()
+        caregiver = request.user.caregiver if request.user.role == UserRoles.CAREGIVER else None
+        serializer = PatientDiagnosisBulkSerializer(
+            data=payload,
+            context={'request': request, 'organization': organization, 'caregiver': caregiver},
+        )
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+        return Response({
+            "success": True,
+            "message": f"{result['created']} patient diagnoses created",
+            "data": result,
+        }, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
     def create(self, request, *args, **kwargs):
         organization = self.get_organization()
         serializer = self.get_serializer(
@@ -213,7 +245,7 @@ class PatientDiagnosisVitalSignViewSet(OrganizationContextMixin, viewsets.ModelV
         serializer.is_valid(raise_exception=True)
 
         # Determine caregiver for update
-        if hasattr(self.request.user, 'caregiver'):
+        if self.request.user.role == UserRoles.CAREGIVER:
             caregiver = self.request.user.caregiver
         else:
             caregiver_id = request.data.get('caregiver')
@@ -250,8 +282,8 @@ class PatienProfileView(OrganizationContextMixin, generics.RetrieveUpdateAPIView
     parser_classes = (MultiPartParser, FormParser)
 
     def get_queryset(self):
-        organization = self.get_organization()
-        return Patient.objects.filter(organization=organization)
+        organization_id = self.get_organization_id()
+        return Patient.objects.filter(organization_id=organization_id)
 
     def get_object(self):
         try:
@@ -260,3 +292,161 @@ class PatienProfileView(OrganizationContextMixin, generics.RetrieveUpdateAPIView
             raise PatientNotFoundException()
 
 
+class PatientVitalTrendsView(OrganizationContextMixin, generics.GenericAPIView):
+    """
+    Vital signs of a patient over a time window, raw or downsampled to day / week / month
+    rollups so that any window is answered with a bounded number of points.
+    Query parameters: start, end (ISO 8601) and resolution (auto, raw, day, week or month).
+    """
+    serializer_class = VitalSignTrendQuerySerializer
+    permission_classes = [IsAuthenticated & (IsOrganization | IsCaregiver)]
+    lookup_field = "id"
+
+    def get_queryset(self):
+        organization_id = self.get_organization_id()
+        return Patient.objects.filter(organization_id=organization_id)
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            raise PatientNotFoundException()
+
+    @swagger_auto_schema(query_serializer=VitalSignTrendQuerySerializer)
+    def get(self, request, *args, **kwargs):
+        patient = self.get_object()
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        resolution, points = VitalSignTrendService.trends(patient, **query.validated_data)
+        return Response({
+            "success": True,
+            "message": "Patient vital sign trends retrieved successfully",
+            "data": {
+                "patient_id": patient.id,
+                "resolution": resolution,
+                "start": query.validated_data["start"],
+                "end": query.validated_data["end"],
+                "points": points,
+            },
+        })
+
+
+class PatientVitalAnalyticsView(OrganizationContextMixin, generics.GenericAPIView):
+    """
+    Trend analytics over the vital sign history of a patient: rolling means, weight slope,
+    BMI and out-of-range reading counts.
+    Query parameters: start, end (ISO 8601) and window (rolling mean size, in measurements).
+    """
+    serializer_class = VitalSignAnalyticsQuerySerializer
+    permission_classes = [IsAuthenticated & (IsOrganization | IsCaregiver)]
+    lookup_field = "id"
+
+    def get_queryset(self):
+        organization_id = self.get_organization_id()
+        return Patient.objects.filter(organization_id=organization_id)
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            raise PatientNotFoundException()
+
+    @swagger_auto_schema(query_serializer=VitalSignAnalyticsQuerySerializer)
+    def get(self, request, *args, **kwargs):
+        patient = self.get_object()
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        vital_signs = VitalSignAnalyticsService.vital_signs(
+            patient.organization_id, [patient.pk], query.validated_data.get("start"), query.validated_data.get("end")
+        )
+        analytics = VitalSignAnalyticsService.analyze(vital_signs, query.validated_data.get("window")).get(patient.pk)
+        return Response({
+            "success": True,
+            "message": "Patient vital sign analytics retrieved successfully",
+            "data": {"patient_id": patient.id, **(analytics or {"samples": 0})},
+        })
+
+
+class VitalAnalyticsView(OrganizationContextMixin, generics.GenericAPIView):
+    """
+    Vital sign analytics of a cohort: the patients of the organization, or the ones given as
+    `patient` query parameters, a keyset page of patients at a time over a [start, end) window
+    of at most VITAL_ANALYTICS_MAX_DAYS days. The summary covers the patients of the page.
+    """
+    serializer_class = VitalCohortAnalyticsQuerySerializer
+    permission_classes = [IsAuthenticated & (IsOrganization | IsCaregiver)]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        organization_id = self.get_organization_id()
+        return Patient.objects.filter(organization_id=organization_id).only("pkid", "id", "created_at")
+
+    @swagger_auto_schema(query_serializer=VitalCohortAnalyticsQuerySerializer)
+    def get(self, request, *args, **kwargs):
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        patients = self.get_queryset()
+        if query.validated_data.get("patient"):
+            patients = patients.filter(id__in=query.validated_data["patient"])
+        patient_ids = {patient.pkid: patient.id for patient in self.paginate_queryset(patients)}
+
+        vital_signs = VitalSignAnalyticsService.vital_signs(
+            self.get_organization_id(), list(patient_ids), query.validated_data["start"], query.validated_data["end"]
+        )
+        analytics = VitalSignAnalyticsService.analyze(vital_signs, query.validated_data.get("window"))
+        page = self.paginator.get_paginated_response(
+            [{"patient_id": patient_ids[pkid], **result} for pkid, result in analytics.items()]
+        ).data
+        return Response({
+            "success": True,
+            "message": "Vital sign analytics retrieved successfully",
+            "data": {
+                "summary": VitalSignAnalyticsService.cohort_summary(list(analytics.values())),
+                "next": page["next"],
+                "previous": page["previous"],
+                "patients": page["results"],
+            },
+        })
+
+
+class VitalAlertListView(OrganizationContextMixin, generics.ListAPIView):
+    """
+    Alerts raised by the vital sign scanner for the organization, newest first. Open alerts
+    (the default, `?status=resolved` for the others) are the patients whose latest reading of
+    a metric breaks a rule. Keyset paginated: every page is one index range scan.
+    """
+    serializer_class = VitalAlertSerializer
+    permission_classes = [IsAuthenticated & (IsOrganization | IsCaregiver)]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        query = VitalAlertQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        organization_id = self.get_organization_id()
+        return (
+            VitalAlert.objects.filter(organization_id=organization_id, status=query.validated_data["status"])
+            .select_related("patient")
+            .order_by("-created_at")
+        )
+
+
+class VitalAlertRuleViewSet(OrganizationContextMixin, viewsets.ModelViewSet):
+    """
+    Alert thresholds of the organization. Until it creates its own rules, the scanner uses
+    VITAL_ALERT_DEFAULT_RULES; deactivate rules with `is_active` rather than deleting them all.
+    """
+    serializer_class = VitalAlertRuleSerializer
+    permission_classes = [IsAuthenticated & IsOrganization]
+    lookup_field = "id"
+
+    def get_queryset(self):
+        organization_id = self.get_organization_id()
+        return VitalAlertRule.objects.filter(organization_id=organization_id)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["organization"] = self.get_organization()
+        return context
+
+    def perform_create(self, serializer):
+        serializer.save(organization=self.get_organization())
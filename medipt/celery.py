@@ -2,6 +2,7 @@ from __future__ import absolute_import, unicode_literals
 import os
 import ssl
 from celery import Celery
+from celery.signals import worker_process_shutdown
 from django.conf import settings
 from urllib.parse import urlparse
 
@@ -32,6 +33,12 @@ if urlparse(broker_url).scheme == 'rediss':
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
+@worker_process_shutdown.connect
+def close_pooled_email_connections(**kwargs):
+    from shared.email_backends import PooledSMTPEmailBackend
+    PooledSMTPEmailBackend.close_pool()
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
@@ -26,6 +26,7 @@ DJANGO_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 ]
 
 LOCAL_APPS = [
@@ -106,17 +107,25 @@ TEMPLATES = [
 WSGI_APPLICATION = 'medipt.wsgi.application'
 
 # Cache Configuration
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-#         "LOCATION": env("REDIS_URL", default="redis://127.0.0.1:6379/1"),
-#         "OPTIONS": {
-#             "CLIENT_CLASS": "django_redis.client.DefaultClient",
-#         },
-#         "KEY_PREFIX": "medipt_cache",
-#         "TIMEOUT": 300,  # 5 minutes default
-#     }
-# }
+# Set USE_LOCMEM_CACHE=True to run against an in-process cache (tests, local development without redis)
+if env.bool("USE_LOCMEM_CACHE", default=False):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "medipt-cache",
+            "KEY_PREFIX": "medipt_cache",
+            "TIMEOUT": 300,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": env("CACHE_REDIS_URL", default=env("REDIS_URL", default="redis://127.0.0.1:6379/1")),
+            "KEY_PREFIX": "medipt_cache",
+            "TIMEOUT": 300,  # 5 minutes default
+        }
+    }
 
 
 
@@ -169,6 +178,23 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Background export files: private, only served through the authenticated download endpoint
+EXPORT_FILES_ROOT = env("EXPORT_FILES_ROOT", default=str(BASE_DIR / "exports"))
+EXPORT_FILE_RETENTION_HOURS = 24
+EXPORT_JOB_REUSE_MINUTES = 15
+EXPORT_JOB_STALE_MINUTES = 10
+
+# Email delivery: SMTP connections are reused across messages within a worker
+EMAIL_BACKEND = env("EMAIL_BACKEND", default="shared.email_backends.PooledSMTPEmailBackend")
+EMAIL_POOL_MAX_MESSAGES = 100
+EMAIL_POOL_IDLE_TIMEOUT = 60
+EMAIL_POOL_NOOP_AFTER = 5
+EMAIL_BATCH_SIZE = 100
+
+# Bulk patient registration
+BULK_PATIENT_REGISTRATION_MAX_ROWS = 100
+PASSWORD_HASHING_WORKERS = env.int("PASSWORD_HASHING_WORKERS", default=0) or None
+
 SITE_ID = 1
 
 # Default primary key field type
@@ -181,13 +207,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.accounts.authentication.ClaimsJWTAuthentication",
         "rest_framework.authentication.SessionAuthentication",
     ],
     # "DEFAULT_PERMISSION_CLASSES": [
     #     "rest_framework.permissions.IsAuthenticated",
     # ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "shared.pagination.OptionalKeysetPagination",
     "PAGE_SIZE": 20,
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
@@ -245,6 +271,32 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+CELERY_BEAT_SCHEDULE = {
+    "reconcile-organization-stats": {
+        "task": "apps.organizations.tasks.reconcile_organization_stats",
+        "schedule": timedelta(hours=1),
+    },
+    "purge-expired-organization-exports": {
+        "task": "apps.organizations.tasks.purge_expired_organization_exports",
+        "schedule": timedelta(hours=1),
+    },
+    "expire-caregiver-invitations": {
+        "task": "apps.invites.tasks.expire_caregiver_invitations",
+        "schedule": timedelta(minutes=15),
+    },
+    "refresh-vital-sign-rollups": {
+        "task": "apps.patients.tasks.refresh_vital_sign_rollups",
+        "schedule": timedelta(minutes=5),
+    },
+    "scan-vital-alerts": {
+        "task": "apps.patients.tasks.scan_vital_alerts",
+        "schedule": timedelta(minutes=1),
+    },
+    "purge-idempotency-records": {
+        "task": "apps.accounts.tasks.purge_idempotency_records",
+        "schedule": timedelta(hours=1),
+    },
+}
 
 
 # Logging Configuration
@@ -305,4 +357,34 @@ DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
 
 AUTH_USER_MODEL = 'accounts.User'
 
-INVITATION_EXPIRY_DAYS = 7
\ No newline at end of file
+# Tests run against a local in-memory cache, whatever CACHES the environment selects
+TEST_RUNNER = "shared.testing.LocMemCacheTestRunner"
+
+INVITATION_EXPIRY_DAYS = 7
+MAX_INVITATION_RESENDS = 3
+BULK_CAREGIVER_INVITATION_MAX_ROWS = 500
+BULK_DIAGNOSIS_MAX_ROWS = 200
+
+VITAL_SIGN_ROLLUP_BATCH_SIZE = 5000
+VITAL_SIGN_ROLLUP_SETTLE_SECONDS = 60
+VITAL_TRENDS_MAX_POINTS = 500
+VITAL_TRENDS_DEFAULT_DAYS = 90
+VITAL_ANALYTICS_ROLLING_WINDOW = 7
+VITAL_ANALYTICS_DEFAULT_DAYS = 90
+VITAL_ANALYTICS_MAX_DAYS = 366
+VITAL_SIGN_NORMAL_RANGES = {
+    "body_temperature": (36.1, 37.8),
+    "blood_oxygen": (95.0, 100.0),
+    "pulse_rate": (60.0, 100.0),
+}
+VITAL_ALERT_SCAN_BATCH_SIZE = 5000
+VITAL_ALERT_SCAN_SETTLE_SECONDS = 60
+# (metric, "below" | "above", threshold) for organizations without rules of their own
+VITAL_ALERT_DEFAULT_RULES = [
+    ("blood_oxygen", "below", 92),
+    ("body_temperature", "above", 38.5),
+]
+
+# Responses of writes sent with an Idempotency-Key header are replayed for this long
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_LOCK_SECONDS = 30
@@ -8,8 +8,11 @@ class SoftDeleteAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         # Show all objects (including soft-deleted) in admin
-        qs = super().get_queryset(request)
-        return qs.all_with_deleted()  # requires SoftDeleteManager.all_with_deleted()
+        qs = self.model._default_manager.all_with_deleted()  # requires SoftDeleteManager.all_with_deleted()
+        ordering = self.get_ordering(request)
+        if ordering:
+            qs = qs.order_by(*ordering)
+        return qs
 
     # Soft delete selected
     def soft_delete_selected(self, request, queryset):
@@ -1,11 +1,15 @@
+import logging
+import smtplib
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.core.mail import EmailMessage
+from shared.email_rendering import EmailTemplateRenderer
+from django.core.mail import EmailMessage, get_connection
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from apps.organizations.models import Organization, User
 
+logger = logging.getLogger(__name__)
+
 
 class BaseEmailService:
     """
@@ -15,8 +19,26 @@ class BaseEmailService:
 
     @staticmethod
     def send_email(subject: str, template: str, context: dict, recipient_list: list):
-        html_message = render_to_string(template, context)
+        email = BaseEmailService.build_email(subject, template, context, recipient_list)
+        email.send(fail_silently=False)
+
+    @staticmethod
+    def build_email(subject: str, template: str, context: dict, recipient_list: list):
+        html_message = EmailTemplateRenderer.render(template, context)
+        return BaseEmailService.build_html_message(subject, html_message, recipient_list)
+
+    @staticmethod
+    def build_emails(template: str, items: list):
+        """Build one message per (subject, context, recipient_list) item, rendered as one batch."""
+        items = list(items)
+        bodies = EmailTemplateRenderer.render_many(template, [context for _, context, _ in items])
+        return [
+            BaseEmailService.build_html_message(subject, html_message, recipient_list)
+            for (subject, _, recipient_list), html_message in zip(items, bodies)
+        ]
 
+    @staticmethod
+    def build_html_message(subject: str, html_message: str, recipient_list: list):
         email = EmailMessage(
             subject=subject,
             body=html_message,
@@ -24,4 +46,91 @@ class BaseEmailService:
             to=recipient_list,
         )
         email.content_subtype = "html"
-        email.send(fail_silently=False)
\ No newline at end of file
+        return email
+
+    @staticmethod
+    def deliver(messages):
+        """
+        Send messages one by one over a single (pooled) connection, so that a failure only
+        concerns its own message. Returns the failures as (message, exception) pairs. When the
+        connection cannot be opened at all, every message fails with a (transient) ConnectionError.
+        """
+        failures = []
+        connection = get_connection(fail_silently=False)
+        try:
+            try:
+                connection.open()
+            except (smtplib.SMTPException, OSError) as e:
+                # Server down, TLS or login refused: nothing was sent, whatever the SMTP code
+                logger.warning(f"Could not open the email connection: {e}")
+                error = ConnectionError(f"Could not open the email connection: {e}")
+                return [(message, error) for message in messages]
+            for message in messages:
+                try:
+                    connection.send_messages([message])
+                except (smtplib.SMTPException, OSError) as e:
+                    failures.append((message, e))
+        finally:
+            try:
+                connection.close()
+            except (smtplib.SMTPException, OSError) as e:
+                logger.warning(f"Failed to close the email connection: {e}")
+        return failures
+
+    @staticmethod
+    def queue_messages(messages, countdown=None):
+        """
+        Hand messages to the `send_email_batch` task in batches of EMAIL_BATCH_SIZE.
+        Only JSON-serializable parts are kept (no attachments). Bulk senders build the messages
+        with `build_emails`, so a queued batch was rendered with `render_many`.
+        """
+        from apps.accounts.tasks import send_email_batch
+
+        payload = [BaseEmailService.serialize_message(message) for message in messages]
+        batch_size = getattr(settings, "EMAIL_BATCH_SIZE", 100)
+        for start in range(0, len(payload), batch_size):
+            send_email_batch.apply_async(args=[payload[start:start + batch_size]], countdown=countdown)
+
+    @staticmethod
+    def requeue_failures(failures, countdown=60):
+        """Queue the transient failures of `deliver` for a later attempt; log the permanent ones."""
+        retryable = []
+        for message, error in failures:
+            if BaseEmailService.is_permanent_failure(error):
+                logger.error(f"Email to {', '.join(message.to)} rejected permanently: {error}")
+            else:
+                retryable.append(message)
+        if retryable:
+            BaseEmailService.queue_messages(retryable, countdown=countdown)
+        return retryable
+
+    @staticmethod
+    def is_permanent_failure(error):
+        """5xx replies (unknown mailbox, rejected sender, ...) will not succeed on a retry."""
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return all(code >= 500 for code, _ in error.recipients.values())
+        if isinstance(error, smtplib.SMTPResponseException):
+            return error.smtp_code >= 500
+        return False
+
+    @staticmethod
+    def serialize_message(message):
+        return {
+            "subject": message.subject,
+            "body": message.body,
+            "from_email": message.from_email,
+            "to": list(message.to),
+            "cc": list(message.cc),
+            "bcc": list(message.bcc),
+            "reply_to": list(message.reply_to),
+            "headers": dict(message.extra_headers),
+            "content_subtype": message.content_subtype,
+        }
+
+    @staticmethod
+    def deserialize_message(data):
+        data = dict(data)
+        content_subtype = data.pop("content_subtype", "plain")
+        message = EmailMessage(**data)
+        message.content_subtype = content_subtype
+        return message
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+class CacheNamespaces:
+    """
+    Groups of cached data that are invalidated together, per organization.
+    """
+    ORGANIZATION = "organization"
+    PATIENTS = "patients"
+    CAREGIVERS = "caregivers"
+    MEDICAL_RECORDS = "medical_records"
+    DIAGNOSES = "diagnoses"
+
+
+class TenantCache:
+    """
+    Versioned, organization scoped response cache.
+
+    Every (organization, namespace) pair has a version counter. Cache keys embed the current
+    versions of the namespaces a view depends on, so invalidating a namespace is a single
+    increment: entries stored under the old version are never read again and expire on their TTL.
+    """
+
+    @staticmethod
+    def version_key(organization_id, namespace):
+        return f"tenant:{organization_id}:{namespace}:version"
+
+    @staticmethod
+    def get_versions(organization_id, namespaces):
+        keys = [TenantCache.version_key(organization_id, namespace) for namespace in namespaces]
+        versions = cache.get_many(keys)
+        return [versions.get(key, 0) for key in keys]
+
+    @staticmethod
+    def invalidate(organization_id, *namespaces):
+        """
+        Bump the versions of the given namespaces once the surrounding transaction commits, so a
+        concurrent reader cannot cache pre-commit data under the new version.
+        """
+        if organization_id is None:
+            return
+        transaction.on_commit(lambda: TenantCache._bump(organization_id, namespaces))
+
+    @staticmethod
+    def _bump(organization_id, namespaces):
+        for namespace in namespaces:
+            key = TenantCache.version_key(organization_id, namespace)
+            try:
+                # Versions must outlive every entry built on them, hence no expiry
+                if not cache.add(key, 1, timeout=None):
+                    cache.incr(key)
+            except Exception as e:
+                logger.error(f"Failed to invalidate cache namespace {namespace} for organization {organization_id}: {str(e)}")
+
+
+class CachedResponseMixin:
+    """
+    Caches successful GET responses per organization, view, permission scope, URL kwargs and
+    query params.
+
+    Views declare `cache_ttl` (seconds) and `cache_dependencies`, the CacheNamespaces whose
+    invalidation must evict their responses. Requires `get_organization_id` (OrganizationContextMixin).
+    Cache failures never fail the request; the view is simply served from the database.
+    """
+    cache_ttl = 60
+    cache_dependencies = ()
+
+    def get_cache_scope(self, request):
+        """
+        View-level permissions have already passed when `get` runs, so list responses are shared
+        by the organization. Object permissions only run while the view builds its response, so a
+        detail response (looked up from the URL) is cached per user and never served to a user
+        whose object permission check was not run.
+        """
+        if (self.lookup_url_kwarg or self.lookup_field) in self.kwargs:
+            return f"user.{request.user.pk}"
+        return "organization"
+
+    def get_cache_key(self, request, organization_id):
+        versions = TenantCache.get_versions(organization_id, self.cache_dependencies)
+        params = sorted((key, request.query_params.getlist(key)) for key in request.query_params)
+        fingerprint = hashlib.md5(repr((sorted(self.kwargs.items()), params)).encode()).hexdigest()
+        version = ".".join(str(v) for v in versions)
+        scope = self.get_cache_scope(request)
+        return f"response:{organization_id}:{self.__class__.__name__}:{scope}:{version}:{fingerprint}"
+
+    def get(self, request, *args, **kwargs):
+        organization_id = self.get_organization_id()
+        try:
+            key = self.get_cache_key(request, organization_id)
+            cached = cache.get(key)
+        except Exception as e:
+            logger.error(f"Response cache unavailable for {self.__class__.__name__}: {str(e)}")
+            return super().get(request, *args, **kwargs)
+
+        if cached is not None:
+            return Response(cached, status=status.HTTP_200_OK)
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            try:
+                cache.set(key, response.data, timeout=self.cache_ttl)
+            except Exception as e:
+                logger.error(f"Failed to cache response for {self.__class__.__name__}: {str(e)}")
+        return response
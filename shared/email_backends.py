@@ -0,0 +1,169 @@
+import logging
+import os
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail.backends.locmem import EmailBackend as LocMemEmailBackend
+from django.core.mail.backends.smtp import EmailBackend as SMTPEmailBackend
+
+logger = logging.getLogger(__name__)
+
+_pool = threading.local()
+
+
+class PooledSMTPEmailBackend(SMTPEmailBackend):
+    """
+    SMTP backend that keeps its connection open between `send_messages()` calls, so a worker
+    sending many emails pays the TCP/TLS handshake and login once instead of per email.
+
+    One connection is pooled per thread (and per process: forked children never reuse the
+    parent's socket) and per server/credentials. A pooled connection is checked with NOOP after
+    EMAIL_POOL_NOOP_AFTER seconds of idleness, dropped after EMAIL_POOL_IDLE_TIMEOUT seconds, and
+    replaced after EMAIL_POOL_MAX_MESSAGES messages since providers cap messages per session.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._broken = False
+
+    @property
+    def pool_key(self):
+        return (os.getpid(), self.host, self.port, self.username, self.use_tls, self.use_ssl)
+
+    @staticmethod
+    def _connections():
+        if not hasattr(_pool, "connections"):
+            _pool.connections = {}
+        return _pool.connections
+
+    def open(self):
+        if self.connection:
+            return False
+        pooled = self._checkout()
+        if pooled is not None:
+            self.connection = pooled
+            # Reported as new so that send_messages() hands it back through close()
+            return True
+        try:
+            return super().open()
+        except (smtplib.SMTPException, OSError):
+            # A half-open session (e.g. login refused) must not be handed to the pool by close()
+            self._broken = True
+            raise
+
+    def close(self):
+        if self.connection is None:
+            return
+        if self._broken or self._exhausted():
+            self._forget(self.connection)
+            self._broken = False
+            super().close()
+            return
+        self._connections()[self.pool_key] = (self.connection, time.monotonic())
+        self.connection = None
+
+    def _send(self, email_message):
+        if self.connection is not None and (self._broken or self._exhausted()):
+            # Replace the session mid-batch rather than failing every remaining message
+            super().close()
+            self._broken = False
+            super().open()
+        try:
+            sent = super()._send(email_message)
+        except smtplib.SMTPServerDisconnected:
+            self._broken = True
+            raise
+        except smtplib.SMTPException:
+            # Refused recipient, sender or data: the session itself is still usable
+            raise
+        except OSError:
+            self._broken = True
+            raise
+        if not sent and email_message.recipients():
+            # A failure swallowed by fail_silently: do not trust the connection any more
+            self._broken = True
+        elif sent and self.connection is not None:
+            self.connection._pooled_messages_sent = self._sent_on(self.connection) + 1
+        return sent
+
+    def _exhausted(self):
+        return self._sent_on(self.connection) >= getattr(settings, "EMAIL_POOL_MAX_MESSAGES", 100)
+
+    def _checkout(self):
+        entry = self._connections().pop(self.pool_key, None)
+        if entry is None:
+            return None
+        connection, released_at = entry
+        idle = time.monotonic() - released_at
+        if idle > getattr(settings, "EMAIL_POOL_IDLE_TIMEOUT", 60):
+            self._quit(connection)
+            return None
+        if idle > getattr(settings, "EMAIL_POOL_NOOP_AFTER", 5):
+            try:
+                if connection.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP refused")
+            except (smtplib.SMTPException, OSError):
+                self._quit(connection)
+                return None
+        return connection
+
+    def _forget(self, connection):
+        entry = self._connections().get(self.pool_key)
+        if entry is not None and entry[0] is connection:
+            del self._connections()[self.pool_key]
+
+    @staticmethod
+    def _sent_on(connection):
+        return getattr(connection, "_pooled_messages_sent", 0)
+
+    @staticmethod
+    def _quit(connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                connection.close()
+            except OSError:
+                pass
+
+    @classmethod
+    def close_pool(cls):
+        """Close every connection pooled by the current thread (e.g. on worker shutdown)."""
+        connections = cls._connections()
+        while connections:
+            _, (connection, _) = connections.popitem()
+            cls._quit(connection)
+
+
+class InMemoryEmailBackend(LocMemEmailBackend):
+    """
+    Test stand-in for PooledSMTPEmailBackend: stores messages in `django.core.mail.outbox` like
+    the locmem backend and counts the connections opened. Recipients listed in
+    `failing_recipients` (address -> SMTP code, e.g. 450 transient or 550 permanent) are refused,
+    to exercise per-message retries.
+    """
+    connections_opened = 0
+    failing_recipients = {}
+
+    def open(self):
+        InMemoryEmailBackend.connections_opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            refused = {
+                recipient: (self.failing_recipients[recipient], b"Mailbox unavailable")
+                for recipient in message.recipients() if recipient in self.failing_recipients
+            }
+            if refused:
+                if self.fail_silently:
+                    return 0
+                raise smtplib.SMTPRecipientsRefused(refused)
+        return super().send_messages(messages)
+
+    @classmethod
+    def reset(cls):
+        cls.connections_opened = 0
+        cls.failing_recipients = {}
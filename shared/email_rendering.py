@@ -0,0 +1,48 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.utils.autoreload import file_changed
+from django.template import Context, Engine
+
+TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
+
+class EmailTemplateRenderer:
+    """
+    Renders email templates through a dedicated template engine, separate from the one serving
+    pages: no context processors, no debug bookkeeping, and a cached loader, so every template is
+    read and compiled once per process. Under runserver, edited templates are reloaded.
+    `render_many` renders a batch of emails of one template.
+    """
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_engine():
+        dirs = [directory for template in settings.TEMPLATES for directory in template.get("DIRS", [])]
+        return Engine(dirs=dirs, loaders=[("django.template.loaders.cached.Loader", TEMPLATE_LOADERS)], autoescape=True, debug=False)
+
+    @staticmethod
+    def get_template(template_name):
+        return EmailTemplateRenderer.get_engine().get_template(template_name)
+
+    @staticmethod
+    def render(template_name, context):
+        return EmailTemplateRenderer.get_template(template_name).render(Context(context))
+
+    @staticmethod
+    def render_many(template_name, contexts):
+        """Render the template for every context, in order, looking the compiled template up once."""
+        template = EmailTemplateRenderer.get_template(template_name)
+        return [template.render(Context(context)) for context in contexts]
+
+
+@receiver(file_changed, dispatch_uid="reset_email_template_cache")
+def reset_email_template_cache(sender, file_path, **kwargs):
+    if file_path.suffix != ".py" and EmailTemplateRenderer.get_engine.cache_info().currsize:
+        for loader in EmailTemplateRenderer.get_engine().template_loaders:
+            loader.reset()
+
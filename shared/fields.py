@@ -0,0 +1,58 @@
+import string
+
+from django.db import models
+from django.utils.text import slugify
+
+BASE36_ALPHABET = string.digits + string.ascii_lowercase
+
+
+def base36(number):
+    digits = []
+    while True:
+        number, remainder = divmod(number, 36)
+        digits.append(BASE36_ALPHABET[remainder])
+        if not number:
+            return "".join(reversed(digits))
+
+
+class UUIDSlugField(models.SlugField):
+    """
+    Slug derived from the row's own UUID, optionally prefixed with slugified local fields,
+    e.g. `john-doe-5x9kq3...`.
+
+    Uniqueness comes from the UUID, so the slug is computed in `pre_save` without probing the
+    table for collisions or loading related objects, and it is filled in by `bulk_create` too.
+    Existing slugs are never rewritten.
+    """
+
+    def __init__(self, *args, populate_from=(), uuid_field="id", **kwargs):
+        if isinstance(populate_from, str):
+            populate_from = (populate_from,)
+        self.populate_from = tuple(populate_from)
+        self.uuid_field = uuid_field
+        kwargs.setdefault("max_length", 50)
+        kwargs.setdefault("unique", True)
+        kwargs.setdefault("editable", False)
+        kwargs.setdefault("blank", True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.populate_from:
+            kwargs["populate_from"] = self.populate_from
+        if self.uuid_field != "id":
+            kwargs["uuid_field"] = self.uuid_field
+        return name, path, args, kwargs
+
+    def generate_slug(self, instance):
+        suffix = base36(getattr(instance, self.uuid_field).int)
+        prefix = slugify(" ".join(str(getattr(instance, field) or "") for field in self.populate_from))
+        prefix = prefix[: self.max_length - len(suffix) - 1].strip("-")
+        return f"{prefix}-{suffix}" if prefix else suffix
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if not value:
+            value = self.generate_slug(model_instance)
+            setattr(model_instance, self.attname, value)
+        return value
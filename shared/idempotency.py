@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.status import is_success
+
+logger = logging.getLogger(__name__)
+
+
+class FingerprintEncoder(DjangoJSONEncoder):
+    """JSON encoder of request payloads that stands uploaded files in by their name, size and content hash."""
+
+    def default(self, o):
+        if isinstance(o, UploadedFile):
+            digest = hashlib.sha256()
+            for chunk in o.chunks():
+                digest.update(chunk)
+            # Left readable for the serializer
+            o.seek(0)
+            return {"name": o.name, "size": o.size, "sha256": digest.hexdigest()}
+        return super().default(o)
+
+
+class IdempotencyStore:
+    """
+    Stored responses of idempotent requests, as (fingerprint, status_code, data) tuples keyed by
+    (user, scope, Idempotency-Key). The cache is the fast path; IdempotencyRecord rows are the
+    fallback when an entry was evicted or the cache is unavailable. Both expire after
+    IDEMPOTENCY_KEY_TTL seconds.
+    """
+
+    @staticmethod
+    def ttl():
+        return getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60)
+
+    @staticmethod
+    def cache_key(user_id, scope, key):
+        # Client keys are arbitrary strings, hashed to stay valid as cache keys
+        return f"idempotency:{user_id}:{scope}:{hashlib.md5(key.encode()).hexdigest()}"
+
+    @staticmethod
+    def fetch(user_id, scope, key):
+        """The stored response for the key, or None."""
+        from apps.accounts.models import IdempotencyRecord
+
+        cache_key = IdempotencyStore.cache_key(user_id, scope, key)
+        try:
+            stored = cache.get(cache_key)
+        except Exception as e:
+            logger.error(f"Idempotency cache unavailable for {scope}: {str(e)}")
+            stored = None
+        if stored is not None:
+            return stored
+
+        now = timezone.now()
+        record = IdempotencyRecord.objects.filter(
+            user_id=user_id, scope=scope, key=key, expires_at__gt=now
+        ).values_list("fingerprint", "status_code", "response", "expires_at").first()
+        if record is None:
+            return None
+        stored = record[:3]
+        try:
+            cache.set(cache_key, stored, timeout=(record[3] - now).total_seconds())
+        except Exception as e:
+            logger.error(f"Failed to cache idempotent response for {scope}: {str(e)}")
+        return stored
+
+    @staticmethod
+    def lock(user_id, scope, key):
+        """
+        Claim the key for the request about to run. False when another request holds it. Without
+        a cache the request runs unlocked: concurrent duplicates are then only as safe as the view.
+        """
+        lock_key = f"{IdempotencyStore.cache_key(user_id, scope, key)}:lock"
+        try:
+            return cache.add(lock_key, 1, timeout=getattr(settings, "IDEMPOTENCY_LOCK_SECONDS", 30))
+        except Exception as e:
+            logger.error(f"Idempotency lock unavailable for {scope}: {str(e)}")
+            return True
+
+    @staticmethod
+    def unlock(user_id, scope, key):
+        try:
+            cache.delete(f"{IdempotencyStore.cache_key(user_id, scope, key)}:lock")
+        except Exception as e:
+            logger.error(f"Failed to release idempotency lock for {scope}: {str(e)}")
+
+    @staticmethod
+    def save(user_id, scope, key, fingerprint, status_code, data):
+        """Store a response in the database and the cache; failures are logged, never raised."""
+        from apps.accounts.models import IdempotencyRecord
+
+        # Round-tripped through JSON so that cache and database replays are identical
+        data = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+        now = timezone.now()
+        try:
+            IdempotencyRecord.objects.bulk_create(
+                [IdempotencyRecord(
+                    user_id=user_id, scope=scope, key=key, fingerprint=fingerprint, status_code=status_code,
+                    response=data, created_at=now, expires_at=now + timedelta(seconds=IdempotencyStore.ttl()),
+                )],
+                # An expired row of the same key may not be purged yet
+                update_conflicts=True,
+                unique_fields=["user", "scope", "key"],
+                update_fields=["fingerprint", "status_code", "response", "created_at", "expires_at"],
+            )
+        except Exception as e:
+            logger.error(f"Failed to store idempotent response for {scope}: {str(e)}")
+        try:
+            cache.set(IdempotencyStore.cache_key(user_id, scope, key), (fingerprint, status_code, data), timeout=IdempotencyStore.ttl())
+        except Exception as e:
+            logger.error(f"Failed to cache idempotent response for {scope}: {str(e)}")
+
+    @staticmethod
+    def purge_expired(now=None):
+        from apps.accounts.models import IdempotencyRecord
+
+        deleted, _ = IdempotencyRecord.objects.filter(expires_at__lte=now or timezone.now()).delete()
+        return deleted
+
+
+class IdempotentCreateMixin:
+    """
+    Makes `create` safe to retry. A request sent with an `Idempotency-Key` header runs once per
+    user, view and key; a retry with the same key and payload gets the stored response back
+    (with an `Idempotent-Replayed` header) without reaching the write path. Only successful
+    responses are stored: a failed request wrote nothing and may be retried with the same key.
+    Reusing a key for another payload is rejected, and so is a retry arriving while the first
+    request is still running. Requests without the header are unaffected. Views overriding
+    `create` themselves wrap their own handler with `idempotent`.
+    """
+    idempotency_header = "Idempotency-Key"
+    # Secrets stay out of the stored fingerprints
+    idempotency_excluded_fields = ("password", "password_confirmation", "confirm_password")
+
+    def get_idempotency_scope(self):
+        return self.__class__.__name__
+
+    def get_idempotency_fingerprint(self, request):
+        """Hash of the method, path and payload, without the `idempotency_excluded_fields`."""
+        data = dict(request.data.lists()) if hasattr(request.data, "lists") else request.data
+        if isinstance(data, dict):
+            data = {name: value for name, value in data.items() if name not in self.idempotency_excluded_fields}
+        payload = json.dumps([request.method, request.path, data], sort_keys=True, cls=FingerprintEncoder)
+        return hashlib.md5(payload.encode()).hexdigest()
+
+    def create(self, request, *args, **kwargs):
+        return self.idempotent(request, super().create, *args, **kwargs)
+
+    def idempotent(self, request, handler, *args, **kwargs):
+        """Run `handler(request, *args, **kwargs)` once per Idempotency-Key, replaying its response after that."""
+        from apps.accounts.exceptions import (
+            IdempotencyKeyReusedException,
+            IdempotentRequestInProgressException,
+            InvalidIdempotencyKeyException,
+        )
+
+        key = request.headers.get(self.idempotency_header)
+        if key is None:
+            return handler(request, *args, **kwargs)
+        if not 0 < len(key) <= 255:
+            raise InvalidIdempotencyKeyException()
+
+        user_id, scope = request.user.pk, self.get_idempotency_scope()
+        fingerprint = self.get_idempotency_fingerprint(request)
+        # Locked before the lookup, so a retry cannot miss a response being stored
+        if not IdempotencyStore.lock(user_id, scope, key):
+            raise IdempotentRequestInProgressException()
+        try:
+            stored = IdempotencyStore.fetch(user_id, scope, key)
+            if stored is not None:
+                stored_fingerprint, status_code, data = stored
+                if stored_fingerprint != fingerprint:
+                    raise IdempotencyKeyReusedException()
+                return Response(data, status=status_code, headers={"Idempotent-Replayed": "true"})
+
+            response = handler(request, *args, **kwargs)
+            if is_success(response.status_code):
+                IdempotencyStore.save(user_id, scope, key, fingerprint, response.status_code, response.data)
+            return response
+        finally:
+            IdempotencyStore.unlock(user_id, scope, key)
@@ -28,11 +28,12 @@ class SoftDeleteQuerySet(models.QuerySet):
 
     def alive(self):
         """Return only non-deleted records."""
-        return self.filter(is_deleted=False)
+        # deleted_at (set together with is_deleted) matches the partial indexes' WHERE deleted_at IS NULL
+        return self.filter(deleted_at__isnull=True)
 
     def dead(self):
         """Return only soft-deleted records."""
-        return self.filter(is_deleted=True)
+        return self.filter(deleted_at__isnull=False)
 
     def all_with_deleted(self):
         """Return all records including soft-deleted."""
@@ -41,28 +42,28 @@ class SoftDeleteQuerySet(models.QuerySet):
     
     
 class SoftDeleteManager(models.Manager):
-    """Custom manager that uses the SoftDeleteQuerySet"""
+    """
+    Custom manager that uses the SoftDeleteQuerySet and only returns non-deleted records,
+    related managers included. `all_with_deleted()` and `dead()` reach the soft-deleted ones.
+    Managers that must see every row by default set `alive_only = False`.
+    """
+    alive_only = True
 
     def get_queryset(self):
+        queryset = SoftDeleteQuerySet(self.model, using=self._db)
+        return queryset.alive() if self.alive_only else queryset
+
+    def all_with_deleted(self):
         return SoftDeleteQuerySet(self.model, using=self._db)
 
     def alive(self):
-        return self.get_queryset().alive()
+        return self.all_with_deleted().alive()
 
     def dead(self):
-        return self.get_queryset().dead()
-
-    def hard_delete(self):
-        return self.get_queryset().hard_delete()
-    
-    def all_with_deleted(self):
-        return SoftDeleteQuerySet(self.model, using=self._db).all_with_deleted()
+        return self.all_with_deleted().dead()
 
-    def restore(self):
-        return self.get_queryset().restore()
-    
     def hard_delete(self):
-        return self.get_queryset().hard_delete()
+        return self.all_with_deleted().hard_delete()
 
     def restore(self):
-        return self.get_queryset().restore()
\ No newline at end of file
+        return self.dead().restore()
@@ -1,19 +1,87 @@
+from django.contrib.auth import get_user_model
 from rest_framework.exceptions import NotFound
+from shared.text_choices import UserRoles
 
-class OrganizationContextMixin:
+
+def resolve_user_organization(user):
     """
-    Provides a `get_organization` method for views
+    Resolve the organization a user belongs to from their role with a single query.
+    The caregiver/patient profile loaded along the way is attached to the user, so later
+    `user.caregiver` / `user.patient` accesses are served from the relation cache.
+    Returns None when the user has no organization.
     """
-    def get_organization(self):
-        user = self.request.user
+    from apps.organizations.models import Organization
+    from apps.caregivers.models import Caregiver
+    from apps.patients.models import Patient
 
-        if hasattr(user, "organization") and user.organization:
+    role = getattr(user, "role", None)
+    # Not type(user): a token-backed ClaimsUser is a lazy wrapper, not the model class
+    user_model = get_user_model()
+    # An unloaded ClaimsUser has no relation cache; touching it would load the user row
+    hydrated = getattr(user, "is_hydrated", True)
+
+    if role == UserRoles.ORGANIZATION:
+        if hydrated and user_model.organization.is_cached(user):
             return user.organization
+        organization = Organization.objects.filter(user_id=user.pk).first()
+        if organization is not None and hydrated:
+            user.organization = organization
+        return organization
 
-        if hasattr(user, "caregiver") and user.caregiver.organization:
+    if role == UserRoles.CAREGIVER:
+        if hydrated and user_model.caregiver.is_cached(user):
             return user.caregiver.organization
-        
-        if hasattr(user, "patient") and user.patient.organization:
+        caregiver = Caregiver.objects.select_related("organization").filter(user_id=user.pk).first()
+        if caregiver is None:
+            return None
+        if hydrated:
+            user.caregiver = caregiver
+        return caregiver.organization
+
+    if role == UserRoles.PATIENT:
+        if hydrated and user_model.patient.is_cached(user):
             return user.patient.organization
+        patient = Patient.objects.select_related("organization").filter(user_id=user.pk).first()
+        if patient is None:
+            return None
+        if hydrated:
+            user.patient = patient
+        return patient.organization
 
-        raise NotFound("Organization not found for this user.")
+    return None
+
+
+class OrganizationContextMixin:
+    """
+    Provides `get_organization` / `get_organization_id` methods for views.
+    The organization is resolved once per request and memoized on the request. When the
+    access token carries the organization claim, `get_organization_id` needs no query at all.
+    """
+    def get_organization_id(self):
+        organization_id = getattr(self.request.user, "organization_id", None)
+        if organization_id is not None:
+            return organization_id
+        return self.get_organization().pk
+
+    def get_organization(self):
+        request = self.request
+        if not hasattr(request, "_organization_context"):
+            organization_id = getattr(request.user, "organization_id", None)
+            if organization_id is not None:
+                from apps.organizations.models import Organization
+                request._organization_context = Organization.objects.filter(pk=organization_id).first()
+            else:
+                request._organization_context = resolve_user_organization(request.user)
+
+        if request._organization_context is None:
+            raise NotFound("Organization not found for this user.")
+        return request._organization_context
+
+
+class FileResponseMixin:
+    """
+    For APIViews returning file or streaming responses: the body format is fixed by the view,
+    so content negotiation never rejects the request on its Accept header. Errors still render as JSON.
+    """
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(request, force=True)
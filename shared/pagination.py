@@ -1,6 +1,193 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from .utils import approximate_count
 
-class StandardResultsSetPagination(PageNumberPagination):
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on (ordering field, pkid).
+    Each page is a single range scan that seeks past the previous page, so deep pages cost
+    the same as the first one and no COUNT(*) runs unless the client asks for it with
+    `?count=exact` or `?count=approximate` (planner estimate).
+    The ordering comes from `?ordering=` (first field only) or the model's Meta.ordering;
+    fields that are nullable or not local to the model fall back to `-created_at`. A queryset
+    ordered by an annotation (e.g. the `rank` of a ranked search) cannot be walked by a cursor
+    and is rejected rather than silently reordered.
+    """
     page_size = 10
     page_size_query_param = 'page_size'
-    max_page_size = 10
\ No newline at end of file
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    default_ordering = '-created_at'
+    tiebreaker_field = 'pkid'
+    invalid_cursor_message = 'Invalid cursor'
+    computed_ordering_message = 'Cursor pagination cannot follow a computed ordering such as search relevance; pass ?ordering= with a model field.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(queryset)
+        self.count = self.get_count(queryset, request)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+        if cursor:
+            queryset = queryset.filter(self.get_position_filter(cursor))
+        queryset = queryset.order_by(*self.get_order_by(reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        # Walking backwards, "more" rows are on the previous side; the cursor we came from guarantees a next page
+        self.has_next = cursor is not None if reverse else has_more
+        self.has_previous = has_more if reverse else cursor is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_page_size(self, request):
+        if not self.page_size_query_param:
+            return self.page_size
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size) if self.max_page_size else page_size
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        term = ordering[0] if ordering else self.default_ordering
+        if isinstance(term, str) and term.lstrip('-') in queryset.query.annotations:
+            raise ValidationError({self.cursor_query_param: [self.computed_ordering_message]})
+        if not isinstance(term, str) or not self.is_keyset_field(queryset.model, term.lstrip('-')):
+            term = self.default_ordering
+        return queryset.model._meta.get_field(term.lstrip('-')), term.startswith('-')
+
+    @staticmethod
+    def is_keyset_field(model, name):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        return field.concrete and not field.is_relation and not field.null
+
+    def get_order_by(self, reverse=False):
+        prefix = '-' if self.descending != reverse else ''
+        if self.field.name == self.tiebreaker_field:
+            return [f'{prefix}{self.tiebreaker_field}']
+        return [f'{prefix}{self.field.name}', f'{prefix}{self.tiebreaker_field}']
+
+    def get_position_filter(self, cursor):
+        # Rows strictly after the cursor in the direction of travel
+        op = 'lt' if self.descending != cursor['reverse'] else 'gt'
+        if self.field.name == self.tiebreaker_field:
+            return Q(**{f'{self.tiebreaker_field}__{op}': cursor['pk']})
+        name, value = self.field.name, cursor['value']
+        return Q(**{f'{name}__{op}e': value}) & (
+            Q(**{f'{name}__{op}': value}) | Q(**{f'{self.tiebreaker_field}__{op}': cursor['pk']})
+        )
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count()
+        if mode == 'approximate':
+            return approximate_count(queryset)
+        return None
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            return {
+                'value': self.field.to_python(data['v']),
+                'pk': int(data['k']),
+                'reverse': bool(data.get('r')),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        data = {
+            'v': self.field.value_to_string(obj),
+            'k': getattr(obj, self.tiebreaker_field),
+            'r': int(reverse),
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class KeysetOptInMixin:
+    """
+    Keeps page-number pagination as the default and switches to KeysetPagination when the
+    client sends `?pagination=cursor` or follows a `cursor` link. Page size, its query parameter
+    and its cap are shared with the page-number mode.
+    """
+    mode_query_param = 'pagination'
+    keyset_pagination_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = self.keyset_pagination_class()
+            self.keyset.page_size = self.page_size
+            self.keyset.page_size_query_param = self.page_size_query_param
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_pagination_class.cursor_query_param in request.query_params
+        )
+
+
+class OptionalKeysetPagination(KeysetOptInMixin, PageNumberPagination):
+    """Project default: page-number pagination with opt-in keyset pagination."""
+
+
+class StandardResultsSetPagination(KeysetOptInMixin, PageNumberPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 10
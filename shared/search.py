@@ -0,0 +1,70 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db.models import Q, Value
+from django.db.models.functions import Upper
+from rest_framework.filters import SearchFilter
+
+
+class TrigramSearchFilter(SearchFilter):
+    """
+    Index-backed replacement for DRF's SearchFilter on person lookups (patients, caregivers).
+
+    `search_fields` keeps DRF's syntax:
+    - plain fields (names) are matched on UPPER(field), which is covered by a trigram GIN
+      expression index, so partial matches don't scan the table;
+    - `^` fields (medical_id, staff_number) are identifiers, stored upper-case, and are matched
+      alongside the names: a term matches them by prefix (LIKE 'PREFIX%' on the field's
+      varchar_pattern_ops index), and a term containing a digit or an underscore, which only an
+      identifier can hold, also matches anywhere in them, so the numeric part of an id finds it.
+
+    As in DRF, every term must match at least one field: "john 123" finds the Johns whose id
+    contains 123.
+
+    `?fuzzy=true` switches name matching to trigram word similarity, which tolerates typos.
+    Name matches are ordered by similarity unless the client sends `?ordering=`.
+    """
+    fuzzy_param = 'fuzzy'
+    ordering_param = 'ordering'
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        name_fields = [field for field in search_fields if not field.startswith('^')]
+        prefix_fields = [field[1:] for field in search_fields if field.startswith('^')]
+
+        fuzzy = request.query_params.get(self.fuzzy_param, '').lower() in ('1', 'true', 'yes')
+        queryset = queryset.annotate(**{
+            self.upper_alias(field): Upper(field) for field in name_fields
+        })
+
+        for term in search_terms:
+            term_match = Q()
+            for field in name_fields:
+                if fuzzy:
+                    term_match |= Q(**{f'{self.upper_alias(field)}__trigram_word_similar': term.upper()})
+                else:
+                    term_match |= Q(**{f'{self.upper_alias(field)}__contains': term.upper()})
+            lookup = 'contains' if self.is_identifier(term) else 'startswith'
+            for field in prefix_fields:
+                term_match |= Q(**{f'{field}__{lookup}': term.upper()})
+            queryset = queryset.filter(term_match)
+
+        if self.ordering_param in request.query_params or not name_fields:
+            return queryset
+
+        search_text = Value(' '.join(search_terms).upper())
+        similarity = None
+        for field in name_fields:
+            field_similarity = TrigramWordSimilarity(search_text, self.upper_alias(field))
+            similarity = field_similarity if similarity is None else similarity + field_similarity
+        return queryset.annotate(search_rank=similarity).order_by('-search_rank', '-created_at')
+
+    @staticmethod
+    def is_identifier(term):
+        return '_' in term or any(char.isdigit() for char in term)
+
+    @staticmethod
+    def upper_alias(field):
+        return f'{field}_upper'
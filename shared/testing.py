@@ -0,0 +1,69 @@
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+from rest_framework.test import APIClient
+from shared.text_choices import UserRoles
+
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class LocMemCacheTestRunner(DiscoverRunner):
+    """
+    Runs the tests against a process-local cache, never the Redis instance of the environment.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache_override = override_settings(CACHES=TEST_CACHES)
+        self.cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_override.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+def create_user(email, role, password="pass", **fields):
+    from apps.accounts.models import User
+
+    fields.setdefault("is_active", True)
+    fields.setdefault("is_verified", True)
+    return User.objects.create_user(email=email, password=password, role=role, **fields)
+
+
+def create_organization(email, name, acronym, **fields):
+    """An organization with its (active, verified) account."""
+    from apps.organizations.models import Organization
+
+    return Organization.objects.create(user=create_user(email, UserRoles.ORGANIZATION), name=name, acronym=acronym, **fields)
+
+
+def create_caregiver(organization, email, **fields):
+    from apps.caregivers.models import Caregiver
+
+    fields = {"first_name": "Care", "last_name": "Giver", "caregiver_type": "Doctor", **fields}
+    return Caregiver.objects.create(user=create_user(email, UserRoles.CAREGIVER), organization=organization, **fields)
+
+
+def create_patient(organization, email, **fields):
+    from apps.patients.models import Patient
+
+    fields = {"first_name": "Pat", "last_name": "Ient", **fields}
+    return Patient.objects.create(user=create_user(email, UserRoles.PATIENT), organization=organization, **fields)
+
+
+def create_diagnosis(patient, caregiver, **fields):
+    from apps.patients.models import PatientDiagnosisDetails
+
+    fields = {"assessment": "Checkup", "diagnoses": "None", "medication": "None", "health_care_center": "Main", "notes": "", **fields}
+    return PatientDiagnosisDetails.objects.create(patient=patient, caregiver=caregiver, organization=patient.organization, **fields)
+
+
+def client_for(user_id):
+    """
+    An API client authenticated as a freshly loaded user, as the JWT authentication would
+    provide it, with no relation cached.
+    """
+    from apps.accounts.models import User
+
+    client = APIClient()
+    client.force_authenticate(User.objects.get(pk=user_id))
+    return client
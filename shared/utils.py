@@ -1,5 +1,11 @@
+import json
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth import get_user_model
+from django.db import connections
 from django.utils.http import urlsafe_base64_decode
 from rest_framework.exceptions import ValidationError
 
@@ -30,4 +36,38 @@ def get_user_from_uidb64(uidb64):
         except Exception as e:
             logger.error(f"Unexpected error decoding uidb64 '{uidb64}': {str(e)}")
             raise ValidationError("User does not exist")
-            
\ No newline at end of file
+            
+
+def approximate_count(queryset):
+    """
+    Row estimate for a queryset taken from the PostgreSQL planner (EXPLAIN), without scanning the table.
+    Falls back to an exact COUNT(*) on other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hash many passwords with the configured hasher on a small thread pool (PASSWORD_HASHING_WORKERS,
+    defaulting to the CPU count, at most 4). The hashers spend their time in C code that releases
+    the GIL, so the threads hash in parallel without forking the serving process. Callers bound the
+    batch size. Hashes are returned in input order.
+    """
+    passwords = list(passwords)
+    workers = workers or getattr(settings, "PASSWORD_HASHING_WORKERS", None) or min(os.cpu_count() or 1, 4)
+    workers = min(workers, len(passwords))
+    if workers <= 1:
+        return [make_password(password) for password in passwords]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(make_password, passwords))